@@ -0,0 +1,3 @@
+"""
+Benchmarks for OpenGov-Construction: seeded data generators, the suite and its runner.
+"""
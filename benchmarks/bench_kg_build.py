@@ -0,0 +1,70 @@
+"""
+Benchmark kg.build_graph against the previous row-by-row (iterrows) ingestion.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_kg_build --edges 1000000 --nodes 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import networkx as nx
+import pandas as pd
+
+from benchmarks.generators import write_graph_csvs
+from open_gov_construction.kg import build_graph
+
+
+def build_graph_iterrows(nodes_csv: Path, edges_csv: Path) -> nx.MultiDiGraph:
+    """The pre-vectorization implementation, kept here as the baseline."""
+    nodes = pd.read_csv(nodes_csv)
+    edges = pd.read_csv(edges_csv)
+    G = nx.MultiDiGraph()
+    for _, r in nodes.iterrows():
+        G.add_node(str(r["id"]), label=str(r["label"]), type=str(r["type"]))
+    for _, r in edges.iterrows():
+        G.add_edge(str(r["src"]), str(r["dst"]), rel=str(r["rel"]))
+    return G
+
+
+def same_graph(a: nx.MultiDiGraph, b: nx.MultiDiGraph) -> bool:
+    same_nodes = list(a.nodes(data=True)) == list(b.nodes(data=True))
+    return same_nodes and list(a.edges(keys=True, data=True)) == list(b.edges(keys=True, data=True))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--nodes", type=int, default=200_000)
+    ap.add_argument("--edges", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--min-speedup", type=float, default=10.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        nodes_csv, edges_csv = write_graph_csvs(Path(tmp), args.nodes, args.edges, args.seed)
+
+        t0 = time.perf_counter()
+        legacy = build_graph_iterrows(nodes_csv, edges_csv)
+        t_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fast = build_graph(nodes_csv, edges_csv)
+        t_fast = time.perf_counter() - t0
+
+        identical = same_graph(legacy, fast)
+
+    speedup = t_legacy / t_fast
+    print(f"nodes={args.nodes} edges={args.edges}")
+    print(f"iterrows:   {t_legacy:8.2f} s")
+    print(f"vectorized: {t_fast:8.2f} s")
+    print(f"speedup:    {speedup:8.1f}x  identical={identical}")
+    return 0 if identical and speedup >= args.min_speedup else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
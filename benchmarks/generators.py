@@ -0,0 +1,145 @@
+"""
+Seeded synthetic inputs for the benchmarks, at any scale from a handful of rows to millions.
+
+Every generator is deterministic for a given (size, seed) and writes the same file layouts
+the toolkit reads, so benchmarks exercise the real parsing paths.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+NODE_TYPES = np.array(["asset", "contract", "vendor", "document", "record"])
+RELS = np.array(["awarded_to", "covers", "references", "supplies", "located_at", "supersedes"])
+MATERIALS = np.array(["iron_steel", "manufactured", "construction_material", "labor", "services"])
+ORIGINS = np.array(["US", "US", "US", "CA", "MX", "CN", "DE"])
+STATES = np.array(["IN", "OH", "CA"])
+DESCRIPTIONS = np.array(
+    [
+        "Install rebar",
+        "Concrete deck pour",
+        "Structural steel beams",
+        "Traffic signal controller",
+        "Welding of girders",
+        "Engineering services",
+        "Demolition of abutment",
+        "Aggregate base course",
+    ]
+)
+CLASSIFICATIONS = np.array(["", "Laborer Group 1", "Ironworker", "Operating Engineer"])
+
+def write_schedule_csv(path: Path, n_tasks: int, seed: int = 42, max_preds: int = 3) -> Path:
+    """
+    A layered random DAG: tasks are split into ~sqrt(n) layers and each task depends on up
+    to `max_preds` tasks from the previous layer. Every task has triangular estimates.
+    """
+    rng = np.random.default_rng(seed)
+    width = max(1, int(np.sqrt(n_tasks)))
+    ids = np.char.add("T", np.arange(n_tasks).astype(str))
+    layer = np.arange(n_tasks) // width
+    likely = rng.uniform(1.0, 20.0, n_tasks).round(1)
+    k = rng.integers(1, max_preds + 1, n_tasks)
+    picks = ((layer - 1) * width)[:, None] + rng.integers(0, width, (n_tasks, max_preds))
+    names = ids.tolist()
+    preds = [
+        "" if layer[i] == 0 else ",".join(dict.fromkeys(names[j] for j in picks[i, : k[i]]))
+        for i in range(n_tasks)
+    ]
+    pd.DataFrame(
+        {
+            "task_id": ids,
+            "name": np.char.add("Task ", np.arange(n_tasks).astype(str)),
+            "duration_days": likely,
+            "predecessors": preds,
+            "optimistic_days": (likely * rng.uniform(0.6, 0.9, n_tasks)).round(1),
+            "likely_days": likely,
+            "pessimistic_days": (likely * rng.uniform(1.1, 2.0, n_tasks)).round(1),
+        }
+    ).to_csv(path, index=False)
+    return path
+
+def write_cost_csv(path: Path, n_rows: int, seed: int = 42) -> Path:
+    """
+    A cost ledger with the columns `screen_baba_dbra` expects and a realistic flag mix.
+    """
+    rng = np.random.default_rng(seed)
+    pick = lambda values: values[rng.integers(0, len(values), n_rows)]  # noqa: E731
+    pd.DataFrame(
+        {
+            "line_id": np.char.add("L", np.arange(n_rows).astype(str)),
+            "description": pick(DESCRIPTIONS),
+            "material_type": pick(MATERIALS),
+            "origin_country": pick(ORIGINS),
+            "cost_usd": rng.uniform(100, 250_000, n_rows).round(2),
+            "federal_funding": rng.random(n_rows) < 0.7,
+            "state": pick(STATES),
+            "domestic_content_pct": rng.uniform(20, 100, n_rows).round(1),
+            "dbra_classification": pick(CLASSIFICATIONS),
+        }
+    ).to_csv(path, index=False)
+    return path
+
+def write_image_corpus(
+    folder: Path, n_images: int, seed: int = 42, dup_fraction: float = 0.2, size: int = 64
+) -> Path:
+    """
+    `n_images` small JPEGs; about `dup_fraction` of them are near-duplicates (re-encoded,
+    brightness-shifted or resized copies) of another image in the corpus.
+    """
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    n_dups = int(n_images * dup_fraction)
+    n_base = max(1, n_images - n_dups)
+    bases: List[Image.Image] = []
+    y, x = np.mgrid[0:size, 0:size]
+    for i in range(n_base):
+        # Random 2-D sinusoids plus noise: distinct images get clearly different hashes
+        fx, fy = rng.uniform(0.05, 0.6, 2)
+        px, py = rng.uniform(0, 2 * np.pi, 2)
+        waves = 60 * np.sin(fx * x + px) + 60 * np.sin(fy * y + py)
+        plane = 127 + waves + rng.normal(0, 10, (size, size))
+        im = Image.fromarray(plane.clip(0, 255).astype(np.uint8)).convert("RGB")
+        bases.append(im)
+        im.save(folder / f"img_{i:07d}.jpg", quality=90)
+    for j in range(n_images - n_base):
+        src = bases[int(rng.integers(0, n_base))]
+        kind = j % 3
+        if kind == 0:
+            im = src.point(lambda v: min(255, v + 12))
+        elif kind == 1:
+            im = src.resize((size * 3 // 4, size * 3 // 4)).resize((size, size))
+        else:
+            im = src
+        im.save(folder / f"dup_{j:07d}.jpg", quality=60 if kind == 2 else 90)
+    return folder
+
+def write_graph_csvs(folder: Path, n_nodes: int, n_edges: int, seed: int = 42) -> Tuple[Path, Path]:
+    """
+    Uniform random multigraph: `n_nodes` typed nodes and `n_edges` edges with random rels.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.char.add("N", np.arange(n_nodes).astype(str))
+    nodes = pd.DataFrame(
+        {
+            "id": ids,
+            "label": np.char.add("Entity ", np.arange(n_nodes).astype(str)),
+            "type": NODE_TYPES[rng.integers(0, len(NODE_TYPES), n_nodes)],
+        }
+    )
+    edges = pd.DataFrame(
+        {
+            "src": ids[rng.integers(0, n_nodes, n_edges)],
+            "dst": ids[rng.integers(0, n_nodes, n_edges)],
+            "rel": RELS[rng.integers(0, len(RELS), n_edges)],
+        }
+    )
+    nodes_csv = folder / "nodes.csv"
+    edges_csv = folder / "edges.csv"
+    nodes.to_csv(nodes_csv, index=False)
+    edges.to_csv(edges_csv, index=False)
+    return nodes_csv, edges_csv
@@ -0,0 +1,169 @@
+"""
+Drive the analytics service with many concurrent keep-alive clients and report latency.
+
+With `--spawn` a server is started in-process on a free port over synthetic inputs from
+`benchmarks.generators`; otherwise requests go to `--url` and `--tasks/--items/--nodes/--edges`
+must name files that server can read.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.load_test --spawn --concurrency 32 --requests 2000
+    PYTHONPATH=src python -m benchmarks.load_test --url http://127.0.0.1:8750 --tasks tasks.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.generators import write_cost_csv, write_graph_csvs, write_schedule_csv
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+def request_mix(files: Dict[str, Optional[str]]) -> List[Request]:
+    """
+    The requests each client cycles through, restricted to the inputs that were provided.
+    """
+    mix: List[Request] = [("GET", "/health", {})]
+    if files.get("tasks"):
+        mix += [
+            ("POST", "/schedule/cpm", {"tasks": files["tasks"]}),
+            ("POST", "/schedule/montecarlo", {"tasks": files["tasks"], "iterations": 500}),
+        ]
+    if files.get("items"):
+        mix.append(("POST", "/cost/screen", {"items": files["items"]}))
+    if files.get("nodes") and files.get("edges"):
+        graph = {"nodes": files["nodes"], "edges": files["edges"]}
+        mix += [
+            ("POST", "/kg/query", {**graph, "op": "khop", "node": "N0", "k": 2}),
+            ("POST", "/kg/query", {**graph, "op": "neighbors", "node": "N1"}),
+        ]
+    return mix
+
+async def _call(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, req: Request
+) -> int:
+    method, path, body = req
+    data = json.dumps(body).encode() if body else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n\r\n"
+    writer.write(head.encode() + data)
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+async def _client(
+    host: str, port: int, mix: List[Request], n: int, offset: int, latencies: List[float]
+) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for i in range(n):
+            t0 = time.perf_counter()
+            status = await _call(reader, writer, host, mix[(offset + i) % len(mix)])
+            latencies.append(time.perf_counter() - t0)
+            errors += status >= 400
+    finally:
+        writer.close()
+    return errors
+
+async def run_load(
+    host: str, port: int, mix: List[Request], concurrency: int, requests: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    share, extra = divmod(requests, concurrency)
+    per_client = [share + (i < extra) for i in range(concurrency)]
+    t0 = time.perf_counter()
+    errors = await asyncio.gather(
+        *(_client(host, port, mix, n, i, latencies) for i, n in enumerate(per_client) if n)
+    )
+    elapsed = time.perf_counter() - t0
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if ms.size else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": int(sum(errors)),
+        "seconds": round(elapsed, 3),
+        "req_per_s": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+async def _spawned(args: argparse.Namespace, workdir: Path) -> Dict[str, Any]:
+    from open_gov_construction.service import AnalyticsService
+
+    nodes, edges = write_graph_csvs(workdir, args.size, args.size * 4)
+    files = {
+        "tasks": str(write_schedule_csv(workdir / "tasks.csv", min(args.size, 2000))),
+        "items": str(write_cost_csv(workdir / "items.csv", args.size)),
+        "nodes": str(nodes),
+        "edges": str(edges),
+    }
+    service = AnalyticsService(workers=args.workers)
+    try:
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            mix = request_mix(files)
+            # One warm-up pass so the numbers reflect steady-state (cached) service
+            await run_load("127.0.0.1", port, mix, 1, len(mix))
+            return await run_load("127.0.0.1", port, mix, args.concurrency, args.requests)
+    finally:
+        service.close()
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--url", default="http://127.0.0.1:8750")
+    ap.add_argument(
+        "--spawn", action="store_true", help="Start a service in-process on synthetic data."
+    )
+    ap.add_argument("--size", type=int, default=10_000, help="Synthetic rows/nodes when spawning.")
+    ap.add_argument(
+        "--workers", type=int, default=None, help="Service worker processes when spawning."
+    )
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--tasks")
+    ap.add_argument("--items")
+    ap.add_argument("--nodes")
+    ap.add_argument("--edges")
+    args = ap.parse_args()
+
+    if args.spawn:
+        with tempfile.TemporaryDirectory(prefix="ogc-load-") as tmp:
+            result = asyncio.run(_spawned(args, Path(tmp)))
+    else:
+        url = urlsplit(args.url)
+        files = {"tasks": args.tasks, "items": args.items, "nodes": args.nodes, "edges": args.edges}
+        host, port = url.hostname or "127.0.0.1", url.port or 80
+        result = asyncio.run(
+            run_load(host, port, request_mix(files), args.concurrency, args.requests)
+        )
+    print(
+        f"{result['requests']} requests, {result['errors']} errors in {result['seconds']:.2f} s: "
+        f"{result['req_per_s']:,.0f} req/s  p50 {result['p50_ms']:.1f} ms  "
+        f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms"
+    )
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Run the benchmark suite, record throughput and peak memory to JSON, and compare to a baseline.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.run --scale 10k --out bench.json
+    PYTHONPATH=src python -m benchmarks.run --scale 10k --baseline bench.json --tolerance 0.25
+    PYTHONPATH=src python -m benchmarks.run --scale 1m --only build_graph --only read_tasks_csv
+
+Each benchmark runs at min(scale, its cap). Time is the best of `--repeat` runs; peak memory
+comes from one extra run under tracemalloc (Python and NumPy allocations). Exit status is 1
+when any benchmark is slower or uses more memory than the baseline by more than the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.suite import BENCHMARKS, Benchmark, by_name
+
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def parse_scale(text: str) -> int:
+    """
+    "1000", "10k", "1m" -> entity count.
+    """
+    text = text.strip().lower()
+    mult = _SUFFIXES.get(text[-1:], 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+def measure(bench: Benchmark, scale: int, seed: int, repeat: int, workdir: Path) -> Dict[str, Any]:
+    n = min(scale, bench.max_entities)
+    fn = bench.prepare(workdir, n, seed)
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    units = n * bench.units_per_entity
+    return {
+        "entities": n,
+        "unit": bench.unit,
+        "seconds": round(best, 6),
+        "throughput": round(units / best, 3) if best > 0 else None,
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Regression messages for benchmarks present in both result sets at the same size.
+    """
+    problems: List[str] = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or base["entities"] != cur["entities"]:
+            continue
+        if base["throughput"] and cur["throughput"] < base["throughput"] * (1 - tolerance):
+            problems.append(
+                f"{name}: throughput {cur['throughput']:.1f} < baseline "
+                f"{base['throughput']:.1f} {cur['unit']}/s"
+            )
+        if cur["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 1.0:
+            problems.append(
+                f"{name}: peak memory {cur['peak_mb']:.1f} MB > baseline {base['peak_mb']:.1f} MB"
+            )
+    return problems
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument(
+        "--scale",
+        default="1k",
+        help="Entities per benchmark: e.g. 1k, 10k, 100k, 1m (capped per benchmark).",
+    )
+    ap.add_argument(
+        "--only", action="append", default=[], help="Run only this benchmark (repeatable)."
+    )
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument(
+        "--out", type=Path, help="Write results JSON here (usable as a later --baseline)."
+    )
+    ap.add_argument("--baseline", type=Path, help="Compare against this results JSON.")
+    ap.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed fractional slowdown / memory growth."
+    )
+    args = ap.parse_args()
+
+    scale = parse_scale(args.scale)
+    known = by_name()
+    unknown = [name for name in args.only if name not in known]
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(unknown)}; choose from {', '.join(known)}")
+    selected = [known[name] for name in args.only] if args.only else BENCHMARKS
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="ogc-bench-") as tmp:
+        for bench in selected:
+            r = results[bench.name] = measure(bench, scale, args.seed, args.repeat, Path(tmp))
+            print(
+                f"{bench.name:<22} n={r['entities']:>8}  {r['seconds']:9.4f} s  "
+                f"{r['throughput']:>14,.0f} {r['unit']}/s  peak {r['peak_mb']:8.1f} MB",
+                flush=True,
+            )
+    current = {
+        "scale": scale,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        problems = compare(current, baseline, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
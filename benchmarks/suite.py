@@ -0,0 +1,100 @@
+"""
+Benchmark definitions: one entry per public hot path, each with an input generator.
+
+A benchmark's `prepare(workdir, n, seed)` writes/loads its inputs (untimed) and returns the
+zero-argument callable that is timed. Some routines are quadratic in their input (`cpm`'s
+backward pass, pairwise `find_duplicates`), so each benchmark caps the entity count it runs at.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.generators import (
+    write_cost_csv,
+    write_graph_csvs,
+    write_image_corpus,
+    write_schedule_csv,
+)
+
+MC_ITERATIONS = 50
+MC_STORE_TASKS = 50
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    unit: str
+    max_entities: int
+    prepare: Callable[[Path, int, int], Callable[[], Any]]
+    # Work units per entity, e.g. Monte Carlo iterations per task
+    units_per_entity: int = 1
+
+def _read_tasks(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.schedule import read_tasks_csv
+
+    path = write_schedule_csv(workdir / f"tasks_{n}.csv", n, seed)
+    return lambda: read_tasks_csv(path)
+
+def _cpm(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.schedule import cpm, read_tasks_csv
+
+    tasks = read_tasks_csv(write_schedule_csv(workdir / f"tasks_{n}.csv", n, seed))
+    return lambda: cpm(tasks)
+
+def _monte_carlo(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.schedule import monte_carlo_duration, read_tasks_csv
+
+    tasks = read_tasks_csv(write_schedule_csv(workdir / f"tasks_{n}.csv", n, seed))
+    return lambda: monte_carlo_duration(tasks, iterations=MC_ITERATIONS, seed=seed)
+
+def _monte_carlo_store(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.schedule import read_tasks_csv, simulate_schedule
+
+    tasks = read_tasks_csv(write_schedule_csv(workdir / "tasks_mc_store.csv", MC_STORE_TASKS, seed))
+    out = workdir / "mc_samples.npy"
+    return lambda: simulate_schedule(tasks, iterations=n, seed=seed, samples_path=out)
+
+def _screen(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.cost import screen_baba_dbra
+
+    path = write_cost_csv(workdir / f"costs_{n}.csv", n, seed)
+    return lambda: screen_baba_dbra(path, workdir / "cost_out.csv")
+
+def _scan(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.media import scan_images
+
+    folder = write_image_corpus(workdir / f"images_{n}", n, seed)
+    return lambda: scan_images(folder)
+
+def _duplicates(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.media import find_duplicates, scan_images
+
+    infos = scan_images(write_image_corpus(workdir / f"images_{n}", n, seed))
+    return lambda: find_duplicates(infos)
+
+def _build_graph(workdir: Path, n: int, seed: int) -> Callable[[], Any]:
+    from open_gov_construction.kg import build_graph
+
+    folder = workdir / f"graph_{n}"
+    folder.mkdir(exist_ok=True)
+    nodes_csv, edges_csv = write_graph_csvs(folder, max(1, n // 5), n, seed)
+    return lambda: build_graph(nodes_csv, edges_csv)
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("read_tasks_csv", "tasks", 1_000_000, _read_tasks),
+    Benchmark("cpm", "tasks", 10_000, _cpm),
+    Benchmark(
+        "monte_carlo_duration", "task-iterations", 5_000, _monte_carlo,
+        units_per_entity=MC_ITERATIONS,
+    ),
+    Benchmark("monte_carlo_store", "iterations", 10_000_000, _monte_carlo_store),
+    Benchmark("screen_baba_dbra", "rows", 1_000_000, _screen),
+    Benchmark("scan_images", "images", 100_000, _scan),
+    Benchmark("find_duplicates", "images", 10_000, _duplicates),
+    Benchmark("build_graph", "edges", 1_000_000, _build_graph),
+]
+
+def by_name() -> Dict[str, Benchmark]:
+    return {b.name: b for b in BENCHMARKS}
@@ -1,24 +1,102 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 
-import pandas as pd
 import typer
 from rich.console import Console
 from rich.panel import Panel
 from rich.theme import Theme
 
+from . import metrics
 from .states import get_state, list_states
-from .schedule import CPMResult, Task, cpm, monte_carlo_duration, read_tasks_csv
-from .cost import BABAConfig, screen_baba_dbra
-from .media import find_duplicates, scan_images
-from .kg import build_graph, neighbors_of, save_graphml
 
-app = typer.Typer(help="OpenGov-Construction: Federal/State construction toolkit (IN, OH, CA).")
+if TYPE_CHECKING:
+    from .media import ImageInfo
+
+# Commands import their heavy dependencies (pandas, numpy, networkx, Pillow) when invoked,
+# so `--help`, `list-states` and other light commands start without loading them.
+
+app = typer.Typer(
+    help="OpenGov-Construction: Federal/State construction toolkit (IN, OH, CA).",
+    rich_markup_mode=None,
+)
 console = Console(theme=Theme({"info": "cyan", "error": "red", "success": "green"}))
 
 
+@app.callback()
+def main(
+    ctx: typer.Context,
+    metrics_out: Optional[Path] = typer.Option(
+        None, "--metrics", help="Write per-stage timings and counters to this JSON file."
+    ),
+    profile_out: Optional[Path] = typer.Option(
+        None, "--profile", help="Write cProfile stats to this file (read with python -m pstats)."
+    ),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers",
+        help="Worker pool size for heavy routines (env OGC_WORKERS; default: CPU count).",
+    ),
+    executor: Optional[str] = typer.Option(
+        None, "--executor", help="'thread' or 'process' pools (env OGC_EXECUTOR; default: thread)."
+    ),
+    chunk_size: Optional[int] = typer.Option(
+        None, "--chunk-size", help="Max rows per batch (env OGC_CHUNK_SIZE; default: 100000)."
+    ),
+    memory_budget: Optional[int] = typer.Option(
+        None,
+        "--memory-budget",
+        help="MB one batch may use (env OGC_MEMORY_BUDGET_MB; default: 512).",
+    ),
+    seed: Optional[int] = typer.Option(
+        None, "--seed", help="Default random seed (env OGC_SEED; default: 42)."
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None, "--cache-dir", help="Cache parsed CSV inputs here (env OGC_CACHE_DIR; default: off)."
+    ),
+    cache_max_mb: Optional[int] = typer.Option(
+        None, "--cache-max-mb", help="Cache size cap in MB (env OGC_CACHE_MAX_MB; default: 2048)."
+    ),
+) -> None:
+    overrides = (workers, executor, chunk_size, memory_budget, seed, cache_dir, cache_max_mb)
+    if any(v is not None for v in overrides):
+        from .utils import set_execution_config
+
+        try:
+            set_execution_config(
+                workers=workers,
+                executor=executor,
+                chunk_size=chunk_size,
+                memory_budget_mb=memory_budget,
+                seed=seed,
+                cache_dir=str(cache_dir) if cache_dir is not None else None,
+                cache_max_mb=cache_max_mb,
+            )
+        except ValueError as exc:
+            raise typer.BadParameter(str(exc))
+    if metrics_out is not None:
+        metrics.enable()
+
+        def write_metrics() -> None:
+            metrics.write_json(metrics_out, {"command": ctx.invoked_subcommand})
+            metrics.disable()
+
+        ctx.call_on_close(write_metrics)
+    if profile_out is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+        def write_profile() -> None:
+            profiler.disable()
+            profiler.dump_stats(str(profile_out))
+
+        # Registered after write_metrics, so closes first: metrics I/O stays out of the profile
+        ctx.call_on_close(write_profile)
+        profiler.enable()
+
+
 @app.command("list-states")
 def cmd_list_states() -> None:
     profiles = list_states()
@@ -31,35 +109,57 @@ def cmd_schedule_cpm(
     infile: Path = typer.Argument(..., help="Tasks CSV: task_id,name,duration_days,predecessors[,optimistic_days,likely_days,pessimistic_days]"),
     out_csv: Path = typer.Option(Path("schedule_cpm.csv"), "--out", help="Output CSV with CPM fields."),
 ) -> None:
+    from .schedule import cpm, cpm_table, read_tasks_csv
+
     tasks = read_tasks_csv(infile)
     res = cpm(tasks)
-    df = pd.DataFrame(
-        [
-            {
-                "task_id": tid,
-                "ES": res.es[tid],
-                "EF": res.ef[tid],
-                "LS": res.ls[tid],
-                "LF": res.lf[tid],
-                "total_float": res.total_float[tid],
-                "critical": abs(res.total_float[tid]) < 1e-9,
-            }
-            for tid in res.es.keys()
-        ]
-    ).sort_values("ES")
-    df.to_csv(out_csv, index=False)
+    cpm_table(res).to_csv(out_csv, index=False)
     console.print(Panel(f"Project duration: {res.project_duration_days:.2f} days\nWrote {out_csv}", title="CPM"))
 
 
 @app.command("schedule-montecarlo")
 def cmd_schedule_mc(
-    infile: Path = typer.Argument(..., help="Tasks CSV with optimistic, likely, pessimistic durations."),
+    infile: Path = typer.Argument(
+        ..., help="Tasks CSV with optimistic, likely, pessimistic durations."
+    ),
     iterations: int = typer.Option(2000, "--iterations", help="Simulation iterations."),
-    seed: int = typer.Option(42, "--seed", help="Random seed."),
+    seed: Optional[int] = typer.Option(
+        None, "--seed", help="Random seed (default: the execution config's)."
+    ),
+    bins: int = typer.Option(
+        200,
+        "--bins",
+        help="Histogram bins over the simulated range (plus underflow and overflow bins).",
+    ),
+    samples_out: Optional[Path] = typer.Option(
+        None, "--samples", help="Stream every sample to this .npy file instead of memory."
+    ),
+    cdf_out: Optional[Path] = typer.Option(
+        None, "--cdf-out", help="Write the histogram/CDF table to this CSV."
+    ),
+    plot_out: Optional[Path] = typer.Option(
+        None, "--plot", help="Render the histogram and S-curve to this image (e.g. risk.png)."
+    ),
 ) -> None:
+    from .schedule import read_tasks_csv, simulate_schedule, write_risk_chart
+
     tasks = read_tasks_csv(infile)
-    p50, p80, p90 = monte_carlo_duration(tasks, iterations=iterations, seed=seed)
-    console.print(Panel(f"P50={p50:.1f} d, P80={p80:.1f} d, P90={p90:.1f} d", title="Schedule Risk (Triangular)"))
+    try:
+        res = simulate_schedule(
+            tasks, iterations=iterations, seed=seed, bins=bins, samples_path=samples_out
+        )
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc))
+    lines = [f"P50={res.p50:.1f} d, P80={res.p80:.1f} d, P90={res.p90:.1f} d"]
+    if samples_out is not None:
+        lines.append(f"Wrote {samples_out}")
+    if cdf_out is not None:
+        res.cdf_table().to_csv(cdf_out, index=False)
+        lines.append(f"Wrote {cdf_out}")
+    if plot_out is not None:
+        write_risk_chart(res, plot_out, title=f"Schedule Risk: {infile.name}")
+        lines.append(f"Wrote {plot_out}")
+    console.print(Panel("\n".join(lines), title="Schedule Risk (Triangular)"))
 
 
 @app.command("cost-compliance")
@@ -68,6 +168,8 @@ def cmd_cost_compliance(
     out_csv: Path = typer.Option(Path("cost_compliance.csv"), "--out", help="Output CSV with flags."),
     domestic_threshold: float = typer.Option(55.0, "--domestic-threshold", help="Manufactured domestic % threshold."),
 ) -> None:
+    from .cost import BABAConfig, screen_baba_dbra
+
     df = screen_baba_dbra(infile, out_csv, baba=BABAConfig(domestic_content_threshold_pct=domestic_threshold))
     n_baba = int(df["flag_baba"].sum()) if "flag_baba" in df else 0
     n_dbra = int(df["flag_dbra"].sum()) if "flag_dbra" in df else 0
@@ -77,28 +179,229 @@ def cmd_cost_compliance(
 @app.command("media-scan")
 def cmd_media_scan(
     folder: Path = typer.Argument(..., help="Folder containing images."),
-    dup_distance: int = typer.Option(5, "--dup-distance", help="Max Hamming distance for duplicates."),
-    out_csv: Path = typer.Option(Path("media_inventory.csv"), "--out", help="Output CSV inventory."),
+    dup_distance: int = typer.Option(
+        5, "--dup-distance", help="Max Hamming distance for duplicates."
+    ),
+    out_csv: Path = typer.Option(
+        Path("media_inventory.csv"), "--out", help="Output CSV inventory."
+    ),
+    recursive: bool = typer.Option(
+        True, "--recursive/--no-recursive", help="Descend into subfolders."
+    ),
+    extensions: List[str] = typer.Option(
+        [],
+        "--ext",
+        help="Image extension to include (repeatable; default: all supported image types).",
+    ),
+    include: List[str] = typer.Option(
+        [], "--include", help="Glob on relative path to include (repeatable)."
+    ),
+    exclude: List[str] = typer.Option(
+        [], "--exclude", help="Glob on relative path to exclude (repeatable)."
+    ),
+    max_report: int = typer.Option(
+        20, "--max-report", help="Max duplicate pairs/clusters listed in the summary."
+    ),
+    clusters_csv: Optional[Path] = typer.Option(
+        None, "--clusters", help="Write duplicate clusters CSV instead of listing pairs."
+    ),
+    metadata_only: bool = typer.Option(
+        False, "--metadata-only", help="Read headers/EXIF only (no pixel decode, no duplicates)."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", help="Reader threads (default: from the execution config)."
+    ),
 ) -> None:
-    infos = scan_images(folder)
-    import pandas as pd
+    from rich.progress import Progress, SpinnerColumn, TextColumn
 
-    df = pd.DataFrame([{"path": i.path, "width": i.width, "height": i.height, "brightness": i.brightness, "phash": i.phash} for i in infos])
-    df.to_csv(out_csv, index=False)
-    dups = find_duplicates(infos, max_distance=dup_distance)
-    dup_lines = [f"{a.path} <-> {b.path} (d={d})" for a, b, d in dups]
-    console.print(Panel(f"Scanned {len(infos)} images\nDuplicates: {len(dups)}\n" + "\n".join(dup_lines), title="Media Scan"))
+    from array import array
+
+    from .media import (
+        IMAGE_EXTENSIONS,
+        cluster_hashes,
+        duplicate_pairs,
+        iter_image_metadata,
+        iter_images,
+        make_clusters,
+        read_inventory_rows,
+        write_clusters_csv,
+        write_inventory_csv,
+        write_metadata_csv,
+    )
+
+    if dup_distance < 0:
+        raise typer.BadParameter("must be >= 0", param_hint="--dup-distance")
+    extensions = extensions or list(IMAGE_EXTENSIONS)
+    skipped: List[str] = []
+
+    def on_error(path: Path, exc: Exception) -> None:
+        skipped.append(f"{path}: {exc}")
+
+    def skipped_report() -> str:
+        if not skipped:
+            return ""
+        lines = [f"\nSkipped {len(skipped)} unreadable files:", *skipped[:max_report]]
+        if len(skipped) > max_report:
+            lines.append(f"... and {len(skipped) - max_report} more")
+        return "\n".join(lines)
+
+    if metadata_only:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("{task.description}"),
+            TextColumn("{task.completed} images"),
+            console=console,
+            transient=True,
+        ) as progress:
+            task = progress.add_task("Reading headers", total=None)
+            n = write_metadata_csv(
+                iter_image_metadata(
+                    folder,
+                    recursive=recursive,
+                    extensions=extensions,
+                    include=include,
+                    exclude=exclude,
+                    workers=workers,
+                    on_error=on_error,
+                ),
+                out_csv,
+                on_row=lambda _: progress.advance(task),
+            )
+        console.print(
+            Panel(
+                f"Read metadata for {n} images\nWrote {out_csv}" + skipped_report(),
+                title="Media Scan",
+            )
+        )
+        return
+    # Rows go straight to the CSV; only the 8-byte hashes stay in memory for duplicate
+    # detection, and the few rows a report needs are read back from the inventory.
+    hashes = array("Q")
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("{task.description}"),
+        TextColumn("{task.completed} images"),
+        console=console,
+        transient=True,
+    ) as progress:
+        task = progress.add_task("Scanning", total=None)
+
+        def on_row(info: ImageInfo) -> None:
+            hashes.append(info.phash)
+            progress.advance(task)
+
+        n = write_inventory_csv(
+            iter_images(
+                folder,
+                recursive=recursive,
+                extensions=extensions,
+                include=include,
+                exclude=exclude,
+                workers=workers,
+                on_error=on_error,
+            ),
+            out_csv,
+            on_row=on_row,
+        )
+    if clusters_csv is not None:
+        components = cluster_hashes(hashes, max_distance=dup_distance)
+        clusters = make_clusters(
+            read_inventory_rows(out_csv, (i for c in components for i in c)), components
+        )
+        n_rows = write_clusters_csv(clusters, clusters_csv)
+        lines = [
+            f"#{c.cluster_id}: {c.representative.path} ({len(c.members)} images)"
+            for c in clusters[:max_report]
+        ]
+        if len(clusters) > max_report:
+            lines.append(f"... and {len(clusters) - max_report} more")
+        header = (
+            f"Scanned {n} images\nDuplicate clusters: {len(clusters)} ({n_rows} images)\n"
+            f"Wrote {out_csv}, {clusters_csv}\n"
+        )
+        console.print(Panel(header + "\n".join(lines) + skipped_report(), title="Media Scan"))
+        return
+    n_dups, pairs = duplicate_pairs(hashes, max_distance=dup_distance, limit=max_report)
+    rows = read_inventory_rows(out_csv, (i for a, b, _ in pairs for i in (a, b)))
+    dup_lines = [f"{rows[a].path} <-> {rows[b].path} (d={d})" for a, b, d in pairs]
+    if n_dups > max_report:
+        dup_lines.append(f"... and {n_dups - max_report} more")
+    console.print(
+        Panel(
+            f"Scanned {n} images\nDuplicates: {n_dups}\nWrote {out_csv}\n"
+            + "\n".join(dup_lines)
+            + skipped_report(),
+            title="Media Scan",
+        )
+    )
 
 
 @app.command("kg-build")
 def cmd_kg_build(
     nodes_csv: Path = typer.Argument(..., help="Nodes CSV: id,label,type"),
     edges_csv: Path = typer.Argument(..., help="Edges CSV: src,dst,rel"),
-    out_graphml: Path = typer.Option(Path("graph.graphml"), "--out", help="Output GraphML path."),
+    out_graphml: Path = typer.Option(
+        Path("graph.graphml"), "--out", help="Output path (GraphML or JSON Lines; .gz compresses)."
+    ),
+    strict: bool = typer.Option(
+        False, "--strict", help="Fail on duplicate node ids or edges to unknown nodes."
+    ),
+    snapshot: bool = typer.Option(
+        True, "--snapshot/--no-snapshot", help="Write a binary snapshot for fast kg-query."
+    ),
+    snapshot_dir: Optional[Path] = typer.Option(
+        None, "--snapshot-dir", help="Snapshot folder (default: <edges_csv>.kgsnap)."
+    ),
+    export_format: Optional[str] = typer.Option(
+        None, "--format", help="graphml or jsonl (default: from --out suffix)."
+    ),
+    stream: bool = typer.Option(
+        False, "--stream", help="Export only, streaming CSV chunks without building the graph."
+    ),
 ) -> None:
-    G = build_graph(nodes_csv, edges_csv)
-    save_graphml(G, out_graphml)
-    console.print(Panel(f"Graph with {G.number_of_nodes()} nodes, {G.number_of_edges()} edges\nSaved to {out_graphml}", title="KG Build"))
+    from .graphstore import CompactGraph, default_snapshot_dir, save_snapshot
+    from .kg import (
+        export_graphml_stream,
+        export_jsonl_stream,
+        graph_from_frames,
+        read_edges_csv,
+        read_nodes_csv,
+        save_graphml,
+        validate_graph_frames,
+    )
+
+    is_jsonl = out_graphml.name.removesuffix(".gz").endswith((".jsonl", ".ndjson"))
+    fmt = export_format or ("jsonl" if is_jsonl else "graphml")
+    if fmt not in ("graphml", "jsonl"):
+        raise typer.BadParameter("must be 'graphml' or 'jsonl'", param_hint="--format")
+    exporter = export_jsonl_stream if fmt == "jsonl" else export_graphml_stream
+    if stream:
+        if strict:
+            raise typer.BadParameter(
+                "--strict needs the full graph and cannot be combined with --stream"
+            )
+        n_nodes, n_edges = exporter(nodes_csv, edges_csv, out_graphml)
+        summary = f"Streamed {n_nodes} node rows, {n_edges} edge rows\nSaved to {out_graphml}"
+        console.print(Panel(summary, title="KG Build"))
+        return
+    nodes = read_nodes_csv(nodes_csv)
+    edges = read_edges_csv(edges_csv)
+    if strict:
+        validate_graph_frames(nodes, edges)
+    G = graph_from_frames(nodes, edges)
+    if fmt == "jsonl":
+        exporter(nodes_csv, edges_csv, out_graphml)
+    else:
+        save_graphml(G, out_graphml)
+    lines = [
+        f"Graph with {G.number_of_nodes()} nodes, {G.number_of_edges()} edges",
+        f"Saved to {out_graphml}",
+    ]
+    if snapshot:
+        folder = snapshot_dir or default_snapshot_dir(edges_csv)
+        save_snapshot(CompactGraph.from_frames(nodes, edges), folder, [nodes_csv, edges_csv])
+        lines.append(f"Snapshot: {folder}")
+    console.print(Panel("\n".join(lines), title="KG Build"))
 
 
 @app.command("kg-query")
@@ -106,11 +409,260 @@ def cmd_kg_query(
     nodes_csv: Path = typer.Argument(...),
     edges_csv: Path = typer.Argument(...),
     node_id: str = typer.Option(..., "--node", help="Node ID to query successors."),
+    hops: int = typer.Option(1, "--hops", help="Traverse up to this many hops."),
+    direction: str = typer.Option(
+        "out", "--direction", help="'out' for successors, 'in' for predecessors."
+    ),
+    rels: List[str] = typer.Option(
+        [], "--rel", help="Only follow edges with this rel (repeatable)."
+    ),
+    node_types: List[str] = typer.Option(
+        [], "--type", help="Only reach nodes of this type (repeatable)."
+    ),
+    snapshot_dir: Optional[Path] = typer.Option(
+        None, "--snapshot-dir", help="Snapshot folder (default: <edges_csv>.kgsnap)."
+    ),
+    no_snapshot: bool = typer.Option(
+        False, "--no-snapshot", help="Rebuild from the CSVs and skip the snapshot."
+    ),
+) -> None:
+    from .graphstore import CompactGraph, load_or_build
+
+    if direction not in ("out", "in"):
+        raise typer.BadParameter("must be 'out' or 'in'", param_hint="--direction")
+    if no_snapshot:
+        from .kg import read_edges_csv, read_nodes_csv
+
+        g = CompactGraph.from_frames(read_nodes_csv(nodes_csv), read_edges_csv(edges_csv))
+    else:
+        g = load_or_build(nodes_csv, edges_csv, snapshot_dir)
+    if node_id not in g:
+        console.print(Panel(f"Node not in graph: {node_id}", title="KG Query", style="error"))
+        raise typer.Exit(code=1)
+    if hops == 1 and direction == "out" and not rels and not node_types:
+        neigh = g.successors(node_id)
+        listed = ", ".join(neigh) if neigh else "(none)"
+        console.print(Panel(f"Neighbors of {node_id}: {listed}", title="KG Query"))
+        return
+    found = g.k_hop(node_id, hops, direction, rels=rels or None, node_types=node_types or None)  # type: ignore[arg-type]
+    kind = "Successors" if direction == "out" else "Predecessors"
+    listing = ", ".join(f"{n} ({d})" for n, d in found) if found else "(none)"
+    console.print(Panel(f"{kind} of {node_id} within {hops} hop(s): {listing}", title="KG Query"))
+
+
+@app.command("kg-update")
+def cmd_kg_update(
+    snapshot_dir: Path = typer.Argument(..., help="Snapshot folder written by kg-build."),
+    nodes_delta: Optional[Path] = typer.Option(
+        None, "--nodes", help="Node delta CSV: id,label,type[,deleted]"
+    ),
+    edges_delta: Optional[Path] = typer.Option(
+        None, "--edges", help="Edge delta CSV: src,dst,rel[,deleted]"
+    ),
 ) -> None:
-    G = build_graph(nodes_csv, edges_csv)
-    neigh = neighbors_of(G, node_id)
-    console.print(Panel(f"Neighbors of {node_id}: {', '.join(neigh) if neigh else '(none)'}", title="KG Query"))
+    """
+    Apply node/edge upserts and tombstones to a graph snapshot without rebuilding it.
+    """
+    from .graphstore import update_snapshot
+
+    if nodes_delta is None and edges_delta is None:
+        raise typer.BadParameter("give --nodes and/or --edges")
+    try:
+        stats = update_snapshot(snapshot_dir, nodes_delta, edges_delta)
+    except FileNotFoundError as exc:
+        console.print(Panel(str(exc), title="KG Update", style="error"))
+        raise typer.Exit(code=1)
+    console.print(
+        Panel(
+            f"Nodes: +{stats.nodes_added} added, {stats.nodes_updated} updated, "
+            f"-{stats.nodes_deleted} deleted\n"
+            f"Edges: +{stats.edges_added} added, -{stats.edges_deleted} deleted\n"
+            f"Snapshot: {snapshot_dir}",
+            title="KG Update",
+        )
+    )
+
+
+@app.command("kg-serve")
+def cmd_kg_serve(
+    nodes_csv: Path = typer.Argument(...),
+    edges_csv: Path = typer.Argument(...),
+    socket_path: Optional[Path] = typer.Option(
+        None, "--socket", help="Listen on this Unix socket."
+    ),
+    port: Optional[int] = typer.Option(None, "--port", help="Listen on this TCP port (localhost)."),
+    host: str = typer.Option("127.0.0.1", "--host", help="TCP bind address for --port."),
+    cache_size: int = typer.Option(
+        10_000, "--cache-size", help="LRU cache entries for query results."
+    ),
+    snapshot_dir: Optional[Path] = typer.Option(
+        None, "--snapshot-dir", help="Snapshot folder (default: <edges_csv>.kgsnap)."
+    ),
+) -> None:
+    """
+    Load the graph once and answer newline-delimited JSON queries from stdin (default) or a socket.
+    """
+    import asyncio
+    import sys
+
+    from .graphstore import load_or_build
+    from .kg_service import KGQueryEngine, serve_lines, start_server
+
+    engine = KGQueryEngine(load_or_build(nodes_csv, edges_csv, snapshot_dir), cache_size=cache_size)
+    status = Console(stderr=True)
+    g = engine.graph
+    if socket_path is None and port is None:
+        status.print(
+            f"kg-serve: {g.num_nodes} nodes, {g.num_edges} edges; reading queries from stdin"
+        )
+        serve_lines(engine, sys.stdin, sys.stdout)
+        return
+
+    async def run() -> None:
+        server = await start_server(engine, socket_path=socket_path, host=host, port=port or 0)
+        where = socket_path or ", ".join(str(s.getsockname()) for s in server.sockets)
+        status.print(f"kg-serve: {g.num_nodes} nodes, {g.num_edges} edges; listening on {where}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except OSError as exc:
+        console.print(Panel(str(exc), title="KG Serve", style="error"))
+        raise typer.Exit(code=1)
+
+
+@app.command("kg-batch")
+def cmd_kg_batch(
+    nodes_csv: Path = typer.Argument(...),
+    edges_csv: Path = typer.Argument(...),
+    ids_file: Path = typer.Option(..., "--ids", help="Text file with one node ID per line."),
+    out_jsonl: Path = typer.Option(
+        Path("kg_batch.jsonl"), "--out", help="Output JSON Lines, one answer per ID."
+    ),
+    hops: int = typer.Option(1, "--hops", help="Traverse up to this many hops."),
+    direction: str = typer.Option(
+        "out", "--direction", help="'out' for successors, 'in' for predecessors."
+    ),
+    rels: List[str] = typer.Option(
+        [], "--rel", help="Only follow edges with this rel (repeatable)."
+    ),
+    node_types: List[str] = typer.Option(
+        [], "--type", help="Only reach nodes of this type (repeatable)."
+    ),
+    snapshot_dir: Optional[Path] = typer.Option(
+        None, "--snapshot-dir", help="Snapshot folder (default: <edges_csv>.kgsnap)."
+    ),
+) -> None:
+    import json
+
+    from .graphstore import load_or_build
+    from .kg_service import KGQueryEngine, batch_queries, iter_node_ids
+
+    engine = KGQueryEngine(load_or_build(nodes_csv, edges_csv, snapshot_dir))
+    template: dict = {
+        "op": "khop" if hops != 1 or node_types else "neighbors",
+        "direction": direction,
+        "k": hops,
+    }
+    if rels:
+        template["rels"] = rels
+    if node_types:
+        template["types"] = node_types
+    n = failed = 0
+    with open(out_jsonl, "w", encoding="utf-8") as fh:
+        for nid, resp in batch_queries(engine, iter_node_ids(ids_file), template):
+            fh.write(json.dumps({"node": nid, **resp}) + "\n")
+            n += 1
+            failed += not resp["ok"]
+    console.print(
+        Panel(f"Answered {n} queries ({failed} failed)\nWrote {out_jsonl}", title="KG Batch")
+    )
+
+
+@app.command("project-run")
+def cmd_project_run(
+    manifest_path: Path = typer.Argument(
+        ..., help="Project manifest (TOML) listing the inputs for each stage."
+    ),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers",
+        help="Pool size for concurrent stages (default: from the execution config).",
+    ),
+    executor: Optional[str] = typer.Option(
+        None, "--executor", help="'thread' or 'process' pool (default: from the execution config)."
+    ),
+) -> None:
+    """
+    Run schedule, cost, media and graph stages for one project in a single process.
+    """
+    import json
+
+    from .pipeline import SUMMARY_NAME, build_summary, load_manifest, run_project
+
+    if executor not in (None, "thread", "process"):
+        raise typer.BadParameter("must be 'thread' or 'process'", param_hint="--executor")
+    try:
+        manifest = load_manifest(manifest_path)
+    except ValueError as exc:
+        console.print(Panel(str(exc), title="Project Run", style="error"))
+        raise typer.Exit(code=1)
+    run = run_project(manifest, workers=workers, executor=executor)  # type: ignore[arg-type]
+    summary = build_summary(run)
+    summary_path = manifest.output_dir / SUMMARY_NAME
+    summary_path.write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    agencies = ", ".join(summary["agencies"])
+    console.print(f"[info]{summary['project']}[/info] ({summary['state_name']}: {agencies})")
+    for section in summary["sections"]:
+        console.print(Panel("\n".join(section["lines"]), title=section["title"]))
+    for stage, err in summary["errors"].items():
+        console.print(Panel(err, title=f"Stage failed: {stage}", style="error"))
+    console.print(f"Wrote {len(summary['outputs'])} outputs and {summary_path}")
+    if not run.ok:
+        raise typer.Exit(code=1)
+
+
+@app.command("serve")
+def cmd_serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Bind address."),
+    port: int = typer.Option(8750, "--port", help="TCP port."),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers",
+        help="Process pool size for CPU-heavy requests "
+        "(default: from the execution config; 0 = threads).",
+    ),
+    cache_size: int = typer.Option(
+        256, "--cache-size", help="LRU entries for parsed inputs and for results."
+    ),
+) -> None:
+    """
+    Serve CPM, Monte Carlo, cost screening, media scans and KG queries as local JSON endpoints.
+    """
+    import asyncio
+
+    from .service import AnalyticsService
+
+    service = AnalyticsService(workers=workers, cache_size=cache_size)
+
+    async def run() -> None:
+        server = await service.start(host, port)
+        where = ", ".join(str(s.getsockname()) for s in server.sockets)
+        console.print(
+            f"[info]Analytics service[/info] listening on {where} ({service.workers} workers)"
+        )
+        async with server:
+            await server.serve_forever()
 
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
 
 if __name__ == "__main__":
     app()
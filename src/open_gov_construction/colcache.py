@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .utils import ExecutionConfig, file_fingerprint, fingerprint_matches, get_execution_config
+
+CACHE_VERSION = 1
+META_NAME = "meta.json"
+_NUMERIC_KINDS = "biuf"
+
+class _Unsupported(Exception):
+    """
+    The frame holds something the columnar format does not round-trip; it is not cached.
+    """
+
+def _entry_dir(cache_dir: Path, kind: str, path: Path) -> Path:
+    digest = hashlib.sha256(f"{kind}\0{Path(path).resolve()}".encode()).hexdigest()[:24]
+    return cache_dir / f"{kind}-{digest}"
+
+def _encode_strings(values: pd.Series, folder: Path, name: str) -> int:
+    """
+    Write int32 codes (-1 for missing) and the distinct strings as one NUL-separated UTF-8
+    blob. Returns the dictionary size.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    words = uniques.tolist()
+    if not all(isinstance(w, str) and "\0" not in w for w in words):
+        raise _Unsupported(f"column {name!r} holds values other than plain strings")
+    code_dtype = np.int32 if len(words) < 2**31 else np.int64
+    np.save(folder / f"{name}.codes.npy", codes.astype(code_dtype))
+    (folder / f"{name}.dict").write_bytes("\0".join(words).encode("utf-8"))
+    return len(words)
+
+def _decode_strings(folder: Path, name: str, size: int) -> np.ndarray:
+    codes = np.load(folder / f"{name}.codes.npy", mmap_mode="r")
+    # Dictionary of distinct strings plus a trailing NaN for the missing-value code (-1)
+    table = np.empty(size + 1, dtype=object)
+    if size:
+        table[:-1] = (folder / f"{name}.dict").read_bytes().decode("utf-8").split("\0")
+    table[-1] = np.nan
+    return table[codes]
+
+def _write_frame(df: pd.DataFrame, folder: Path) -> List[Dict[str, Any]]:
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise _Unsupported("frame has a non-default index")
+    columns: List[Dict[str, Any]] = []
+    for i, (name, col) in enumerate(df.items()):
+        if not isinstance(name, str):
+            raise _Unsupported(f"column name {name!r} is not a string")
+        dtype = col.dtype
+        stem = f"c{i}"
+        entry: Dict[str, Any] = {"name": name, "file": stem, "dtype": str(dtype)}
+        if isinstance(dtype, np.dtype) and dtype.kind in _NUMERIC_KINDS:
+            np.save(folder / f"{stem}.npy", col.to_numpy())
+            entry["encoding"] = "plain"
+        elif dtype == object or isinstance(dtype, pd.StringDtype):
+            entry["size"] = _encode_strings(col, folder, stem)
+            entry["encoding"] = "dict"
+        else:
+            raise _Unsupported(f"column {name!r} has unsupported dtype {dtype}")
+        columns.append(entry)
+    return columns
+
+def _read_frame(folder: Path, columns: List[Dict[str, Any]]) -> pd.DataFrame:
+    data: Dict[str, Any] = {}
+    for c in columns:
+        if c["encoding"] == "plain":
+            # Plain ndarray view of the mapping: zero-copy, without memmap leaking into results
+            data[c["name"]] = np.load(folder / f"{c['file']}.npy", mmap_mode="r").view(np.ndarray)
+        else:
+            data[c["name"]] = pd.Series(
+                _decode_strings(folder, c["file"], c["size"]), dtype=c["dtype"]
+            )
+    return pd.DataFrame(data, copy=False)
+
+def _touch(folder: Path) -> None:
+    try:
+        os.utime(folder / META_NAME)
+    except OSError:
+        pass
+
+def _entries(cache_dir: Path) -> List[Tuple[float, int, Path]]:
+    """
+    (last use, bytes, folder) for every complete cache entry.
+    """
+    out: List[Tuple[float, int, Path]] = []
+    for folder in cache_dir.iterdir():
+        meta = folder / META_NAME
+        if folder.name.startswith(".") or not meta.is_file():
+            continue
+        size = sum(f.stat().st_size for f in folder.iterdir())
+        out.append((meta.stat().st_mtime, size, folder))
+    return out
+
+def evict(cache_dir: Path, max_bytes: int, keep: Optional[Path] = None) -> int:
+    """
+    Remove least recently used entries until the cache fits in `max_bytes`; `keep` is
+    never removed. Returns the number of entries removed.
+    """
+    entries = sorted(_entries(Path(cache_dir)))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, folder in entries:
+        if total <= max_bytes:
+            break
+        if folder == keep:
+            continue
+        shutil.rmtree(folder, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+def clear(cache_dir: Path) -> None:
+    """
+    Delete every cache entry under `cache_dir`.
+    """
+    evict(cache_dir, 0)
+
+def _load(folder: Path, source: Path) -> Optional[pd.DataFrame]:
+    try:
+        meta = json.loads((folder / META_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION or not fingerprint_matches(meta["source"], source):
+        shutil.rmtree(folder, ignore_errors=True)
+        return None
+    try:
+        df = _read_frame(folder, meta["columns"])
+    except (OSError, ValueError, KeyError):
+        shutil.rmtree(folder, ignore_errors=True)
+        return None
+    _touch(folder)
+    return df
+
+def _store(df: pd.DataFrame, folder: Path, fingerprint: Dict[str, Any]) -> bool:
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=folder.parent))
+    try:
+        columns = _write_frame(df, tmp)
+        meta = {"version": CACHE_VERSION, "source": fingerprint, "rows": len(df),
+                "columns": columns}
+        (tmp / META_NAME).write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+        return True
+    except (_Unsupported, OSError):
+        return False
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def cached_frame(
+    path: Path,
+    kind: str,
+    parse: Callable[[Path], pd.DataFrame],
+    config: Optional[ExecutionConfig] = None,
+) -> pd.DataFrame:
+    """
+    `parse(path)`, served from the columnar cache when the config has a `cache_dir`.
+
+    Entries are keyed by `kind` and the resolved source path, and hold the source's size,
+    mtime and SHA-256; an entry whose source has changed is dropped and rebuilt. Numeric
+    columns are memory-mapped on load and string columns are rebuilt from a dictionary of
+    distinct values. Frames the format cannot represent exactly are returned uncached.
+    """
+    cfg = config or get_execution_config()
+    if cfg.cache_dir is None:
+        return parse(path)
+    cache_dir = Path(cfg.cache_dir)
+    folder = _entry_dir(cache_dir, kind, path)
+    if folder.is_dir():
+        with metrics.span("colcache.load"):
+            df = _load(folder, Path(path))
+        if df is not None:
+            metrics.count("cache_hits")
+            return df
+    metrics.count("cache_misses")
+    # Fingerprint before parsing so an edit made mid-parse leaves a stale entry, not a wrong one
+    fingerprint = file_fingerprint(Path(path))
+    df = parse(path)
+    with metrics.span("colcache.store"):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if _store(df, folder, fingerprint):
+            evict(cache_dir, cfg.cache_max_mb * 2**20, keep=folder)
+    return df
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from . import metrics
+from .colcache import cached_frame
+from .utils import ExecutionConfig, get_execution_config
+
 @dataclass(frozen=True)
 class BABAConfig:
     """
@@ -16,10 +20,72 @@ class BABAConfig:
     require_us_origin_iron_steel: bool = True
     flag_non_us_construction_material: bool = True
 
+# Rough per-row footprint of the screening temporaries (normalized strings, masks, messages)
+_ROW_BYTES = 512
+_LABOR_HINTS = ("install", "labor", "construct", "erect", "demolition", "concrete", "welding")
+
+def _text(values: pd.Series) -> List[str]:
+    return [str(v) for v in values.tolist()]
+
+def _screen_chunk(part: pd.DataFrame, baba: BABAConfig) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BABA and DBRA reason per row ("" when the row is not flagged).
+    """
+    n = len(part)
+    fed = part["federal_funding"].to_numpy(dtype=object).astype(bool)
+    material = np.array([v.strip().lower() for v in _text(part["material_type"])], dtype=object)
+    us_origin = np.array(
+        [v.strip().upper() == "US" for v in _text(part["origin_country"])], dtype=bool
+    )
+    if "domestic_content_pct" in part.columns:
+        pct = part["domestic_content_pct"].to_numpy(dtype=float)
+    else:
+        pct = np.full(n, np.nan)
+
+    baba_msg = np.full(n, "", dtype=object)
+    if baba.require_us_origin_iron_steel:
+        baba_msg[fed & (material == "iron_steel") & ~us_origin] = (
+            "Iron/steel must be U.S. origin (BABA)"
+        )
+    with np.errstate(invalid="ignore"):
+        low_content = ~(np.isfinite(pct) & (pct >= baba.domestic_content_threshold_pct))
+    baba_msg[fed & (material == "manufactured") & low_content] = (
+        f"Manufactured product domestic content < {baba.domestic_content_threshold_pct}% (BABA)"
+    )
+    if baba.flag_non_us_construction_material:
+        baba_msg[fed & (material == "construction_material") & ~us_origin] = (
+            "Construction material non-U.S. origin (BABA)"
+        )
+
+    # DBRA screening: require classification present when labor is implicated
+    # If description hints at labor ("install", "labor", "construct"), require classification
+    labor = np.array(
+        [any(k in d.lower() for k in _LABOR_HINTS) for d in _text(part["description"])], dtype=bool
+    )
+    if "dbra_classification" in part.columns:
+        missing = np.array([not v.strip() for v in _text(part["dbra_classification"])], dtype=bool)
+    else:
+        missing = np.ones(n, dtype=bool)
+    dbra_msg = np.full(n, "", dtype=object)
+    dbra_msg[labor & missing] = "Missing DBRA classification (wage determination)"
+    return baba_msg, dbra_msg
+
+def _read_items(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    required = [
+        "line_id", "description", "material_type", "origin_country", "cost_usd",
+        "federal_funding", "state",
+    ]
+    for c in required:
+        if c not in df.columns:
+            raise ValueError(f"Missing required column: {c}")
+    return df
+
 def screen_baba_dbra(
     csv_path: Path,
     out_path: Path,
     baba: BABAConfig = BABAConfig(),
+    config: Optional[ExecutionConfig] = None,
 ) -> pd.DataFrame:
     """
     Screen cost line items for BABA (domestic preference) and DBRA (wage classification present).
@@ -27,47 +93,35 @@ def screen_baba_dbra(
     Expected CSV columns:
         line_id, description, material_type, origin_country, cost_usd, federal_funding, state,
         domestic_content_pct (for manufactured), dbra_classification
+
+    Rows are screened in vectorized batches sized by `config` (default: the process-wide
+    execution config), and the parsed file goes through its columnar cache when enabled.
     """
-    df = pd.read_csv(csv_path)
-    required = ["line_id", "description", "material_type", "origin_country", "cost_usd", "federal_funding", "state"]
-    for c in required:
-        if c not in df.columns:
-            raise ValueError(f"Missing required column: {c}")
-    # Initialize flags
-    df["flag_baba"] = False
-    df["flag_dbra"] = False
-    df["flag_reason"] = ""
-
-    for i, r in df.iterrows():
-        reasons: List[str] = []
-        fed = bool(r["federal_funding"])
-        material = str(r["material_type"]).strip().lower()
-        origin = str(r["origin_country"]).strip().upper()
-
-        if fed:
-            if material == "iron_steel" and baba.require_us_origin_iron_steel:
-                if origin != "US":
-                    df.at[i, "flag_baba"] = True
-                    reasons.append("Iron/steel must be U.S. origin (BABA)")
-            elif material == "manufactured":
-                pct = float(r.get("domestic_content_pct", np.nan))
-                if not np.isfinite(pct) or pct < baba.domestic_content_threshold_pct:
-                    df.at[i, "flag_baba"] = True
-                    reasons.append(f"Manufactured product domestic content < {baba.domestic_content_threshold_pct}% (BABA)")
-            elif material == "construction_material":
-                if baba.flag_non_us_construction_material and origin != "US":
-                    df.at[i, "flag_baba"] = True
-                    reasons.append("Construction material non-U.S. origin (BABA)")
-        # DBRA screening: require classification present when labor is implicated
-        # If description hints at labor ("install", "labor", "construct"), require classification
-        desc = str(r["description"]).lower()
-        if any(k in desc for k in ("install", "labor", "construct", "erect", "demolition", "concrete", "welding")):
-            if "dbra_classification" not in df.columns or not str(r.get("dbra_classification", "")).strip():
-                df.at[i, "flag_dbra"] = True
-                reasons.append("Missing DBRA classification (wage determination)")
-
-        df.at[i, "flag_reason"] = "; ".join(reasons)
-
-    df.to_csv(out_path, index=False)
+    cfg = config or get_execution_config()
+    with metrics.span("cost.read_csv"):
+        df = cached_frame(csv_path, "cost_items", _read_items, cfg)
+    metrics.count("cost_rows", len(df))
+    n = len(df)
+    flag_baba = np.zeros(n, dtype=bool)
+    flag_dbra = np.zeros(n, dtype=bool)
+    reasons: List[str] = []
+
+    with metrics.span("cost.screen"):
+        rows = cfg.rows_per_chunk(_ROW_BYTES)
+        for lo in range(0, n, rows):
+            part = df.iloc[lo : lo + rows]
+            baba_msg, dbra_msg = _screen_chunk(part, baba)
+            flag_baba[lo : lo + rows] = baba_msg != ""
+            flag_dbra[lo : lo + rows] = dbra_msg != ""
+            reasons.extend(
+                "; ".join(m for m in pair if m)
+                for pair in zip(baba_msg.tolist(), dbra_msg.tolist())
+            )
+    df["flag_baba"] = flag_baba
+    df["flag_dbra"] = flag_dbra
+    df["flag_reason"] = reasons
+
+    with metrics.span("cost.write_csv"):
+        df.to_csv(out_path, index=False)
     return df
 
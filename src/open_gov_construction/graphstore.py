@@ -0,0 +1,808 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from . import metrics
+from .utils import file_fingerprint, fingerprint_matches
+
+# Loading a snapshot and querying it needs only NumPy: pandas, networkx and .kg are imported
+# by the functions that build, convert or patch a graph.
+if TYPE_CHECKING:
+    import networkx as nx
+    import pandas as pd
+
+SNAPSHOT_VERSION = 3
+MANIFEST_NAME = "manifest.json"
+_ARRAYS = (
+    "node_ids",
+    "id_sorted",
+    "id_perm",
+    "node_type",
+    "types",
+    "label_offsets",
+    "label_data",
+    "out_indptr",
+    "out_dst",
+    "out_rel",
+    "in_indptr",
+    "in_src",
+    "in_rel",
+    "rels",
+)
+
+def _encode(values: Sequence[str]) -> np.ndarray:
+    """
+    Fixed-width UTF-8 byte strings ('S' dtype): sortable, searchable and memory-mappable.
+    """
+    if len(values) == 0:
+        return np.zeros(0, dtype="S1")
+    return np.array([v.encode("utf-8") for v in values], dtype=np.bytes_)
+
+def _decode(value: bytes) -> str:
+    return bytes(value).decode("utf-8")
+
+def _index_dtype(n: int) -> type:
+    return np.int32 if n < 2**31 else np.int64
+
+def _csr(
+    keys: np.ndarray, values: np.ndarray, rel: np.ndarray, n: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group `values`/`rel` by `keys` (stable, so edge input order is kept within a row).
+    """
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order], rel[order]
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Concatenated `arange(start, start + length)` for each pair, without a Python loop.
+    """
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Offset of each entry within its range, shifted to the range's start
+    base = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return base + np.arange(total, dtype=np.int64)
+
+def _gather(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions of all CSR entries in `rows` and the row each came from.
+    """
+    starts = np.asarray(indptr[rows], dtype=np.int64)
+    lengths = np.asarray(indptr[rows + 1], dtype=np.int64) - starts
+    return _ranges(starts, lengths), np.repeat(rows, lengths)
+
+def _intern(table: np.ndarray, values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codes for `values` in a small string table, appending unseen strings.
+    """
+    names = [_decode(t) for t in table]
+    codes = {name: i for i, name in enumerate(names)}
+    out = np.empty(len(values), dtype=np.int32)
+    for j, v in enumerate(values):
+        if v not in codes:
+            codes[v] = len(names)
+            names.append(v)
+        out[j] = codes[v]
+    return (_encode(names) if len(names) > len(table) else np.asarray(table)), out
+
+def _patch_csr(
+    indptr: np.ndarray,
+    nbrs: np.ndarray,
+    rel: np.ndarray,
+    keep: np.ndarray,
+    add_rows: np.ndarray,
+    add_nbrs: np.ndarray,
+    add_rel: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Drop entries where `keep` is False and append the additions at the end of their rows.
+    Rows keep their order; only the removed and inserted positions move.
+    """
+    n = indptr.shape[0] - 1
+    removed_rows = np.searchsorted(indptr, np.flatnonzero(~keep), side="right") - 1
+    counts = np.diff(indptr) - np.bincount(removed_rows, minlength=n)
+    kept_ptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    order = np.argsort(add_rows, kind="stable")
+    rows = add_rows[order]
+    at = kept_ptr[rows + 1]
+    new_nbrs = np.insert(np.asarray(nbrs)[keep], at, add_nbrs[order].astype(nbrs.dtype))
+    new_rel = np.insert(np.asarray(rel)[keep], at, add_rel[order])
+    new_ptr = kept_ptr + np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n))])
+    return new_ptr, new_nbrs, new_rel
+
+@dataclass(frozen=True)
+class DeltaStats:
+    nodes_added: int = 0
+    nodes_updated: int = 0
+    nodes_deleted: int = 0
+    edges_added: int = 0
+    edges_deleted: int = 0
+
+@dataclass(frozen=True)
+class CompactGraph:
+    """
+    Read-only directed multigraph stored as NumPy arrays.
+
+    Node index order matches the networkx graph built by `kg.build_graph` (nodes CSV order,
+    then undeclared edge endpoints). Edges are stored twice as CSR structures: by source
+    (`out_indptr`, `out_dst`, `out_rel`) and by target (`in_indptr`, `in_src`, `in_rel`), both
+    in edge input order within a row. String columns are interned: node ids as a fixed-width
+    table with a sorted copy for binary search, labels as one UTF-8 blob with offsets, and node
+    types and relations as small code tables (`node_type` is -1 for endpoints that never
+    appeared in the nodes CSV). With int32 node indices an edge costs 16 bytes across both
+    directions, against roughly 1 KB in networkx.
+    """
+
+    node_ids: np.ndarray
+    id_sorted: np.ndarray
+    id_perm: np.ndarray
+    node_type: np.ndarray
+    types: np.ndarray
+    label_offsets: np.ndarray
+    label_data: np.ndarray
+    out_indptr: np.ndarray
+    out_dst: np.ndarray
+    out_rel: np.ndarray
+    in_indptr: np.ndarray
+    in_src: np.ndarray
+    in_rel: np.ndarray
+    rels: np.ndarray
+
+    @classmethod
+    @metrics.timed("graphstore.from_frames")
+    def from_frames(cls, nodes: pd.DataFrame, edges: pd.DataFrame) -> "CompactGraph":
+        import pandas as pd
+
+        # Repeated node ids keep their first position and their last row's attributes,
+        # as repeated add_node calls do.
+        last = nodes.drop_duplicates("id", keep="last").set_index("id")
+        declared = nodes["id"].drop_duplicates(keep="first")
+        attrs = last.loc[declared]
+        endpoints = pd.Series(
+            np.column_stack([edges["src"].to_numpy(), edges["dst"].to_numpy()]).ravel()
+        )
+        bare = pd.unique(endpoints[~endpoints.isin(pd.Index(declared))]).tolist()
+        return cls._assemble(
+            ids=declared.tolist() + bare,
+            labels=attrs["label"].tolist() + [None] * len(bare),
+            types=attrs["type"].tolist() + [None] * len(bare),
+            src=edges["src"],
+            dst=edges["dst"],
+            rel=edges["rel"],
+        )
+
+    @classmethod
+    def from_networkx(cls, G: nx.MultiDiGraph) -> "CompactGraph":
+        """
+        Convert a `kg.build_graph` graph. Nodes without attributes are kept as bare nodes;
+        edge keys are not stored (they are renumbered per node pair on conversion back).
+        """
+        import pandas as pd
+
+        ids: List[str] = []
+        labels: List[Optional[str]] = []
+        types: List[Optional[str]] = []
+        for nid, data in G.nodes(data=True):
+            ids.append(str(nid))
+            bare = "label" not in data and "type" not in data
+            labels.append(None if bare else str(data.get("label", "")))
+            types.append(None if bare else str(data.get("type", "")))
+        edges = list(G.edges(data="rel", default=""))
+        return cls._assemble(
+            ids=ids,
+            labels=labels,
+            types=types,
+            src=pd.Series([str(u) for u, _, _ in edges], dtype=object),
+            dst=pd.Series([str(v) for _, v, _ in edges], dtype=object),
+            rel=pd.Series([str(r) for _, _, r in edges], dtype=object),
+        )
+
+    @classmethod
+    def _assemble(
+        cls,
+        ids: List[str],
+        labels: Sequence[Optional[str]],
+        types: Sequence[Optional[str]],
+        src: pd.Series,
+        dst: pd.Series,
+        rel: pd.Series,
+    ) -> "CompactGraph":
+        import pandas as pd
+
+        n = len(ids)
+        idx = _index_dtype(n)
+        # None marks a bare node: factorize codes it -1
+        type_codes, type_table = pd.factorize(pd.Series(types, dtype=object))
+        encoded = [b"" if v is None else v.encode("utf-8") for v in labels]
+        label_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=label_offsets[1:])
+
+        index = pd.Index(ids)
+        src_idx = index.get_indexer(src).astype(idx)
+        dst_idx = index.get_indexer(dst).astype(idx)
+        rel_codes, rel_table = pd.factorize(rel)
+        rel_codes = rel_codes.astype(np.int32)
+        out_indptr, out_dst, out_rel = _csr(src_idx, dst_idx, rel_codes, n)
+        in_indptr, in_src, in_rel = _csr(dst_idx, src_idx, rel_codes, n)
+
+        node_ids = _encode(ids)
+        id_perm = np.argsort(node_ids, kind="stable").astype(np.int64)
+        return cls(
+            node_ids=node_ids,
+            id_sorted=node_ids[id_perm],
+            id_perm=id_perm,
+            node_type=type_codes.astype(np.int32),
+            types=_encode([str(t) for t in type_table]),
+            label_offsets=label_offsets,
+            label_data=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            out_indptr=out_indptr,
+            out_dst=out_dst,
+            out_rel=out_rel,
+            in_indptr=in_indptr,
+            in_src=in_src,
+            in_rel=in_rel,
+            rels=_encode([str(r) for r in rel_table]),
+        )
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """
+        Rebuild the networkx graph (e.g. for `kg.save_graphml`). Node order, successor order
+        and per-pair edge keys match `kg.build_graph` on the same CSVs.
+        """
+        import networkx as nx
+
+        G = nx.MultiDiGraph()
+        ids = [self.node_id(i) for i in range(self.num_nodes)]
+        types = [_decode(t) for t in self.types]
+        for i, nid in enumerate(ids):
+            code = int(self.node_type[i])
+            if code < 0:
+                G.add_node(nid)
+            else:
+                G.add_node(nid, label=self.label(i), type=types[code])
+        rels = [_decode(r) for r in self.rels]
+        srcs = np.repeat(np.arange(self.num_nodes), np.diff(self.out_indptr))
+        G.add_edges_from(
+            (ids[u], ids[v], {"rel": rels[r]})
+            for u, v, r in zip(
+                srcs.tolist(), np.asarray(self.out_dst).tolist(), np.asarray(self.out_rel).tolist()
+            )
+        )
+        return G
+
+    @property
+    def num_nodes(self) -> int:
+        return int(self.node_ids.shape[0])
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.out_dst.shape[0])
+
+    def lookup(self, node_ids: Sequence[str]) -> np.ndarray:
+        """
+        Vectorized `index_of`: node indices for `node_ids`, -1 where an id is not in the graph.
+        """
+        keys = _encode(list(node_ids))
+        out = np.full(keys.shape[0], -1, dtype=np.int64)
+        n = self.id_sorted.shape[0]
+        # Keys wider than the table cannot be present (and would force a widened copy)
+        fits = (
+            np.char.str_len(keys) <= self.id_sorted.dtype.itemsize
+            if keys.size
+            else np.zeros(0, dtype=bool)
+        )
+        if n == 0 or not fits.any():
+            return out
+        probe = keys[fits].astype(self.id_sorted.dtype)
+        pos = np.minimum(np.searchsorted(self.id_sorted, probe), n - 1)
+        hit = np.asarray(self.id_sorted[pos]) == probe
+        idx = np.flatnonzero(fits)
+        out[idx[hit]] = np.asarray(self.id_perm[pos[hit]])
+        return out
+
+    def index_of(self, node_id: str) -> int:
+        key = node_id.encode("utf-8")
+        if len(key) > self.id_sorted.dtype.itemsize:
+            raise KeyError(f"Node not in graph: {node_id}")
+        pos = int(np.searchsorted(self.id_sorted, key))
+        if pos >= self.id_sorted.shape[0] or self.id_sorted[pos] != key:
+            raise KeyError(f"Node not in graph: {node_id}")
+        return int(self.id_perm[pos])
+
+    def __contains__(self, node_id: object) -> bool:
+        try:
+            self.index_of(str(node_id))
+        except KeyError:
+            return False
+        return True
+
+    def node_id(self, index: int) -> str:
+        return _decode(self.node_ids[index])
+
+    def label(self, index: int) -> str:
+        return _decode(
+            self.label_data[self.label_offsets[index] : self.label_offsets[index + 1]].tobytes()
+        )
+
+    def node_type_name(self, index: int) -> str:
+        code = int(self.node_type[index])
+        return "" if code < 0 else _decode(self.types[code])
+
+    def _distinct(self, nbrs: np.ndarray, indptr: np.ndarray, i: int) -> List[str]:
+        row = np.asarray(nbrs[indptr[i] : indptr[i + 1]])
+        _, first = np.unique(row, return_index=True)
+        return [self.node_id(j) for j in row[np.sort(first)]]
+
+    def successors(self, node_id: str) -> List[str]:
+        """
+        Distinct successor ids in first-edge order (same as `kg.neighbors_of`).
+        """
+        return self._distinct(self.out_dst, self.out_indptr, self.index_of(node_id))
+
+    def predecessors(self, node_id: str) -> List[str]:
+        """
+        Distinct predecessor ids in first-edge order.
+        """
+        return self._distinct(self.in_src, self.in_indptr, self.index_of(node_id))
+
+    def _codes(self, table: np.ndarray, names: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if names is None:
+            return None
+        wanted = _encode(list(names))
+        return np.flatnonzero(np.isin(np.asarray(table), wanted)).astype(np.int32)
+
+    def _bfs(
+        self,
+        start: int,
+        k: int,
+        direction: Literal["out", "in"],
+        rels: Optional[Iterable[str]],
+        node_types: Optional[Iterable[str]],
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Yield (depth, newly reached node indices, the node each was first reached from) per hop.
+        """
+        indptr, nbrs, rel = (
+            (self.out_indptr, self.out_dst, self.out_rel)
+            if direction == "out"
+            else (self.in_indptr, self.in_src, self.in_rel)
+        )
+        rel_codes = self._codes(self.rels, rels)
+        type_codes = self._codes(self.types, node_types)
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
+        for depth in range(1, k + 1):
+            pos, parents = _gather(indptr, frontier)
+            if rel_codes is not None:
+                keep = np.isin(rel[pos], rel_codes)
+                pos, parents = pos[keep], parents[keep]
+            reached = np.asarray(nbrs[pos], dtype=np.int64)
+            if type_codes is not None:
+                keep = np.isin(self.node_type[reached], type_codes)
+                reached, parents = reached[keep], parents[keep]
+            fresh = ~visited[reached]
+            frontier, first = np.unique(reached[fresh], return_index=True)
+            if frontier.size == 0:
+                return
+            visited[frontier] = True
+            yield depth, frontier, parents[fresh][first]
+
+    def k_hop(
+        self,
+        node_id: str,
+        k: int = 1,
+        direction: Literal["out", "in"] = "out",
+        rels: Optional[Iterable[str]] = None,
+        node_types: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        Breadth-first expansion up to `k` hops, returning (node id, hop distance) pairs ordered
+        by distance, then node index. The start node is excluded.
+
+        Each hop expands the whole frontier at once from the CSR arrays. `rels` restricts the
+        edges followed; `node_types` restricts the nodes reached (and so traversed through).
+        """
+        found: List[Tuple[str, int]] = []
+        for depth, frontier, _ in self._bfs(self.index_of(node_id), k, direction, rels, node_types):
+            found.extend((self.node_id(j), depth) for j in frontier)
+        return found
+
+    def shortest_path(
+        self,
+        source: str,
+        target: str,
+        direction: Literal["out", "in"] = "out",
+        rels: Optional[Iterable[str]] = None,
+        max_hops: Optional[int] = None,
+    ) -> Optional[List[str]]:
+        """
+        Fewest-hop path from `source` to `target` (inclusive), or None if unreachable.
+        """
+        start, goal = self.index_of(source), self.index_of(target)
+        if start == goal:
+            return [source]
+        parent: Dict[int, int] = {}
+        limit = self.num_nodes if max_hops is None else max_hops
+        for _, frontier, parents in self._bfs(start, limit, direction, rels, None):
+            parent.update(zip(frontier.tolist(), parents.tolist()))
+            if goal in parent:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                return [self.node_id(i) for i in reversed(path)]
+        return None
+
+    @metrics.timed("graphstore.apply_delta")
+    def apply_delta(
+        self,
+        node_delta: Optional[pd.DataFrame] = None,
+        edge_delta: Optional[pd.DataFrame] = None,
+    ) -> Tuple["CompactGraph", DeltaStats]:
+        """
+        Apply upserts and tombstones (`kg.read_node_delta_csv` / `read_edge_delta_csv` frames).
+
+        Nodes are keyed by id: upserts update label/type or append a new node, tombstones remove
+        the node and its incident edges. Edges are keyed by (src, dst, rel): upserts add the edge
+        if absent (creating bare endpoint nodes as `build_graph` does), tombstones remove every
+        matching edge. Within one delta the last row per key wins and node tombstones win over
+        edge upserts. Only the touched CSR rows are searched; kept entries are carried over with
+        vectorized masks and inserts, without re-sorting or re-interning the graph.
+        """
+        import pandas as pd
+
+        empty_nodes = pd.DataFrame({"id": [], "label": [], "type": [], "deleted": []})
+        empty_edges = pd.DataFrame({"src": [], "dst": [], "rel": [], "deleted": []})
+        nd = (node_delta if node_delta is not None else empty_nodes).drop_duplicates(
+            "id", keep="last"
+        )
+        ed = (edge_delta if edge_delta is not None else empty_edges).drop_duplicates(
+            ["src", "dst", "rel"], keep="last"
+        )
+        nd_del = nd["deleted"].astype(bool).to_numpy()
+        ed_del = ed["deleted"].astype(bool).to_numpy()
+        n = self.num_nodes
+
+        # --- nodes: upserts (existing ids update in place, new ids are appended) ---
+        up = nd.loc[~nd_del]
+        up_idx = self.lookup(up["id"].tolist())
+        new_declared = up["id"].to_numpy()[up_idx < 0].tolist()
+        dead = pd.Index(nd.loc[nd_del, "id"])
+        adds = ed.loc[~ed_del & ~ed["src"].isin(dead).to_numpy() & ~ed["dst"].isin(dead).to_numpy()]
+        endpoints = pd.Series(
+            np.column_stack([adds["src"].to_numpy(), adds["dst"].to_numpy()]).ravel(), dtype=object
+        )
+        unknown = pd.unique(endpoints[self.lookup(endpoints.tolist()) < 0]).tolist()
+        declared_set = set(new_declared)
+        new_bare = [v for v in unknown if v not in declared_set]
+        new_ids = new_declared + new_bare
+        new_index = {v: n + i for i, v in enumerate(new_ids)}
+        n_ext = n + len(new_ids)
+
+        def index(values: Sequence[str]) -> np.ndarray:
+            idx = self.lookup(values)
+            for j in np.flatnonzero(idx < 0).tolist():
+                idx[j] = new_index.get(values[j], -1)
+            return idx
+
+        up_idx = index(up["id"].tolist())
+        types, type_codes = _intern(self.types, up["type"].tolist())
+        node_type = np.concatenate(
+            [np.asarray(self.node_type), np.full(len(new_ids), -1, dtype=np.int32)]
+        )
+        node_type[up_idx] = type_codes
+
+        old_blob = np.asarray(self.label_data)
+        label_start = np.concatenate(
+            [np.asarray(self.label_offsets[:-1]), np.zeros(len(new_ids), dtype=np.int64)]
+        )
+        label_len = np.concatenate(
+            [np.diff(self.label_offsets), np.zeros(len(new_ids), dtype=np.int64)]
+        )
+        encoded = [v.encode("utf-8") for v in up["label"].tolist()]
+        lens = np.array([len(b) for b in encoded], dtype=np.int64)
+        label_start[up_idx] = old_blob.shape[0] + np.cumsum(lens) - lens
+        label_len[up_idx] = lens
+        blob = np.concatenate([old_blob, np.frombuffer(b"".join(encoded), dtype=np.uint8)])
+
+        # --- nodes: tombstones ---
+        del_idx = self.lookup(dead.tolist())
+        del_idx = np.unique(del_idx[del_idx >= 0])
+        node_keep = np.ones(n_ext, dtype=bool)
+        node_keep[del_idx] = False
+
+        # --- edges ---
+        out_indptr = np.concatenate(
+            [np.asarray(self.out_indptr), np.full(len(new_ids), self.out_indptr[-1])]
+        )
+        in_indptr = np.concatenate(
+            [np.asarray(self.in_indptr), np.full(len(new_ids), self.in_indptr[-1])]
+        )
+        rels, rel_codes = _intern(self.rels, ed["rel"].tolist())
+        e_src = index(ed["src"].tolist())
+        e_dst = index(ed["dst"].tolist())
+        keep_out = np.ones(self.num_edges, dtype=bool)
+        keep_in = np.ones(self.num_edges, dtype=bool)
+
+        def matches(
+            indptr: np.ndarray,
+            nbrs: np.ndarray,
+            rel: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray,
+            codes: np.ndarray,
+        ) -> np.ndarray:
+            # Positions in the touched rows whose (row, nbr, rel) is one of the given keys
+            touched = np.unique(rows)
+            pos, pos_rows = _gather(
+                indptr, touched[(touched >= 0) & (touched < indptr.shape[0] - 1)]
+            )
+            have = pd.MultiIndex.from_arrays(
+                [
+                    pos_rows,
+                    np.asarray(nbrs[pos], dtype=np.int64),
+                    np.asarray(rel[pos], dtype=np.int64),
+                ]
+            )
+            want = pd.MultiIndex.from_arrays([rows, cols, codes.astype(np.int64)])
+            return pos[have.isin(want)]
+
+        d = ed_del & (e_src >= 0) & (e_dst >= 0)
+        gone_src, gone_dst, gone_rel = e_src[d], e_dst[d], rel_codes[d]
+        hit = matches(self.out_indptr, self.out_dst, self.out_rel, gone_src, gone_dst, gone_rel)
+        keep_out[hit] = False
+        hit = matches(self.in_indptr, self.in_src, self.in_rel, gone_dst, gone_src, gone_rel)
+        keep_in[hit] = False
+        if del_idx.size:
+            out_rows = np.repeat(np.arange(n), np.diff(self.out_indptr))
+            in_rows = np.repeat(np.arange(n), np.diff(self.in_indptr))
+            keep_out &= ~(np.isin(out_rows, del_idx) | np.isin(self.out_dst, del_idx))
+            keep_in &= ~(np.isin(in_rows, del_idx) | np.isin(self.in_src, del_idx))
+
+        # Endpoints tombstoned in this delta resolve to -1 (new ids) or a dropped node
+        a = ~ed_del & (e_src >= 0) & (e_dst >= 0)
+        a &= node_keep[np.where(a, e_src, 0)] & node_keep[np.where(a, e_dst, 0)]
+        a_src, a_dst, a_rel = e_src[a], e_dst[a], rel_codes[a]
+        existing = matches(out_indptr, self.out_dst, self.out_rel, a_src, a_dst, a_rel)
+        existing = existing[keep_out[existing]]
+        if existing.size:
+            ex_rows = np.searchsorted(out_indptr, existing, side="right") - 1
+            present = pd.MultiIndex.from_arrays([a_src, a_dst, a_rel.astype(np.int64)]).isin(
+                pd.MultiIndex.from_arrays(
+                    [
+                        ex_rows,
+                        np.asarray(self.out_dst[existing], dtype=np.int64),
+                        np.asarray(self.out_rel[existing], dtype=np.int64),
+                    ]
+                )
+            )
+            a_src, a_dst, a_rel = a_src[~present], a_dst[~present], a_rel[~present]
+
+        idx_dtype = _index_dtype(n_ext)
+        out_indptr, out_dst, out_rel = _patch_csr(
+            out_indptr, np.asarray(self.out_dst).astype(idx_dtype), self.out_rel, keep_out,
+            a_src, a_dst, a_rel,
+        )
+        in_indptr, in_src, in_rel = _patch_csr(
+            in_indptr, np.asarray(self.in_src).astype(idx_dtype), self.in_rel, keep_in,
+            a_dst, a_src, a_rel,
+        )
+
+        # --- id index: insert new ids into the sorted table ---
+        node_ids = (
+            np.concatenate([np.asarray(self.node_ids), _encode(new_ids)])
+            if new_ids
+            else np.asarray(self.node_ids)
+        )
+        id_sorted = np.asarray(self.id_sorted).astype(node_ids.dtype)
+        id_perm = np.asarray(self.id_perm)
+        if new_ids:
+            fresh = node_ids[n:]
+            order = np.argsort(fresh, kind="stable")
+            at = np.searchsorted(id_sorted, fresh[order])
+            id_sorted = np.insert(id_sorted, at, fresh[order])
+            id_perm = np.insert(id_perm, at, n + order)
+
+        # --- compact away deleted nodes (their rows are empty by now) ---
+        if del_idx.size:
+            remap = np.cumsum(node_keep) - 1
+            out_dst = remap[out_dst].astype(idx_dtype)
+            in_src = remap[in_src].astype(idx_dtype)
+            out_indptr = np.concatenate([[0], out_indptr[1:][node_keep]])
+            in_indptr = np.concatenate([[0], in_indptr[1:][node_keep]])
+            sorted_keep = node_keep[id_perm]
+            id_sorted = id_sorted[sorted_keep]
+            id_perm = remap[id_perm[sorted_keep]]
+            node_ids = node_ids[node_keep]
+            node_type = node_type[node_keep]
+            label_start, label_len = label_start[node_keep], label_len[node_keep]
+
+        label_offsets = np.concatenate([[0], np.cumsum(label_len)]).astype(np.int64)
+        graph = CompactGraph(
+            node_ids=node_ids,
+            id_sorted=id_sorted,
+            id_perm=id_perm.astype(np.int64),
+            node_type=node_type,
+            types=types,
+            label_offsets=label_offsets,
+            label_data=blob[_ranges(label_start, label_len)],
+            out_indptr=out_indptr,
+            out_dst=out_dst,
+            out_rel=out_rel.astype(np.int32),
+            in_indptr=in_indptr,
+            in_src=in_src,
+            in_rel=in_rel.astype(np.int32),
+            rels=rels,
+        )
+        stats = DeltaStats(
+            nodes_added=len(new_ids),
+            nodes_updated=int((up_idx < n).sum()),
+            nodes_deleted=int(del_idx.size),
+            edges_added=int(a_src.size),
+            edges_deleted=self.num_edges - int(keep_out.sum()),
+        )
+        return graph, stats
+
+    def k_hop_successors(self, node_id: str, k: int = 1, **filters: Any) -> List[str]:
+        return [n for n, _ in self.k_hop(node_id, k, "out", **filters)]
+
+    def k_hop_predecessors(self, node_id: str, k: int = 1, **filters: Any) -> List[str]:
+        return [n for n, _ in self.k_hop(node_id, k, "in", **filters)]
+
+def default_snapshot_dir(edges_csv: Path) -> Path:
+    edges_csv = Path(edges_csv)
+    return edges_csv.with_name(edges_csv.name + ".kgsnap")
+
+def save_snapshot(graph: CompactGraph, folder: Path, sources: Sequence[Path]) -> None:
+    """
+    Write `graph` as `.npy` arrays plus a manifest recording the source CSV fingerprints.
+
+    The arrays go to a fresh version subdirectory and the manifest, which names that
+    subdirectory, is swapped in with `os.replace`; readers see the old snapshot or the new one,
+    never a half-written or missing one.
+    """
+    _write_snapshot(graph, folder, {"sources": [file_fingerprint(p) for p in sources]})
+
+def _read_manifest(folder: Path) -> Optional[Dict[str, Any]]:
+    try:
+        manifest = json.loads((folder / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+@metrics.timed("graphstore.write_snapshot")
+def _write_snapshot(graph: CompactGraph, folder: Path, provenance: Dict[str, Any]) -> None:
+    folder = Path(folder)
+    previous = _read_manifest(folder)
+    if folder.exists() and (previous is None or previous.get("version") != SNAPSHOT_VERSION):
+        # Nothing in an older layout is readable by this version, so it can go up front
+        shutil.rmtree(folder)
+        previous = None
+    folder.mkdir(parents=True, exist_ok=True)
+    data = f"v-{uuid.uuid4().hex[:12]}"
+    tmp = folder / f".tmp-{data}"
+    tmp.mkdir()
+    try:
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(graph, name), allow_pickle=False)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    os.replace(tmp, folder / data)
+    manifest: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "data": data,
+        "num_nodes": graph.num_nodes,
+        "num_edges": graph.num_edges,
+        **provenance,
+    }
+    staged = folder / f".{MANIFEST_NAME}.{data}"
+    staged.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(staged, folder / MANIFEST_NAME)
+    # Readers that opened the replaced version keep their mappings after it is unlinked
+    if previous is not None and previous.get("data") not in (None, data):
+        shutil.rmtree(folder / str(previous["data"]), ignore_errors=True)
+
+@metrics.timed("graphstore.load_snapshot")
+def load_snapshot(
+    folder: Path, sources: Optional[Sequence[Path]] = None, mmap: bool = True
+) -> Optional[CompactGraph]:
+    """
+    Load a snapshot, memory-mapping its arrays. Returns None when the snapshot is missing,
+    from another format version, or (if `sources` is given) stale against the source CSVs.
+    """
+    folder = Path(folder)
+    mode: Optional[Literal["r", "r+", "c"]] = "r" if mmap else None
+    # A concurrent writer may remove the version named by the manifest we just read; the
+    # manifest then already names its replacement, so read it again.
+    for _ in range(3):
+        manifest = _read_manifest(folder)
+        if manifest is None or manifest.get("version") != SNAPSHOT_VERSION:
+            return None
+        if sources is not None:
+            recorded = manifest.get("sources", [])
+            if len(recorded) != len(sources):
+                return None
+            if not all(fingerprint_matches(r, p) for r, p in zip(recorded, sources)):
+                return None
+        data = folder / str(manifest["data"])
+        try:
+            arrays = {
+                name: np.load(data / f"{name}.npy", mmap_mode=mode, allow_pickle=False)
+                for name in _ARRAYS
+            }
+        except FileNotFoundError:
+            continue
+        return CompactGraph(**arrays)
+    return None
+
+def load_or_build(
+    nodes_csv: Path, edges_csv: Path, snapshot_dir: Optional[Path] = None
+) -> CompactGraph:
+    """
+    Return the snapshot for these CSVs, rebuilding (and re-saving) it when missing or stale.
+    """
+    folder = Path(snapshot_dir) if snapshot_dir is not None else default_snapshot_dir(edges_csv)
+    sources = [Path(nodes_csv), Path(edges_csv)]
+    graph = load_snapshot(folder, sources)
+    if graph is None:
+        from .kg import read_edges_csv, read_nodes_csv
+
+        graph = CompactGraph.from_frames(read_nodes_csv(nodes_csv), read_edges_csv(edges_csv))
+        save_snapshot(graph, folder, sources)
+    return graph
+
+def update_snapshot(
+    folder: Path,
+    node_delta_csv: Optional[Path] = None,
+    edge_delta_csv: Optional[Path] = None,
+) -> DeltaStats:
+    """
+    Apply node/edge delta CSVs to an existing snapshot and rewrite it in place.
+
+    The manifest keeps the fingerprints of the original source CSVs, so `load_or_build`
+    keeps serving the updated snapshot until those sources change (a rebuild from the
+    sources then discards the applied deltas). Applied delta files are listed under "deltas".
+    """
+    from .kg import read_edge_delta_csv, read_node_delta_csv
+
+    folder = Path(folder)
+    graph = load_snapshot(folder)
+    if graph is None:
+        raise FileNotFoundError(f"No graph snapshot at {folder}")
+    manifest = json.loads((folder / MANIFEST_NAME).read_text(encoding="utf-8"))
+    node_delta = read_node_delta_csv(node_delta_csv) if node_delta_csv is not None else None
+    edge_delta = read_edge_delta_csv(edge_delta_csv) if edge_delta_csv is not None else None
+    updated, stats = graph.apply_delta(node_delta, edge_delta)
+    applied = [Path(p) for p in (node_delta_csv, edge_delta_csv) if p is not None]
+    _write_snapshot(
+        updated,
+        folder,
+        {
+            "sources": manifest.get("sources", []),
+            "deltas": manifest.get("deltas", []) + [file_fingerprint(p) for p in applied],
+        },
+    )
+    return stats
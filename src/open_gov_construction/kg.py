@@ -1,37 +1,329 @@
 from __future__ import annotations
 
+import gc
+import gzip
+import io
+import json
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
 
 import networkx as nx
+import numpy as np
 import pandas as pd
 
-def build_graph(nodes_csv: Path, edges_csv: Path) -> nx.MultiDiGraph:
+from . import metrics
+from .colcache import cached_frame
+from .utils import get_execution_config
+
+NODE_COLUMNS: Tuple[str, ...] = ("id", "label", "type")
+EDGE_COLUMNS: Tuple[str, ...] = ("src", "dst", "rel")
+
+# Rough in-memory size of one parsed row of three short string columns
+_ROW_BYTES = 256
+
+def _read_columns(path: Path, columns: Sequence[str], kind: str) -> pd.DataFrame:
+    """
+    Read only `columns` from a CSV as strings (empty cells become "").
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    for c in columns:
+        if c not in header:
+            raise ValueError(f"Missing {kind} column: {c}")
+    return pd.read_csv(path, usecols=list(columns), dtype=str, keep_default_na=False)[list(columns)]
+
+def _iter_column_chunks(
+    path: Path, columns: Sequence[str], kind: str, chunksize: Optional[int]
+) -> Iterator[pd.DataFrame]:
+    if chunksize is None:
+        chunksize = get_execution_config().rows_per_chunk(_ROW_BYTES)
+    header = pd.read_csv(path, nrows=0).columns
+    for c in columns:
+        if c not in header:
+            raise ValueError(f"Missing {kind} column: {c}")
+    with pd.read_csv(
+        path, usecols=list(columns), dtype=str, keep_default_na=False, chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            yield chunk[list(columns)]
+
+def _read_nodes(path: Path) -> pd.DataFrame:
+    return _read_columns(path, NODE_COLUMNS, "node")
+
+def _read_edges(path: Path) -> pd.DataFrame:
+    return _read_columns(path, EDGE_COLUMNS, "edge")
+
+@metrics.timed("kg.read_nodes_csv")
+def read_nodes_csv(path: Path) -> pd.DataFrame:
+    nodes = cached_frame(path, "kg_nodes", _read_nodes)
+    metrics.count("nodes", len(nodes))
+    return nodes
+
+@metrics.timed("kg.read_edges_csv")
+def read_edges_csv(path: Path) -> pd.DataFrame:
+    edges = cached_frame(path, "kg_edges", _read_edges)
+    metrics.count("edges", len(edges))
+    return edges
+
+TOMBSTONE_COLUMN = "deleted"
+_TRUTHY = ("1", "true", "t", "yes", "y")
+
+def _read_delta(path: Path, columns: Sequence[str], kind: str) -> pd.DataFrame:
+    header = pd.read_csv(path, nrows=0).columns
+    cols = list(columns) + ([TOMBSTONE_COLUMN] if TOMBSTONE_COLUMN in header else [])
+    df = _read_columns(path, cols, kind)
+    tomb = (
+        df.pop(TOMBSTONE_COLUMN)
+        if TOMBSTONE_COLUMN in df.columns
+        else pd.Series("", index=df.index)
+    )
+    df[TOMBSTONE_COLUMN] = tomb.str.strip().str.lower().isin(_TRUTHY)
+    return df
+
+def read_node_delta_csv(path: Path) -> pd.DataFrame:
+    """
+    Node delta rows: id,label,type plus an optional `deleted` tombstone column (1/true/yes).
+    Returned frames always carry a boolean `deleted` column.
+    """
+    return _read_delta(path, NODE_COLUMNS, "node")
+
+def read_edge_delta_csv(path: Path) -> pd.DataFrame:
+    """
+    Edge delta rows: src,dst,rel plus an optional `deleted` tombstone column.
+    """
+    return _read_delta(path, EDGE_COLUMNS, "edge")
+
+def _preview(values: Iterable[str], limit: int = 5) -> str:
+    vals = list(dict.fromkeys(values))
+    more = f" (+{len(vals) - limit} more)" if len(vals) > limit else ""
+    return ", ".join(vals[:limit]) + more
+
+def validate_graph_frames(nodes: pd.DataFrame, edges: pd.DataFrame) -> None:
+    """
+    Raise ValueError on duplicate node ids or edges whose endpoints are not in `nodes`.
+    """
+    dup = nodes["id"].duplicated(keep=False)
+    if dup.any():
+        raise ValueError(f"Duplicate node ids: {_preview(nodes.loc[dup, 'id'])}")
+    known = pd.Index(nodes["id"])
+    dangling = ~edges["src"].isin(known) | ~edges["dst"].isin(known)
+    if dangling.any():
+        bad = edges.loc[dangling]
+        missing = pd.concat([bad["src"], bad["dst"]])
+        raise ValueError(
+            f"Edges reference unknown nodes: {_preview(missing[~missing.isin(known)])}"
+        )
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Bulk-loading millions of small dicts otherwise triggers repeated full collections that
+    # rescan the whole (acyclic) adjacency structure being built. gc.disable() is process-wide,
+    # so the pause is only taken when no other thread is running (not, say, from a project-run
+    # stage on a pool thread) and nobody else has already switched collection off.
+    if threading.active_count() > 1 or not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+@metrics.timed("kg.graph_from_frames")
+def graph_from_frames(nodes: pd.DataFrame, edges: pd.DataFrame) -> nx.MultiDiGraph:
+    """
+    Load node/edge frames into a MultiDiGraph identical to adding them row by row.
+    """
+    with _gc_paused():
+        return _load_frames(nodes, edges)
+
+def _load_frames(nodes: pd.DataFrame, edges: pd.DataFrame) -> nx.MultiDiGraph:
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(
+        (nid, {"label": label, "type": typ})
+        for nid, label, typ in zip(
+            nodes["id"].tolist(), nodes["label"].tolist(), nodes["type"].tolist()
+        )
+    )
+    # Endpoints missing from `nodes` are created bare, in the order add_edge would meet them
+    endpoints = pd.Series(
+        np.column_stack([edges["src"].to_numpy(), edges["dst"].to_numpy()]).ravel()
+    )
+    G.add_nodes_from(pd.unique(endpoints[~endpoints.isin(pd.Index(nodes["id"]))]).tolist())
+    # Multi-edge keys are assigned in bulk: the k-th edge between u and v gets key k, as
+    # new_edge_key would
+    keys = edges.groupby(["src", "dst"], sort=False).cumcount()
+    _add_keyed_edges(
+        G, edges["src"].tolist(), edges["dst"].tolist(), keys.tolist(), edges["rel"].tolist()
+    )
+    return G
+
+def _fast_edges_supported(G: nx.MultiDiGraph) -> bool:
+    """
+    Whether `G` has the MultiDiGraph layout networkx 3.x uses: `_succ`/`_pred` dicts of
+    neighbor dicts sharing one plain key dict per (u, v).
+    """
+    return (
+        nx.__version__.split(".")[0] == "3"
+        and type(G) is nx.MultiDiGraph
+        and isinstance(getattr(G, "_succ", None), dict)
+        and isinstance(getattr(G, "_pred", None), dict)
+        and G.edge_key_dict_factory is dict
+        and G.edge_attr_dict_factory is dict
+    )
+
+def _add_keyed_edges(
+    G: nx.MultiDiGraph, src: List[str], dst: List[str], keys: List[int], rels: List[str]
+) -> None:
+    """
+    `G.add_edges_from` for edges with explicit keys between existing nodes.
+
+    add_edges_from costs an add_edge call plus an AdjacencyView per edge, so on the supported
+    networkx layout the shared succ/pred key dicts are filled directly; anything else falls
+    back to the public API. Both produce the same graph (see tests/test_kg.py).
+    """
+    if not _fast_edges_supported(G):
+        G.add_edges_from((u, v, k, {"rel": rel}) for u, v, k, rel in zip(src, dst, keys, rels))
+        return
+    succ, pred = G._succ, G._pred
+    for u, v, k, rel in zip(src, dst, keys, rels):
+        nbrs = succ[u]
+        keydict = nbrs.get(v)
+        if keydict is None:
+            keydict = nbrs[v] = pred[v][u] = {}
+        keydict[k] = {"rel": rel}
+
+def build_graph(nodes_csv: Path, edges_csv: Path, strict: bool = False) -> nx.MultiDiGraph:
     """
     Build a knowledge graph from nodes and edges CSVs.
 
     nodes: id,label,type
     edges: src,dst,rel
+
+    Columns are read as strings and loaded in bulk. With `strict`, duplicate node ids and
+    edges to undeclared nodes raise ValueError; otherwise the last duplicate row's attributes
+    win and dangling endpoints are added as attribute-less nodes.
     """
-    nodes = pd.read_csv(nodes_csv)
-    edges = pd.read_csv(edges_csv)
-    for c in ("id", "label", "type"):
-        if c not in nodes.columns:
-            raise ValueError(f"Missing node column: {c}")
-    for c in ("src", "dst", "rel"):
-        if c not in edges.columns:
-            raise ValueError(f"Missing edge column: {c}")
-    G = nx.MultiDiGraph()
-    for _, r in nodes.iterrows():
-        G.add_node(str(r["id"]), label=str(r["label"]), type=str(r["type"]))
-    for _, r in edges.iterrows():
-        G.add_edge(str(r["src"]), str(r["dst"]), rel=str(r["rel"]))
-    return G
+    nodes = read_nodes_csv(nodes_csv)
+    edges = read_edges_csv(edges_csv)
+    if strict:
+        validate_graph_frames(nodes, edges)
+    return graph_from_frames(nodes, edges)
 
 def neighbors_of(G: nx.MultiDiGraph, node_id: str) -> List[str]:
     return list(G.successors(node_id))
 
+@metrics.timed("kg.save_graphml")
 def save_graphml(G: nx.MultiDiGraph, path: Path) -> None:
     nx.write_graphml(G, path)
 
+def _open_text_out(path: Path, compress: Optional[bool]) -> TextIO:
+    if compress is None:
+        compress = Path(path).suffix == ".gz"
+    if compress:
+        return io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8", newline="\n")
+    return open(path, "w", encoding="utf-8", newline="\n")
+
+_GRAPHML_HEADER = """<?xml version='1.0' encoding='utf-8'?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" \
+xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns \
+http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">
+  <key id="d0" for="node" attr.name="label" attr.type="string" />
+  <key id="d1" for="node" attr.name="type" attr.type="string" />
+  <key id="d2" for="edge" attr.name="rel" attr.type="string" />
+  <graph edgedefault="directed">
+"""
+_GRAPHML_FOOTER = "  </graph>\n</graphml>\n"
+
+@metrics.timed("kg.export_graphml_stream")
+def export_graphml_stream(
+    nodes_csv: Path,
+    edges_csv: Path,
+    out_path: Path,
+    chunksize: Optional[int] = None,
+    compress: Optional[bool] = None,
+) -> Tuple[int, int]:
+    """
+    Write GraphML straight from the node/edge CSVs, one chunk at a time (constant memory;
+    `chunksize` rows, default sized by the execution config).
+
+    No graph is built, so rows are written as they are: repeated node ids appear more than
+    once and undeclared edge endpoints get no <node> element (graph readers, including
+    networkx, merge or create these). Output is gzipped when `compress` is set or the path
+    ends in ".gz". Returns (node rows, edge rows) written.
+    """
+    n_nodes = n_edges = 0
+    with _open_text_out(out_path, compress) as fh:
+        fh.write(_GRAPHML_HEADER)
+        for chunk in _iter_column_chunks(nodes_csv, NODE_COLUMNS, "node", chunksize):
+            fh.write(
+                "".join(
+                    f'    <node id={quoteattr(i)}>\n      <data key="d0">{escape(lb)}</data>\n'
+                    f'      <data key="d1">{escape(t)}</data>\n    </node>\n'
+                    for i, lb, t in zip(
+                        chunk["id"].tolist(), chunk["label"].tolist(), chunk["type"].tolist()
+                    )
+                )
+            )
+            n_nodes += len(chunk)
+        for chunk in _iter_column_chunks(edges_csv, EDGE_COLUMNS, "edge", chunksize):
+            fh.write(
+                "".join(
+                    f"    <edge source={quoteattr(u)} target={quoteattr(v)}>\n"
+                    f'      <data key="d2">{escape(r)}</data>\n    </edge>\n'
+                    for u, v, r in zip(
+                        chunk["src"].tolist(), chunk["dst"].tolist(), chunk["rel"].tolist()
+                    )
+                )
+            )
+            n_edges += len(chunk)
+        fh.write(_GRAPHML_FOOTER)
+    metrics.count("nodes", n_nodes)
+    metrics.count("edges", n_edges)
+    return n_nodes, n_edges
+
+@metrics.timed("kg.export_jsonl_stream")
+def export_jsonl_stream(
+    nodes_csv: Path,
+    edges_csv: Path,
+    out_path: Path,
+    chunksize: Optional[int] = None,
+    compress: Optional[bool] = None,
+) -> Tuple[int, int]:
+    """
+    Write JSON Lines from the node/edge CSVs with constant memory: one
+    {"kind": "node", "id", "label", "type"} object per node row, then one
+    {"kind": "edge", "src", "dst", "rel"} object per edge row. Same chunking and
+    compression rules as `export_graphml_stream`. Returns (node rows, edge rows) written.
+    """
+    n_nodes = n_edges = 0
+    dumps = json.dumps
+    with _open_text_out(out_path, compress) as fh:
+        for chunk in _iter_column_chunks(nodes_csv, NODE_COLUMNS, "node", chunksize):
+            fh.write(
+                "".join(
+                    dumps({"kind": "node", "id": i, "label": lb, "type": t}) + "\n"
+                    for i, lb, t in zip(
+                        chunk["id"].tolist(), chunk["label"].tolist(), chunk["type"].tolist()
+                    )
+                )
+            )
+            n_nodes += len(chunk)
+        for chunk in _iter_column_chunks(edges_csv, EDGE_COLUMNS, "edge", chunksize):
+            fh.write(
+                "".join(
+                    dumps({"kind": "edge", "src": u, "dst": v, "rel": r}) + "\n"
+                    for u, v, r in zip(
+                        chunk["src"].tolist(), chunk["dst"].tolist(), chunk["rel"].tolist()
+                    )
+                )
+            )
+            n_edges += len(chunk)
+    metrics.count("nodes", n_nodes)
+    metrics.count("edges", n_edges)
+    return n_nodes, n_edges
+
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import socket
+import stat
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from .graphstore import CompactGraph
+from .utils import LRUCache
+
+OPS = ("neighbors", "khop", "path")
+_MISSING = object()
+
+class KGQueryEngine:
+    """
+    Answers JSON queries against a loaded CompactGraph, caching results by query.
+
+    Requests are objects with an `op` and its arguments; an optional `id` is echoed back:
+
+        {"op": "neighbors", "node": "C001", "direction": "out", "rels": ["references"]}
+        {"op": "khop", "node": "C001", "k": 2, "direction": "in", "types": ["record"]}
+        {"op": "path", "src": "C001", "dst": "SUB-001", "rels": ["contains"]}
+
+    Responses are {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false, "error": ...}.
+    """
+
+    def __init__(self, graph: CompactGraph, cache_size: int = 10_000) -> None:
+        self.graph = graph
+        self.cache: LRUCache[Any] = LRUCache(cache_size)
+        # Guards the cache only, so `answer` may run on several threads at once
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _field(req: Dict[str, Any], name: str) -> str:
+        if name not in req:
+            raise ValueError(f"Missing field: {name}")
+        return str(req[name])
+
+    def _run(self, req: Dict[str, Any]) -> Any:
+        g = self.graph
+        op = req.get("op", "neighbors")
+        direction = req.get("direction", "out")
+        if direction not in ("out", "in"):
+            raise ValueError("direction must be 'out' or 'in'")
+        rels = req.get("rels")
+        if op == "neighbors":
+            if rels is None and direction == "out":
+                return g.successors(self._field(req, "node"))
+            if rels is None:
+                return g.predecessors(self._field(req, "node"))
+            return [n for n, _ in g.k_hop(self._field(req, "node"), 1, direction, rels=rels)]
+        if op == "khop":
+            found = g.k_hop(
+                self._field(req, "node"),
+                int(req.get("k", 1)),
+                direction,
+                rels=rels,
+                node_types=req.get("types"),
+            )
+            return [{"node": n, "hops": d} for n, d in found]
+        if op == "path":
+            return g.shortest_path(
+                self._field(req, "src"),
+                self._field(req, "dst"),
+                direction,
+                rels=rels,
+                max_hops=req.get("max_hops"),
+            )
+        raise ValueError(f"Unknown op '{op}'. Supported: {', '.join(OPS)}")
+
+    @staticmethod
+    def _key(req: Dict[str, Any]) -> str:
+        return json.dumps({k: v for k, v in req.items() if k != "id"}, sort_keys=True)
+
+    def answer(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        resp: Dict[str, Any] = {"id": req.get("id")} if "id" in req else {}
+        try:
+            key = self._key(req)
+            with self._lock:
+                result = self.cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = self._run(req)
+                with self._lock:
+                    self.cache.put(key, result)
+        except KeyError as exc:
+            # CompactGraph.index_of: unknown node id
+            resp.update(ok=False, error=str(exc.args[0]))
+            return resp
+        except (TypeError, ValueError) as exc:
+            resp.update(ok=False, error=str(exc))
+            return resp
+        resp.update(ok=True, result=result)
+        return resp
+
+    def answer_line(self, line: str) -> str:
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as exc:
+            return json.dumps({"ok": False, "error": f"Bad request: {exc}"})
+        return json.dumps(self.answer(req))
+
+def serve_lines(engine: KGQueryEngine, infile: TextIO, outfile: TextIO) -> int:
+    """
+    Answer newline-delimited JSON requests until EOF, flushing after each reply.
+    Returns the number of requests answered.
+    """
+    n = 0
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(engine.answer_line(line) + "\n")
+        outfile.flush()
+        n += 1
+    return n
+
+async def _handle(
+    engine: KGQueryEngine, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                # On a worker thread, so a long path or k-hop query does not stall other clients
+                reply = await loop.run_in_executor(None, engine.answer_line, line.decode("utf-8"))
+            except UnicodeDecodeError as exc:
+                reply = json.dumps({"ok": False, "error": f"Bad request: not UTF-8 ({exc.reason})"})
+            writer.write(reply.encode("utf-8") + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+def _clear_stale_socket(path: Path) -> None:
+    """
+    Remove a socket file left behind by a server that is no longer running. A socket that
+    still accepts connections, or a path that is not a socket, raises instead.
+    """
+    try:
+        mode = path.stat().st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            path.unlink(missing_ok=True)
+            return
+    raise OSError(f"{path} is in use by a running server")
+
+async def start_server(
+    engine: KGQueryEngine,
+    socket_path: Optional[Path] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> asyncio.Server:
+    """
+    Start an NDJSON server on a Unix socket (`socket_path`) or TCP `host:port`.
+    Each connection may send any number of requests, one per line.
+    """
+    handler = functools.partial(_handle, engine)
+    if socket_path is not None:
+        _clear_stale_socket(Path(socket_path))
+        return await asyncio.start_unix_server(handler, path=str(socket_path))
+    return await asyncio.start_server(handler, host=host, port=port)
+
+def batch_queries(
+    engine: KGQueryEngine,
+    node_ids: Iterable[str],
+    template: Dict[str, Any],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Apply the query `template` (without a node) to every id in `node_ids`, yielding
+    (node id, response) pairs in input order.
+    """
+    for nid in node_ids:
+        yield nid, engine.answer({**template, "node": nid})
+
+def iter_node_ids(path: Path) -> Iterator[str]:
+    """
+    Node ids from a text file, one per line (blank lines skipped).
+    """
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield line.strip()
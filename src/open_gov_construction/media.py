@@ -1,13 +1,62 @@
 from __future__ import annotations
 
+import csv
+import fnmatch
+import heapq
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 import numpy as np
 from PIL import Image, ImageOps
 
-@dataclass(frozen=True)
+from . import metrics
+from .utils import get_execution_config
+
+IMAGE_EXTENSIONS: Tuple[str, ...] = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+INVENTORY_COLUMNS: Tuple[str, ...] = ("path", "width", "height", "brightness", "phash")
+METADATA_COLUMNS: Tuple[str, ...] = (
+    "path",
+    "format",
+    "width",
+    "height",
+    "file_size",
+    "captured_at",
+    "gps_lat",
+    "gps_lon",
+    "camera_make",
+    "camera_model",
+)
+
+# What Pillow raises for corrupt, truncated or unsupported files
+_READ_ERRORS: Tuple[type[Exception], ...] = (
+    OSError,
+    SyntaxError,
+    ValueError,
+    Image.DecompressionBombError,
+)
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+@dataclass(frozen=True, slots=True)
 class ImageInfo:
     path: str
     width: int
@@ -15,6 +64,19 @@ class ImageInfo:
     brightness: float
     phash: int
 
+@dataclass(frozen=True, slots=True)
+class ImageMeta:
+    path: str
+    format: str
+    width: int
+    height: int
+    file_size: int
+    captured_at: str  # ISO 8601 from EXIF, "" when absent
+    gps_lat: Optional[float]
+    gps_lon: Optional[float]
+    camera_make: str
+    camera_model: str
+
 def _phash(image: Image.Image, hash_size: int = 8) -> int:
     """
     Simple perceptual hash: resize -> DCT-like via FFT of grayscale -> compare to median magnitude.
@@ -36,26 +98,121 @@ def _brightness(image: Image.Image) -> float:
     arr = np.asarray(g, dtype=np.float32)
     return float(np.mean(arr) / 255.0)
 
-def scan_images(folder: Path) -> List[ImageInfo]:
-    infos: List[ImageInfo] = []
-    for p in sorted(Path(folder).glob("*")):
-        if p.suffix.lower() not in (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"):
-            continue
-        with Image.open(p) as im:
-            im.load()
-            info = ImageInfo(
-                path=str(p),
-                width=im.width,
-                height=im.height,
-                brightness=_brightness(im),
-                phash=_phash(im),
-            )
-            infos.append(info)
-    return infos
+def _matches(rel_path: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch.fnmatch(rel_path, pat) for pat in patterns)
+
+def iter_image_paths(
+    folder: Path,
+    recursive: bool = True,
+    extensions: Sequence[str] = IMAGE_EXTENSIONS,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+) -> Iterator[Path]:
+    """
+    Yield image paths under `folder` using `os.scandir`, depth-first in sorted name order
+    (a directory's files before its subdirectories).
+
+    `include`/`exclude` are glob patterns matched against the POSIX path relative to `folder`.
+    Excluded directories are pruned without being listed. Only one directory listing is held
+    in memory per level, so memory stays flat on deeply nested archives.
+    """
+    root = Path(folder)
+    exts = {e.lower() if e.startswith(".") else f".{e.lower()}" for e in extensions}
+    stack: List[Tuple[str, str]] = [(str(root), "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        subdirs: List[Tuple[str, str]] = []
+        for entry in entries:
+            rel = f"{rel_dir}{entry.name}"
+            if exclude and _matches(rel, exclude):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subdirs.append((entry.path, f"{rel}/"))
+                continue
+            if not entry.is_file():
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in exts:
+                continue
+            if include and not _matches(rel, include):
+                continue
+            yield Path(entry.path)
+        # Reverse so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
+
+@metrics.timed("media.decode")
+def read_image_info(path: Path) -> ImageInfo:
+    with Image.open(path) as im:
+        im.load()
+        return ImageInfo(
+            path=str(path),
+            width=im.width,
+            height=im.height,
+            brightness=_brightness(im),
+            phash=_phash(im),
+        )
+
+def iter_images(
+    folder: Path,
+    recursive: bool = True,
+    extensions: Sequence[str] = IMAGE_EXTENSIONS,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[Path, Exception], None]] = None,
+) -> Iterator[ImageInfo]:
+    """
+    Lazily decode and fingerprint every image found by `iter_image_paths`, on `workers`
+    threads (default: the execution config's worker count). Results are yielded in walk order.
+
+    With `on_error`, files that cannot be read are passed to it and skipped; without, the
+    first one raises.
+    """
+    paths = iter_image_paths(
+        folder, recursive=recursive, extensions=extensions, include=include, exclude=exclude
+    )
+    yield from _read_each(
+        read_image_info,
+        paths,
+        get_execution_config().workers if workers is None else workers,
+        on_error,
+    )
+
+def scan_images(
+    folder: Path, recursive: bool = False, workers: Optional[int] = None
+) -> List[ImageInfo]:
+    return list(iter_images(folder, recursive=recursive, workers=workers))
+
+@metrics.timed("media.write_inventory_csv")
+def write_inventory_csv(
+    infos: Iterable[ImageInfo],
+    out_path: Path,
+    on_row: Optional[Callable[[ImageInfo], None]] = None,
+) -> int:
+    """
+    Consume `infos`, writing one inventory row per image as it is produced.
+
+    `on_row` is called after each row is written (progress reporting, collecting hashes).
+    Returns the number of rows written.
+    """
+    n = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(INVENTORY_COLUMNS)
+        for info in infos:
+            writer.writerow([info.path, info.width, info.height, info.brightness, info.phash])
+            n += 1
+            if on_row is not None:
+                on_row(info)
+    metrics.count("images", n)
+    return n
 
 def hamming(a: int, b: int) -> int:
-    return int(bin(a ^ b).count("1"))
+    return (a ^ b).bit_count()
 
+@metrics.timed("media.find_duplicates")
 def find_duplicates(infos: List[ImageInfo], max_distance: int = 5) -> List[Tuple[ImageInfo, ImageInfo, int]]:
     """
     Return pairs of images with perceptual hash Hamming distance <= max_distance.
@@ -68,3 +225,437 @@ def find_duplicates(infos: List[ImageInfo], max_distance: int = 5) -> List[Tuple
                 pairs.append((infos[i], infos[j], d))
     return pairs
 
+def read_inventory_rows(csv_path: Path, rows: Iterable[int]) -> Dict[int, ImageInfo]:
+    """
+    Stream an inventory written by `write_inventory_csv` and return the wanted rows (0-based,
+    header excluded) keyed by row number. Reading stops after the last wanted row.
+    """
+    wanted = set(rows)
+    found: Dict[int, ImageInfo] = {}
+    if not wanted:
+        return found
+    last = max(wanted)
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        next(reader, None)
+        for i, row in enumerate(reader):
+            if i in wanted:
+                found[i] = ImageInfo(
+                    path=row[0],
+                    width=int(row[1]),
+                    height=int(row[2]),
+                    brightness=float(row[3]),
+                    phash=int(row[4]),
+                )
+            if i >= last:
+                break
+    return found
+
+@dataclass(frozen=True)
+class DuplicateCluster:
+    cluster_id: int
+    representative: ImageInfo
+    members: List[Tuple[ImageInfo, int]]  # (image, Hamming distance to representative)
+
+class _UnionFind:
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+        self.rank = [0] * n
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+
+def _band_masks(max_distance: int, hash_bits: int) -> List[Tuple[int, int]]:
+    # Pigeonhole: two hashes within `max_distance` bits agree exactly on at least one of
+    # `max_distance + 1` disjoint bands, so only images sharing a band value are compared.
+    if max_distance < 0:
+        raise ValueError("max_distance must be >= 0")
+    if max_distance >= hash_bits:
+        # Every pair is within range; one empty band puts all hashes in a single bucket
+        return [(0, 0)]
+    n_bands = max_distance + 1
+    bands: List[Tuple[int, int]] = []
+    start = 0
+    for i in range(n_bands):
+        width = hash_bits // n_bands + (1 if i < hash_bits % n_bands else 0)
+        bands.append((start, (1 << width) - 1))
+        start += width
+    return bands
+
+def _distinct(hashes: Sequence[int]) -> Tuple[List[int], List[int]]:
+    """
+    (distinct hash values in first-seen order, distinct id of each input hash).
+    """
+    ids: Dict[int, int] = {}
+    owner: List[int] = []
+    for h in hashes:
+        owner.append(ids.setdefault(h, len(ids)))
+    return list(ids), owner
+
+def cluster_hashes(
+    hashes: Sequence[int], max_distance: int = 5, hash_bits: int = 64
+) -> List[List[int]]:
+    """
+    Connected components (two or more indices, ascending) of the graph joining hashes whose
+    Hamming distance is <= max_distance.
+
+    Identical hashes are merged before banding. Within a band bucket each new hash is tested
+    against the members of every component already in the bucket, starting with the member
+    that founded it, and a component it already belongs to is skipped outright. Bursts of
+    near-identical photos therefore cost about one comparison per image per band; the remaining
+    members are only scanned when the first misses, which keeps chains exact.
+    """
+    distinct, owner = _distinct(hashes)
+    uf = _UnionFind(len(distinct))
+    for shift, mask in _band_masks(max_distance, hash_bits):
+        buckets: Dict[int, List[List[int]]] = {}
+        for x, h in enumerate(distinct):
+            key = (h >> shift) & mask
+            target: Optional[List[int]] = None
+            rest: List[List[int]] = []
+            for comp in buckets.get(key, ()):
+                if uf.find(comp[0]) == uf.find(x) or any(
+                    hamming(h, distinct[y]) <= max_distance for y in comp
+                ):
+                    uf.union(comp[0], x)
+                    if target is None:
+                        target = comp
+                    else:
+                        # Merge the smaller list into the larger so repeated joins stay linear
+                        if len(comp) > len(target):
+                            target, comp = comp, target
+                        target.extend(comp)
+                else:
+                    rest.append(comp)
+            if target is None:
+                target = []
+            target.append(x)
+            rest.append(target)
+            buckets[key] = rest
+
+    groups: Dict[int, List[int]] = {}
+    for idx, d in enumerate(owner):
+        groups.setdefault(uf.find(d), []).append(idx)
+    return [members for members in groups.values() if len(members) >= 2]
+
+def _ordered_index_pairs(a: Sequence[int], b: Sequence[int]) -> Iterator[Tuple[int, int]]:
+    """
+    Index pairs (i, j), i < j, taking one index from each ascending list (both from `a` when
+    `b` is `a`), in ascending order.
+    """
+    if a is b:
+        for s, i in enumerate(a):
+            for t in range(s + 1, len(a)):
+                yield i, a[t]
+        return
+    ia = ib = 0
+    # Walk the merged order; each index pairs with every later index of the other list
+    while ia < len(a) and ib < len(b):
+        if a[ia] < b[ib]:
+            ia += 1
+            yield from ((a[ia - 1], b[t]) for t in range(ib, len(b)))
+        else:
+            ib += 1
+            yield from ((b[ib - 1], a[t]) for t in range(ia, len(a)))
+
+@metrics.timed("media.duplicate_pairs")
+def duplicate_pairs(
+    hashes: Sequence[int],
+    max_distance: int = 5,
+    limit: int = 20,
+    hash_bits: int = 64,
+) -> Tuple[int, List[Tuple[int, int, int]]]:
+    """
+    Count the pairs `find_duplicates` would return for these hashes and list the first `limit`
+    of them, in the same order, as (i, j, distance) index triples.
+
+    Identical hashes are merged first, so k identical images count as k(k-1)/2 pairs in one
+    step, and only distinct hashes that share a band value are compared. Pairs are counted as
+    they are found and only the `limit` smallest are kept, so memory does not grow with the
+    number of pairs.
+    """
+    distinct, owner = _distinct(hashes)
+    members: List[List[int]] = [[] for _ in distinct]
+    for idx, d in enumerate(owner):
+        members[d].append(idx)
+    # Max-heap (negated indices) of the `limit` smallest (i, j) pairs seen so far
+    kept: List[Tuple[int, int, int]] = []
+
+    def offer(pairs: Iterator[Tuple[int, int]], d: int) -> None:
+        for i, j in pairs:
+            if len(kept) < limit:
+                heapq.heappush(kept, (-i, -j, d))
+            elif (i, j) < (-kept[0][0], -kept[0][1]):
+                heapq.heapreplace(kept, (-i, -j, d))
+            else:
+                # `pairs` ascends, so nothing later can be kept either
+                return
+
+    total = 0
+    for group in members:
+        total += len(group) * (len(group) - 1) // 2
+        if limit > 0:
+            offer(_ordered_index_pairs(group, group), 0)
+    bands = _band_masks(max_distance, hash_bits)
+    for b, (shift, mask) in enumerate(bands):
+        earlier = bands[:b]
+        buckets: Dict[int, List[int]] = {}
+        for x, h in enumerate(distinct):
+            bucket = buckets.setdefault((h >> shift) & mask, [])
+            for y in bucket:
+                diff = h ^ distinct[y]
+                d = diff.bit_count()
+                if d > max_distance:
+                    continue
+                # A pair sharing several bands is counted in the first of them only
+                for s, band in earlier:
+                    if not (diff >> s) & band:
+                        break
+                else:
+                    mx, my = members[x], members[y]
+                    total += len(mx) * len(my)
+                    # The pair's smallest (i, j) is its two first indices; skip it when that misses
+                    first = (min(mx[0], my[0]), max(mx[0], my[0]))
+                    if limit > 0 and (len(kept) < limit or first < (-kept[0][0], -kept[0][1])):
+                        offer(_ordered_index_pairs(my, mx), d)
+            bucket.append(x)
+    return total, sorted((-i, -j, d) for i, j, d in kept)
+
+def make_clusters(
+    infos: Mapping[int, ImageInfo], components: Iterable[Sequence[int]]
+) -> List[DuplicateCluster]:
+    """
+    Turn index components (from `cluster_hashes`) into numbered clusters. `infos` needs only
+    the indices that appear in `components`. The representative is the highest-resolution member
+    (ties: lexicographic path); clusters are numbered in representative path order.
+    """
+    found: List[Tuple[ImageInfo, List[ImageInfo]]] = []
+    for comp in components:
+        members = [infos[i] for i in comp]
+        rep = min(members, key=lambda m: (-m.width * m.height, m.path))
+        found.append((rep, sorted(members, key=lambda m: (m is not rep, m.path))))
+    found.sort(key=lambda f: f[0].path)
+    return [
+        DuplicateCluster(
+            cluster_id=cid,
+            representative=rep,
+            members=[(m, hamming(m.phash, rep.phash)) for m in members],
+        )
+        for cid, (rep, members) in enumerate(found, start=1)
+    ]
+
+@metrics.timed("media.cluster_duplicates")
+def cluster_duplicates(
+    infos: Sequence[ImageInfo],
+    max_distance: int = 5,
+    hash_bits: int = 64,
+) -> List[DuplicateCluster]:
+    """
+    Group images into duplicate clusters: connected components of the graph whose edges join
+    images with perceptual hash Hamming distance <= max_distance (see `cluster_hashes`).
+
+    The representative is the highest-resolution member (ties: lexicographic path).
+    Only clusters with two or more members are returned.
+    """
+    components = cluster_hashes(
+        [i.phash for i in infos], max_distance=max_distance, hash_bits=hash_bits
+    )
+    return make_clusters(dict(enumerate(infos)), components)
+
+def write_clusters_csv(clusters: Iterable[DuplicateCluster], out_path: Path) -> int:
+    """
+    Write one row per cluster member: cluster_id, path, distance, is_representative.
+    Returns the number of rows written.
+    """
+    n = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["cluster_id", "path", "distance", "is_representative"])
+        for c in clusters:
+            for info, d in c.members:
+                writer.writerow([c.cluster_id, info.path, d, info is c.representative])
+                n += 1
+    return n
+
+# EXIF tag ids (TIFF/EXIF 2.3)
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_TAG_MAKE = 271
+_TAG_MODEL = 272
+_TAG_DATETIME = 306
+_TAG_DATETIME_ORIGINAL = 36867
+
+def _exif_timestamp(raw: Any) -> str:
+    text = str(raw or "").strip().strip("\x00")
+    # EXIF stores "YYYY:MM:DD HH:MM:SS"
+    if len(text) >= 19 and text[4] == ":" and text[7] == ":":
+        return f"{text[0:4]}-{text[5:7]}-{text[8:10]}T{text[11:19]}"
+    return text
+
+def _gps_degrees(value: Any, ref: Any) -> Optional[float]:
+    try:
+        d, m, sec = (float(v) for v in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    deg = d + m / 60.0 + sec / 3600.0
+    return -deg if str(ref).strip().upper() in ("S", "W") else deg
+
+def _header_exif(im: Image.Image) -> Image.Exif:
+    """
+    EXIF parsed by `Image.open`. For PNG, `getexif()` decodes the whole image when there is no
+    eXIf chunk ahead of the pixel data, so PNG EXIF is taken from that chunk or from
+    ImageMagick's hex "Raw profile type exif" text chunk, and is otherwise treated as absent.
+    """
+    if im.format != "PNG":
+        return im.getexif()
+    exif = Image.Exif()
+    raw = im.info.get("exif")
+    profile = im.info.get("Raw profile type exif")
+    if raw is None and isinstance(profile, str):
+        # "\nexif\n    <length>\n<hex lines>"
+        raw = bytes.fromhex("".join(profile.split("\n")[3:]))
+    if raw:
+        exif.load(raw)
+    return exif
+
+@metrics.timed("media.read_header")
+def read_image_metadata(path: Path) -> ImageMeta:
+    """
+    Read dimensions, capture time, GPS position and camera from the image header only.
+
+    Pillow's `open` is lazy: the header and EXIF block are parsed but pixel data is never decoded.
+    """
+    p = Path(path)
+    with Image.open(p) as im:
+        exif = _header_exif(im)
+        sub = exif.get_ifd(_EXIF_IFD)
+        gps = exif.get_ifd(_GPS_IFD)
+        return ImageMeta(
+            path=str(p),
+            format=im.format or "",
+            width=im.width,
+            height=im.height,
+            file_size=p.stat().st_size,
+            captured_at=_exif_timestamp(sub.get(_TAG_DATETIME_ORIGINAL) or exif.get(_TAG_DATETIME)),
+            gps_lat=_gps_degrees(gps.get(2), gps.get(1)) if gps else None,
+            gps_lon=_gps_degrees(gps.get(4), gps.get(3)) if gps else None,
+            camera_make=str(exif.get(_TAG_MAKE, "")).strip().strip("\x00"),
+            camera_model=str(exif.get(_TAG_MODEL, "")).strip().strip("\x00"),
+        )
+
+def _bounded_map(fn: Callable[[_T], _R], items: Iterable[_T], workers: int) -> Iterator[_R]:
+    """
+    Ordered `map` over a thread pool that keeps at most `4 * workers` calls in flight.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    pending: Deque[Future[_R]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= 4 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _read_each(
+    fn: Callable[[Path], _R],
+    paths: Iterable[Path],
+    workers: int,
+    on_error: Optional[Callable[[Path, Exception], None]],
+) -> Iterator[_R]:
+    """
+    `_bounded_map(fn, paths)`, except that with `on_error` a file that cannot be read is
+    reported (on the consuming thread, in walk order) and skipped instead of ending the scan.
+    """
+    if on_error is None:
+        yield from _bounded_map(fn, paths, workers)
+        return
+
+    def attempt(path: Path) -> Tuple[Path, Optional[_R], Optional[Exception]]:
+        try:
+            return path, fn(path), None
+        except _READ_ERRORS as exc:
+            return path, None, exc
+
+    for path, result, exc in _bounded_map(attempt, paths, workers):
+        if exc is None:
+            yield cast(_R, result)
+            continue
+        metrics.count("images_skipped")
+        on_error(path, exc)
+
+def iter_image_metadata(
+    folder: Path,
+    recursive: bool = True,
+    extensions: Sequence[str] = IMAGE_EXTENSIONS,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[Path, Exception], None]] = None,
+) -> Iterator[ImageMeta]:
+    """
+    Header-only counterpart of `iter_images`, reading files on `workers` threads (I/O bound;
+    default: the execution config's `io_workers`). Results are yielded in walk order, and
+    `on_error` works as in `iter_images`.
+    """
+    paths = iter_image_paths(
+        folder, recursive=recursive, extensions=extensions, include=include, exclude=exclude
+    )
+    yield from _read_each(
+        read_image_metadata,
+        paths,
+        get_execution_config().io_workers if workers is None else workers,
+        on_error,
+    )
+
+@metrics.timed("media.write_metadata_csv")
+def write_metadata_csv(
+    metas: Iterable[ImageMeta],
+    out_path: Path,
+    on_row: Optional[Callable[[ImageMeta], None]] = None,
+) -> int:
+    """
+    Write a metadata inventory (METADATA_COLUMNS) keyed by `path`, which joins to the phash
+    inventory written by `write_inventory_csv`. Returns the number of rows written.
+    """
+    n = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(METADATA_COLUMNS)
+        for m in metas:
+            writer.writerow(
+                [
+                    m.path,
+                    m.format,
+                    m.width,
+                    m.height,
+                    m.file_size,
+                    m.captured_at,
+                    "" if m.gps_lat is None else m.gps_lat,
+                    "" if m.gps_lon is None else m.gps_lon,
+                    m.camera_make,
+                    m.camera_model,
+                ]
+            )
+            n += 1
+            if on_row is not None:
+                on_row(m)
+    metrics.count("images", n)
+    return n
+
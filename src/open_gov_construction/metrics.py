@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import functools
+import json
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    self_seconds: float = 0.0
+
+class _Recorder:
+    """
+    Process-wide timing spans and counters. Disabled by default; while disabled, `span`
+    hands out a shared no-op context and `count` returns immediately.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def stack(self) -> List["_Span"]:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+class _Span:
+    __slots__ = ("name", "start", "child")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.child = 0.0
+
+    def __enter__(self) -> "_Span":
+        _rec.stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        stack = _rec.stack()
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        with _rec.lock:
+            st = _rec.stages.get(self.name)
+            if st is None:
+                st = _rec.stages[self.name] = StageStats()
+            st.calls += 1
+            st.seconds += elapsed
+            st.self_seconds += elapsed - self.child
+
+_rec = _Recorder()
+_NULL: ContextManager[None] = nullcontext()
+
+def enable() -> None:
+    """
+    Start recording (clearing anything recorded before).
+    """
+    reset()
+    _rec.enabled = True
+
+def disable() -> None:
+    _rec.enabled = False
+
+def is_enabled() -> bool:
+    return _rec.enabled
+
+def reset() -> None:
+    with _rec.lock:
+        _rec.stages.clear()
+        _rec.counters.clear()
+        _rec.started = time.perf_counter()
+
+def span(name: str) -> ContextManager[Any]:
+    """
+    Time a block as stage `name`. Nested spans are charged to their parent's total but not
+    to its `self_seconds`.
+    """
+    return _Span(name) if _rec.enabled else _NULL
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Add `n` to counter `name` (rows, tasks, images, edges, ...).
+    """
+    if not _rec.enabled:
+        return
+    with _rec.lock:
+        _rec.counters[name] = _rec.counters.get(name, 0) + int(n)
+
+def timed(name: str) -> Callable[[_F], _F]:
+    """
+    Decorator form of `span` for whole functions.
+    """
+
+    def wrap(fn: _F) -> _F:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            if not _rec.enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return inner  # type: ignore[return-value]
+
+    return wrap
+
+def report() -> Dict[str, Any]:
+    """
+    Per-stage breakdown:
+    {"wall_seconds", "stages": {name: {calls, seconds, self_seconds}}, "counters"}.
+    Stages are ordered by total time, slowest first.
+    """
+    with _rec.lock:
+        stages = sorted(_rec.stages.items(), key=lambda kv: kv[1].seconds, reverse=True)
+        return {
+            "wall_seconds": round(time.perf_counter() - _rec.started, 6),
+            "stages": {
+                name: {
+                    "calls": st.calls,
+                    "seconds": round(st.seconds, 6),
+                    "self_seconds": round(st.self_seconds, 6),
+                }
+                for name, st in stages
+            },
+            "counters": dict(sorted(_rec.counters.items())),
+        }
+
+def write_json(path: Path, extra: Optional[Dict[str, Any]] = None) -> None:
+    data = {**(extra or {}), **report()}
+    Path(path).write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
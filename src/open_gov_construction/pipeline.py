@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import time
+import tomllib
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+from .states import StateProfile, get_state
+from .utils import ExecutionConfig, ExecutorKind, get_execution_config
+
+SUMMARY_NAME = "project_summary.json"
+
+@dataclass(frozen=True)
+class ScheduleSpec:
+    tasks: Path
+    iterations: int = 2000
+    seed: Optional[int] = None  # default: the execution config's seed
+
+@dataclass(frozen=True)
+class CostSpec:
+    items: Path
+    domestic_threshold: float = 55.0
+
+@dataclass(frozen=True)
+class MediaSpec:
+    folder: Path
+    dup_distance: int = 5
+    recursive: bool = True
+
+@dataclass(frozen=True)
+class KGSpec:
+    nodes: Path
+    edges: Path
+    snapshot: bool = True
+
+@dataclass(frozen=True)
+class ProjectManifest:
+    """
+    One project's inputs and settings, read from a TOML manifest:
+
+        [project]
+        name = "Bridge 12 Rehab"
+        state = "IN"
+        output_dir = "out"          # default: "<manifest stem>_out"
+
+        [schedule]                  # schedule-cpm + schedule-montecarlo
+        tasks = "tasks.csv"
+        iterations = 2000
+
+        [cost]                      # cost-compliance
+        items = "costs.csv"
+
+        [media]                     # media-scan
+        folder = "photos"
+
+        [kg]                        # kg-build
+        nodes = "nodes.csv"
+        edges = "edges.csv"
+
+    Every section but [project] is optional; relative paths resolve against the manifest's folder.
+    """
+
+    name: str
+    state: str
+    output_dir: Path
+    schedule: Optional[ScheduleSpec] = None
+    cost: Optional[CostSpec] = None
+    media: Optional[MediaSpec] = None
+    kg: Optional[KGSpec] = None
+
+_SECTIONS: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+    "schedule": (ScheduleSpec, ("tasks",)),
+    "cost": (CostSpec, ("items",)),
+    "media": (MediaSpec, ("folder",)),
+    "kg": (KGSpec, ("nodes", "edges")),
+}
+
+def _spec(section: str, raw: Dict[str, Any], base: Path) -> Any:
+    cls, path_keys = _SECTIONS[section]
+    allowed = {f.name for f in fields(cls)}
+    unknown = sorted(set(raw) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown key(s) in [{section}]: {', '.join(unknown)}")
+    for k in path_keys:
+        if k not in raw:
+            raise ValueError(f"Missing [{section}] key: {k}")
+    values = {k: (base / str(v) if k in path_keys else v) for k, v in raw.items()}
+    return cls(**values)
+
+def load_manifest(path: Path) -> ProjectManifest:
+    path = Path(path)
+    with open(path, "rb") as fh:
+        data = tomllib.load(fh)
+    base = path.parent
+    unknown = sorted(set(data) - {"project", *_SECTIONS})
+    if unknown:
+        raise ValueError(f"Unknown manifest section(s): {', '.join(unknown)}")
+    project = data.get("project", {})
+    for k in ("name", "state"):
+        if k not in project:
+            raise ValueError(f"Missing [project] key: {k}")
+    state = str(project["state"]).upper()
+    try:
+        get_state(state)  # type: ignore[arg-type]
+    except KeyError as exc:
+        raise ValueError(exc.args[0]) from None
+    out = base / str(project.get("output_dir", f"{path.stem}_out"))
+    specs = {name: _spec(name, data[name], base) for name in _SECTIONS if name in data}
+    return ProjectManifest(name=str(project["name"]), state=state, output_dir=out, **specs)
+
+# Stage bodies are module-level functions so they can run in a process pool.
+
+def _load_tasks(path: Path) -> List[Any]:
+    from .schedule import read_tasks_csv
+
+    return read_tasks_csv(path)
+
+def _stage_cpm(tasks: List[Any], out_csv: Path) -> Dict[str, Any]:
+    from .schedule import cpm, cpm_table
+
+    res = cpm(tasks)
+    cpm_table(res).to_csv(out_csv, index=False)
+    return {
+        "tasks": len(tasks),
+        "duration_days": res.project_duration_days,
+        "critical_path": res.critical_path,
+        "outputs": [str(out_csv)],
+    }
+
+def _stage_montecarlo(
+    tasks: List[Any], iterations: int, seed: Optional[int], config: ExecutionConfig
+) -> Dict[str, Any]:
+    from .schedule import monte_carlo_duration
+
+    p50, p80, p90 = monte_carlo_duration(tasks, iterations=iterations, seed=seed, config=config)
+    return {"iterations": iterations, "p50": p50, "p80": p80, "p90": p90, "outputs": []}
+
+def _stage_cost(spec: CostSpec, out_csv: Path, config: ExecutionConfig) -> Dict[str, Any]:
+    from .cost import BABAConfig, screen_baba_dbra
+
+    df = screen_baba_dbra(
+        spec.items,
+        out_csv,
+        baba=BABAConfig(domestic_content_threshold_pct=spec.domestic_threshold),
+        config=config,
+    )
+    flagged = df[df["flag_baba"] | df["flag_dbra"]]
+    return {
+        "rows": len(df),
+        "baba_flags": int(df["flag_baba"].sum()),
+        "dbra_flags": int(df["flag_dbra"].sum()),
+        "flagged_lines": [str(v) for v in flagged["line_id"].tolist()],
+        "flagged_cost_usd": float(flagged["cost_usd"].sum()),
+        "outputs": [str(out_csv)],
+    }
+
+def _stage_media(
+    spec: MediaSpec, out_csv: Path, clusters_csv: Path, config: ExecutionConfig
+) -> Dict[str, Any]:
+    from array import array
+
+    from .media import (
+        cluster_hashes,
+        iter_images,
+        make_clusters,
+        read_inventory_rows,
+        write_clusters_csv,
+        write_inventory_csv,
+    )
+
+    # As in media-scan: only the hashes stay in memory; cluster members are read back
+    # from the inventory
+    hashes = array("Q")
+    skipped: List[str] = []
+    images = iter_images(
+        spec.folder,
+        recursive=spec.recursive,
+        workers=config.workers,
+        on_error=lambda p, _: skipped.append(str(p)),
+    )
+    n = write_inventory_csv(images, out_csv, on_row=lambda info: hashes.append(info.phash))
+    components = cluster_hashes(hashes, max_distance=spec.dup_distance)
+    members = read_inventory_rows(out_csv, (i for c in components for i in c))
+    clusters = make_clusters(members, components)
+    dup_images = write_clusters_csv(clusters, clusters_csv)
+    return {
+        "images": n,
+        "skipped_files": skipped,
+        "duplicate_clusters": len(clusters),
+        "duplicate_images": dup_images,
+        "outputs": [str(out_csv), str(clusters_csv)],
+    }
+
+def _stage_kg(spec: KGSpec, out_graphml: Path) -> Dict[str, Any]:
+    from .graphstore import CompactGraph, default_snapshot_dir, save_snapshot
+    from .kg import graph_from_frames, read_edges_csv, read_nodes_csv, save_graphml
+
+    nodes = read_nodes_csv(spec.nodes)
+    edges = read_edges_csv(spec.edges)
+    G = graph_from_frames(nodes, edges)
+    save_graphml(G, out_graphml)
+    outputs = [str(out_graphml)]
+    if spec.snapshot:
+        folder = default_snapshot_dir(spec.edges)
+        save_snapshot(CompactGraph.from_frames(nodes, edges), folder, [spec.nodes, spec.edges])
+        outputs.append(str(folder))
+    return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges(), "outputs": outputs}
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[float, Any]:
+    t0 = time.perf_counter()
+    with metrics.span(f"pipeline.{fn.__name__.lstrip('_')}"):
+        result = fn(*args)
+    return time.perf_counter() - t0, result
+
+@dataclass
+class ProjectRun:
+    manifest: ProjectManifest
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+def run_project(
+    manifest: ProjectManifest,
+    workers: Optional[int] = None,
+    executor: Optional[ExecutorKind] = None,
+    config: Optional[ExecutionConfig] = None,
+) -> ProjectRun:
+    """
+    Run every stage the manifest configures on one pool.
+
+    Each input is parsed once: the task list is loaded a single time and shared by the CPM
+    and Monte Carlo stages, which start as soon as it is ready; the cost, media and graph
+    stages run alongside. A failing stage is recorded in `errors` and the others still run.
+
+    `workers` and `executor` override `config` (default: the process-wide execution config),
+    which is also handed to each stage so process workers size their batches the same way.
+    """
+    cfg = config or get_execution_config()
+    if workers is not None:
+        cfg = replace(cfg, workers=workers)
+    if executor is not None:
+        cfg = replace(cfg, executor=executor)
+    out = manifest.output_dir
+    out.mkdir(parents=True, exist_ok=True)
+    run = ProjectRun(manifest)
+    pending: Dict[Future[Any], str] = {}
+    with cfg.pool() as pool:
+        if manifest.schedule is not None:
+            pending[pool.submit(_timed, _load_tasks, manifest.schedule.tasks)] = "load_tasks"
+        if manifest.cost is not None:
+            cost_out = out / "cost_compliance.csv"
+            pending[pool.submit(_timed, _stage_cost, manifest.cost, cost_out, cfg)] = "cost"
+        if manifest.media is not None:
+            media_out = (out / "media_inventory.csv", out / "media_clusters.csv")
+            pending[pool.submit(_timed, _stage_media, manifest.media, *media_out, cfg)] = "media"
+        if manifest.kg is not None:
+            pending[pool.submit(_timed, _stage_kg, manifest.kg, out / "graph.graphml")] = "kg"
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    seconds, result = fut.result()
+                except Exception as exc:  # noqa: BLE001 - reported per stage
+                    run.errors[name] = f"{type(exc).__name__}: {exc}"
+                    continue
+                run.seconds[name] = seconds
+                if name == "load_tasks":
+                    spec = manifest.schedule
+                    assert spec is not None
+                    cpm_out = out / "schedule_cpm.csv"
+                    pending[pool.submit(_timed, _stage_cpm, result, cpm_out)] = "cpm"
+                    mc_args = (result, spec.iterations, spec.seed, cfg)
+                    pending[pool.submit(_timed, _stage_montecarlo, *mc_args)] = "montecarlo"
+                else:
+                    run.results[name] = result
+    return run
+
+def _fmt_ids(ids: List[str], limit: int = 10) -> str:
+    more = f" (+{len(ids) - limit} more)" if len(ids) > limit else ""
+    return ", ".join(ids[:limit]) + more if ids else "(none)"
+
+def _schedule_lines(run: ProjectRun, detailed: bool) -> List[str]:
+    lines: List[str] = []
+    cpm_res, mc = run.results.get("cpm"), run.results.get("montecarlo")
+    if cpm_res:
+        lines.append(
+            f"Project duration: {cpm_res['duration_days']:.2f} days ({cpm_res['tasks']} tasks)"
+        )
+        if detailed:
+            lines.append(f"Critical path: {_fmt_ids(cpm_res['critical_path'])}")
+    if mc:
+        if detailed:
+            lines.append(
+                f"P50={mc['p50']:.1f} d, P80={mc['p80']:.1f} d, P90={mc['p90']:.1f} d "
+                f"({mc['iterations']} iterations)"
+            )
+        else:
+            lines.append(f"P80={mc['p80']:.1f} d")
+    return lines
+
+def _cost_lines(run: ProjectRun, detailed: bool) -> List[str]:
+    cost = run.results.get("cost")
+    if not cost:
+        return []
+    lines = [
+        f"BABA flags: {cost['baba_flags']}, DBRA flags: {cost['dbra_flags']} ({cost['rows']} lines)"
+    ]
+    if detailed:
+        lines.append(f"Flagged cost: ${cost['flagged_cost_usd']:,.2f}")
+        lines.append(f"Flagged lines: {_fmt_ids(cost['flagged_lines'])}")
+    return lines
+
+def _document_lines(run: ProjectRun, detailed: bool) -> List[str]:
+    lines: List[str] = []
+    media, kg = run.results.get("media"), run.results.get("kg")
+    if media:
+        lines.append(
+            f"Images: {media['images']}, duplicate clusters: {media['duplicate_clusters']}"
+        )
+        if media["skipped_files"]:
+            lines.append(f"Unreadable images skipped: {len(media['skipped_files'])}")
+        if detailed:
+            lines.append(f"Images in duplicate clusters: {media['duplicate_images']}")
+    if kg:
+        lines.append(f"Knowledge graph: {kg['nodes']} nodes, {kg['edges']} edges")
+    return lines
+
+def build_summary(run: ProjectRun, profile: Optional[StateProfile] = None) -> Dict[str, Any]:
+    """
+    Consolidated summary. Sections the state's `reporting` preferences emphasize come first
+    and carry full detail; the others are reduced to headline figures.
+    """
+    m = run.manifest
+    profile = profile or get_state(m.state)  # type: ignore[arg-type]
+    prefs = profile.reporting
+    candidates = [
+        ("Schedule Risk", prefs.emphasize_schedule_risk, _schedule_lines),
+        ("Cost Compliance", prefs.emphasize_cost_compliance, _cost_lines),
+        ("Document Control", prefs.emphasize_document_control, _document_lines),
+    ]
+    sections = []
+    # Stable sort: emphasized sections first, otherwise in the order above
+    for title, emphasized, lines_of in sorted(candidates, key=lambda c: not c[1]):
+        lines = lines_of(run, emphasized)
+        if lines:
+            sections.append({"title": title, "emphasized": emphasized, "lines": lines})
+    outputs = [p for r in run.results.values() for p in r.get("outputs", [])]
+    return {
+        "project": m.name,
+        "state": profile.code,
+        "state_name": profile.name,
+        "agencies": profile.agencies,
+        "sections": sections,
+        "outputs": outputs,
+        "stage_seconds": {k: round(v, 4) for k, v in run.seconds.items()},
+        "errors": run.errors,
+    }
@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .utils import ExecutionConfig, LRUCache, get_execution_config
+
+MAX_BODY_BYTES = 1 << 20
+_MISSING = object()
+logger = logging.getLogger(__name__)
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+# Jobs run in the process pool; they are module-level so they can be pickled.
+
+def _parse_tasks(path: str) -> List[Any]:
+    from .schedule import read_tasks_csv
+
+    return read_tasks_csv(Path(path))
+
+def _cpm_job(tasks: List[Any]) -> Dict[str, Any]:
+    from .schedule import cpm, cpm_table
+
+    res = cpm(tasks)
+    return {
+        "duration_days": res.project_duration_days,
+        "critical_path": res.critical_path,
+        "tasks": cpm_table(res).to_dict(orient="records"),
+    }
+
+def _montecarlo_job(
+    tasks: List[Any], iterations: int, seed: int, config: ExecutionConfig
+) -> Dict[str, Any]:
+    from .schedule import monte_carlo_duration
+
+    p50, p80, p90 = monte_carlo_duration(tasks, iterations=iterations, seed=seed, config=config)
+    return {"iterations": iterations, "seed": seed, "p50": p50, "p80": p80, "p90": p90}
+
+def _cost_job(items: str, domestic_threshold: float, config: ExecutionConfig) -> Dict[str, Any]:
+    from .cost import BABAConfig, screen_baba_dbra
+
+    baba = BABAConfig(domestic_content_threshold_pct=domestic_threshold)
+    df = screen_baba_dbra(Path(items), Path(os.devnull), baba=baba, config=config)
+    flagged = df[df["flag_baba"] | df["flag_dbra"]]
+    return {
+        "rows": len(df),
+        "baba_flags": int(df["flag_baba"].sum()),
+        "dbra_flags": int(df["flag_dbra"].sum()),
+        "flagged": [
+            {
+                "line_id": str(r.line_id),
+                "flag_baba": bool(r.flag_baba),
+                "flag_dbra": bool(r.flag_dbra),
+                "reason": r.flag_reason,
+            }
+            for r in flagged.itertuples()
+        ],
+    }
+
+def _media_job(
+    folder: str, dup_distance: int, recursive: bool, config: ExecutionConfig
+) -> Dict[str, Any]:
+    from .media import cluster_duplicates, iter_images
+
+    skipped: List[str] = []
+    infos = list(
+        iter_images(
+            Path(folder),
+            recursive=recursive,
+            workers=config.workers,
+            on_error=lambda p, _: skipped.append(str(p)),
+        )
+    )
+    clusters = cluster_duplicates(infos, max_distance=dup_distance)
+    return {
+        "images": len(infos),
+        "skipped_files": skipped,
+        "duplicate_clusters": [
+            {
+                "representative": c.representative.path,
+                "members": [{"path": i.path, "distance": d} for i, d in c.members],
+            }
+            for c in clusters
+        ],
+    }
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    """
+    Cache key for an input file: changes whenever the file is rewritten.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"File not found: {path}") from None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+class AnalyticsService:
+    """
+    JSON-over-HTTP front end for the toolkit that keeps parsed inputs and results warm.
+
+    Endpoints (parameters as a JSON body or query string; paths are server-side paths):
+
+        GET  /health
+        GET  /stats
+        POST /schedule/cpm          {"tasks": "tasks.csv"}
+        POST /schedule/montecarlo   {"tasks": "tasks.csv", "iterations": 2000, "seed": 42}
+        POST /cost/screen           {"items": "costs.csv", "domestic_threshold": 55.0}
+        POST /media/scan            {"folder": "photos", "dup_distance": 5}  -> 202 {"job": id}
+        GET  /media/scan/<id>       job status and, once done, the result
+        POST /kg/query              {"nodes": "n.csv", "edges": "e.csv", "op": "khop",
+                                     "node": "C1", ...}
+
+    Parsed task lists, results and loaded graphs live in LRU caches keyed by the input files'
+    size and mtime, so an edited file is re-read on the next request. CPU-heavy work runs on a
+    process pool (`workers`, default from `config`; threads when `workers=0`) so the event
+    loop keeps serving; identical requests that arrive while one is being computed share its
+    result. Jobs receive `config` (default: the process-wide execution config) for batch sizes.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        cache_size: int = 256,
+        config: Optional[ExecutionConfig] = None,
+    ) -> None:
+        self.config = config or get_execution_config()
+        self.workers = self.config.workers if workers is None else workers
+        self.pool: Optional[Executor] = None
+        if self.workers > 0:
+            # spawn: forking a process that already runs threads (event loop executors) is unsafe
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self.inputs: LRUCache[Any] = LRUCache(cache_size)
+        self.results: LRUCache[Any] = LRUCache(cache_size)
+        self.engines: LRUCache[Any] = LRUCache(max(1, cache_size // 16))
+        self.jobs: LRUCache[Dict[str, Any]] = LRUCache(cache_size)
+        self._inflight: Dict[Any, asyncio.Future[Any]] = {}
+        self.shared = 0
+        self._job_ids = itertools.count(1)
+        self._routes: Dict[Tuple[str, str], Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+            ("GET", "/health"): self._health,
+            ("GET", "/stats"): self._stats,
+            ("POST", "/schedule/cpm"): self._cpm,
+            ("POST", "/schedule/montecarlo"): self._montecarlo,
+            ("POST", "/cost/screen"): self._cost,
+            ("POST", "/media/scan"): self._media_scan,
+            ("POST", "/kg/query"): self._kg_query,
+        }
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def _cached(
+        self, cache: LRUCache[Any], key: Any, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared += 1
+            return await asyncio.shield(pending)
+        fut: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as exc:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        cache.put(key, value)
+        fut.set_result(value)
+        return value
+
+    @staticmethod
+    def _param(
+        params: Dict[str, Any], name: str, cast: Callable[[Any], Any] = str, default: Any = _MISSING
+    ) -> Any:
+        if name not in params:
+            if default is _MISSING:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing field: {name}")
+            return default
+        try:
+            return cast(params[name])
+        except (TypeError, ValueError):
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, f"Invalid value for {name}: {params[name]!r}"
+            ) from None
+
+    async def _tasks(self, params: Dict[str, Any]) -> Tuple[Any, List[Any]]:
+        path = self._param(params, "tasks")
+        key = _file_key(path)
+        tasks = await self._cached(
+            self.inputs, ("tasks", key), lambda: self._run(_parse_tasks, path)
+        )
+        return key, tasks
+
+    async def _health(self, params: Dict[str, Any]) -> Any:
+        return {"ok": True}
+
+    async def _stats(self, params: Dict[str, Any]) -> Any:
+        caches = {"inputs": self.inputs, "results": self.results, "graphs": self.engines}
+        return {
+            "workers": self.workers,
+            "inflight": len(self._inflight),
+            "shared": self.shared,
+            "caches": {
+                n: {"size": len(c), "hits": c.hits, "misses": c.misses} for n, c in caches.items()
+            },
+        }
+
+    async def _cpm(self, params: Dict[str, Any]) -> Any:
+        key, tasks = await self._tasks(params)
+        return await self._cached(self.results, ("cpm", key), lambda: self._run(_cpm_job, tasks))
+
+    async def _montecarlo(self, params: Dict[str, Any]) -> Any:
+        iterations = self._param(params, "iterations", int, 2000)
+        seed = self._param(params, "seed", int, self.config.seed)
+        if iterations < 1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "iterations must be >= 1")
+        key, tasks = await self._tasks(params)
+        return await self._cached(
+            self.results,
+            ("montecarlo", key, iterations, seed),
+            lambda: self._run(_montecarlo_job, tasks, iterations, seed, self.config),
+        )
+
+    async def _cost(self, params: Dict[str, Any]) -> Any:
+        items = self._param(params, "items")
+        threshold = self._param(params, "domestic_threshold", float, 55.0)
+        key = ("cost", _file_key(items), threshold)
+        return await self._cached(
+            self.results, key, lambda: self._run(_cost_job, items, threshold, self.config)
+        )
+
+    async def _media_scan(self, params: Dict[str, Any]) -> Any:
+        folder = self._param(params, "folder")
+        if not os.path.isdir(folder):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Folder not found: {folder}")
+        dup_distance = self._param(params, "dup_distance", int, 5)
+        recursive = self._param(
+            params, "recursive", lambda v: str(v).lower() in ("1", "true", "yes"), True
+        )
+        job_id = str(next(self._job_ids))
+        job: Dict[str, Any] = {"job": job_id, "status": "running", "folder": folder}
+        self.jobs.put(job_id, job)
+
+        async def scan() -> None:
+            try:
+                job["result"] = await self._run(
+                    _media_job, folder, dup_distance, recursive, self.config
+                )
+                job["status"] = "done"
+            except Exception as exc:  # noqa: BLE001 - reported through the job
+                job["status"] = "failed"
+                job["error"] = f"{type(exc).__name__}: {exc}"
+
+        job["_task"] = asyncio.ensure_future(scan())
+        return HTTPStatus.ACCEPTED, {"job": job_id, "status": "running"}
+
+    async def _media_job_status(self, job_id: str) -> Any:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    async def _kg_query(self, params: Dict[str, Any]) -> Any:
+        from .graphstore import load_or_build
+        from .kg_service import KGQueryEngine
+
+        nodes, edges = self._param(params, "nodes"), self._param(params, "edges")
+        key = ("kg", _file_key(nodes), _file_key(edges))
+
+        async def load() -> Any:
+            # The graph must live in this process, so load on a thread rather than the pool
+            loop = asyncio.get_running_loop()
+            graph = await loop.run_in_executor(None, load_or_build, Path(nodes), Path(edges))
+            return KGQueryEngine(graph)
+
+        engine = await self._cached(self.engines, key, load)
+        req = {k: v for k, v in params.items() if k not in ("nodes", "edges")}
+        for name in ("rels", "types"):
+            if isinstance(req.get(name), str):
+                req[name] = [v for v in req[name].split(",") if v]  # query-string form: a,b
+        # Traversals are CPU-bound; answer on a thread so other clients keep being served
+        resp = await asyncio.get_running_loop().run_in_executor(None, engine.answer, req)
+        if not resp["ok"]:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, resp["error"])
+        return resp["result"]
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Any]:
+        """
+        Route one request; returns (status, JSON-serializable payload).
+        """
+        url = urlsplit(target)
+        try:
+            params: Dict[str, Any] = dict(parse_qsl(url.query))
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError as exc:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Bad JSON body: {exc}") from None
+                if not isinstance(data, dict):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+                params.update(data)
+            path = url.path.rstrip("/") or "/"
+            if method == "GET" and path.startswith("/media/scan/"):
+                return HTTPStatus.OK, await self._media_job_status(path.rsplit("/", 1)[1])
+            handler = self._routes.get((method, path))
+            if handler is None:
+                if any(p == path for _, p in self._routes):
+                    raise HTTPError(
+                        HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}"
+                    )
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+            result = await handler(params)
+            if isinstance(result, tuple):
+                return result
+            return HTTPStatus.OK, result
+        except HTTPError as exc:
+            return exc.status, {"error": str(exc)}
+        except (FileNotFoundError, KeyError) as exc:
+            return HTTPStatus.NOT_FOUND, {"error": str(exc.args[0]) if exc.args else str(exc)}
+        except ValueError as exc:
+            # Input validation in the toolkit (missing columns, cycles, ...)
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(exc)}
+        except Exception as exc:  # noqa: BLE001 - any other failure still gets a response
+            logger.exception("%s %s failed", method, target)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers: Dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                    raw_length = headers.get("content-length", "0")
+                    # int() also takes "-5", "+5" and "1_0"; only plain digits are a valid length
+                    if not raw_length.isdigit():
+                        raise ValueError(f"Bad Content-Length: {raw_length!r}")
+                    length = int(raw_length)
+                except ValueError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}
+                    keep_alive = False
+                else:
+                    if length > MAX_BODY_BYTES:
+                        status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                        payload, keep_alive = {"error": "Body too large"}, False
+                    else:
+                        body = await reader.readexactly(length) if length else b""
+                        status, payload = await self.dispatch(method.upper(), target, body)
+                data = json.dumps(payload).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8750) -> asyncio.Server:
+        return await asyncio.start_server(self._serve_connection, host=host, port=port)
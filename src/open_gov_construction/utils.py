@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Generic, Hashable, Literal, Mapping, Optional, TypeVar
 
 import numpy as np
 
+_V = TypeVar("_V")
+
 @dataclass(frozen=True)
 class RandomConfig:
     seed: int = 42
@@ -12,3 +19,178 @@ class RandomConfig:
     def rng(self) -> np.random.Generator:
         return np.random.default_rng(self.seed)
 
+ExecutorKind = Literal["thread", "process"]
+
+ENV_PREFIX = "OGC_"
+
+def _default_workers() -> int:
+    return os.cpu_count() or 1
+
+@dataclass(frozen=True)
+class ExecutionConfig:
+    """
+    Machine-level knobs shared by the heavy routines: pool size and kind, rows per batch,
+    the memory a single batch may use, the default RNG seed, and where parsed CSV inputs
+    are cached (no caching unless `cache_dir` is set).
+    """
+    workers: int = field(default_factory=_default_workers)
+    executor: ExecutorKind = "thread"
+    chunk_size: int = 100_000
+    memory_budget_mb: int = 512
+    seed: int = 42
+    cache_dir: Optional[str] = None
+    cache_max_mb: int = 2048
+
+    def __post_init__(self) -> None:
+        if self.workers < 1:
+            raise ValueError("workers must be >= 1")
+        if self.executor not in ("thread", "process"):
+            raise ValueError("executor must be 'thread' or 'process'")
+        if self.chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        if self.memory_budget_mb < 1:
+            raise ValueError("memory_budget_mb must be >= 1")
+        if self.cache_max_mb < 1:
+            raise ValueError("cache_max_mb must be >= 1")
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> ExecutionConfig:
+        """
+        Defaults overridden by OGC_WORKERS, OGC_EXECUTOR, OGC_CHUNK_SIZE, OGC_MEMORY_BUDGET_MB,
+        OGC_SEED, OGC_CACHE_DIR and OGC_CACHE_MAX_MB when set.
+        """
+        env = os.environ if env is None else env
+        values: Dict[str, Any] = {}
+        fields = (
+            ("workers", int), ("executor", str), ("chunk_size", int), ("memory_budget_mb", int),
+            ("seed", int), ("cache_dir", str), ("cache_max_mb", int),
+        )
+        for name, cast in fields:
+            raw = env.get(ENV_PREFIX + name.upper(), "").strip()
+            if raw:
+                try:
+                    values[name] = cast(raw)
+                except ValueError:
+                    raise ValueError(
+                        f"{ENV_PREFIX}{name.upper()} must be an integer, got {raw!r}"
+                    ) from None
+        return cls(**values)
+
+    @property
+    def io_workers(self) -> int:
+        """
+        Thread count for I/O-bound work (file headers, reads): more than the CPU count.
+        """
+        return min(32, self.workers + 4)
+
+    def rows_per_chunk(self, bytes_per_row: int) -> int:
+        """
+        Rows per batch: `chunk_size`, lowered so one batch stays within the memory budget.
+        """
+        budget_rows = (self.memory_budget_mb * 2**20) // max(1, bytes_per_row)
+        return max(1, min(self.chunk_size, budget_rows))
+
+    def pool(self, max_workers: Optional[int] = None) -> Executor:
+        workers = max_workers or self.workers
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers)
+
+    def rng(self) -> np.random.Generator:
+        return np.random.default_rng(self.seed)
+
+_execution: Optional[ExecutionConfig] = None
+
+def get_execution_config() -> ExecutionConfig:
+    """
+    The process-wide config: set by `set_execution_config`, else read from the environment.
+    """
+    global _execution
+    if _execution is None:
+        _execution = ExecutionConfig.from_env()
+    return _execution
+
+def set_execution_config(
+    config: Optional[ExecutionConfig] = None, **overrides: Any
+) -> ExecutionConfig:
+    """
+    Install `config` (default: the current one) with `overrides` applied; `None` overrides
+    are ignored so CLI options can be passed straight through. Returns the installed config.
+    """
+    global _execution
+    base = config if config is not None else get_execution_config()
+    _execution = replace(base, **{k: v for k, v in overrides.items() if v is not None})
+    return _execution
+
+
+def sha256_file(path: Path) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+
+def file_fingerprint(path: Path, content_hash: bool = True) -> Dict[str, Any]:
+    """
+    Identify a source file by size and mtime, plus its SHA-256 when `content_hash` is set.
+    """
+    st = Path(path).stat()
+    fp: Dict[str, Any] = {
+        "path": str(Path(path).resolve()),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    if content_hash:
+        fp["sha256"] = sha256_file(path)
+    return fp
+
+def fingerprint_matches(recorded: Dict[str, Any], path: Path) -> bool:
+    """
+    True if `path` still has the content described by `recorded`.
+
+    Size and mtime are checked first; a file that was touched or copied (new mtime, same size)
+    is only re-hashed when the recorded fingerprint carries a SHA-256.
+    """
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return False
+    if st.st_size != recorded.get("size"):
+        return False
+    if st.st_mtime_ns == recorded.get("mtime_ns"):
+        return True
+    return "sha256" in recorded and sha256_file(path) == recorded["sha256"]
+
+class LRUCache(Generic[_V]):
+    """
+    Bounded mapping that evicts the least recently used entry once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, _V] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: _V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from typer.testing import CliRunner
 import pandas as pd
@@ -112,6 +113,10 @@ def test_cli_media_scan_with_dup_distance(tmp_path: Path) -> None:
     out_csv = tmp_path / "inventory.csv"
     result = runner.invoke(app, ["media-scan", str(img_folder), "--dup-distance", "10", "--out", str(out_csv)])
     assert result.exit_code == 0
+    result = runner.invoke(
+        app, ["media-scan", str(img_folder), "--dup-distance", "-1", "--out", str(out_csv)]
+    )
+    assert result.exit_code != 0
 
 def test_cli_kg_build(tmp_path: Path) -> None:
     nodes_csv = tmp_path / "nodes.csv"
@@ -149,4 +154,374 @@ def test_cli_kg_query(tmp_path: Path) -> None:
     assert result.exit_code == 0
     assert "Neighbors" in result.stdout
 
+def test_cli_media_scan_recursive_bounded_report(tmp_path: Path) -> None:
+    img_folder = tmp_path / "images"
+    (img_folder / "nested" / "deeper").mkdir(parents=True)
+    img = Image.fromarray((np.ones((32, 32, 3), dtype=np.uint8) * 200))
+    for i in range(4):
+        img.save(img_folder / "nested" / "deeper" / f"{i}.png")
+
+    out_csv = tmp_path / "inventory.csv"
+    result = runner.invoke(
+        app, ["media-scan", str(img_folder), "--out", str(out_csv), "--max-report", "2"]
+    )
+    assert result.exit_code == 0
+    assert "Scanned 4 images" in result.stdout
+    assert "Duplicates: 6" in result.stdout
+    assert "and 4 more" in result.stdout
+    assert len(pd.read_csv(out_csv)) == 4
+
+def test_cli_media_scan_clusters(tmp_path: Path) -> None:
+    img_folder = tmp_path / "images"
+    img_folder.mkdir()
+    img = Image.fromarray((np.ones((32, 32, 3), dtype=np.uint8) * 200))
+    for i in range(5):
+        img.save(img_folder / f"{i}.png")
+
+    out_csv = tmp_path / "inventory.csv"
+    clusters_csv = tmp_path / "clusters.csv"
+    result = runner.invoke(
+        app, ["media-scan", str(img_folder), "--out", str(out_csv), "--clusters", str(clusters_csv)]
+    )
+    assert result.exit_code == 0
+    assert "Duplicate clusters: 1" in result.stdout
+    clusters = pd.read_csv(clusters_csv)
+    assert len(clusters) == 5
+    assert clusters["cluster_id"].nunique() == 1
+
+def test_cli_media_scan_metadata_only(tmp_path: Path) -> None:
+    img_folder = tmp_path / "images"
+    img_folder.mkdir()
+    Image.fromarray((np.ones((32, 16, 3), dtype=np.uint8) * 200)).save(img_folder / "a.png")
+
+    out_csv = tmp_path / "meta.csv"
+    result = runner.invoke(
+        app,
+        ["media-scan", str(img_folder), "--out", str(out_csv), "--metadata-only", "--workers", "2"],
+    )
+    assert result.exit_code == 0
+    assert "Read metadata for 1 images" in result.stdout
+    df = pd.read_csv(out_csv)
+    assert df.loc[0, "width"] == 16 and df.loc[0, "height"] == 32
+
+def test_cli_media_scan_skips_unreadable_files(tmp_path: Path) -> None:
+    img_folder = tmp_path / "images"
+    img_folder.mkdir()
+    img = Image.fromarray((np.ones((32, 32, 3), dtype=np.uint8) * 200))
+    img.save(img_folder / "a.png")
+    img.save(img_folder / "c.png")
+    (img_folder / "b.png").write_bytes(b"not a png")
+
+    for extra in ([], ["--metadata-only"]):
+        out_csv = tmp_path / "inventory.csv"
+        result = runner.invoke(app, ["media-scan", str(img_folder), "--out", str(out_csv), *extra])
+        assert result.exit_code == 0, result.output
+        assert "Skipped 1 unreadable files" in result.stdout
+        assert "b.png" in result.stdout
+        assert [Path(p).name for p in pd.read_csv(out_csv)["path"]] == ["a.png", "c.png"]
+
+def test_cli_kg_query_reuses_snapshot(tmp_path: Path) -> None:
+    nodes_csv = tmp_path / "nodes.csv"
+    edges_csv = tmp_path / "edges.csv"
+    pd.DataFrame([
+        {"id": "A", "label": "Node A", "type": "type1"},
+        {"id": "B", "label": "Node B", "type": "type2"},
+    ]).to_csv(nodes_csv, index=False)
+    pd.DataFrame([{"src": "A", "dst": "B", "rel": "connects"}]).to_csv(edges_csv, index=False)
+
+    result = runner.invoke(
+        app, ["kg-build", str(nodes_csv), str(edges_csv), "--out", str(tmp_path / "g.graphml")]
+    )
+    assert result.exit_code == 0
+    assert (tmp_path / "edges.csv.kgsnap" / "manifest.json").exists()
+
+    result = runner.invoke(app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "A"])
+    assert result.exit_code == 0
+    assert "Neighbors of A: B" in result.stdout
+
+    # Editing the edges invalidates the snapshot
+    pd.DataFrame([{"src": "B", "dst": "A", "rel": "connects"}]).to_csv(edges_csv, index=False)
+    result = runner.invoke(app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "B"])
+    assert result.exit_code == 0
+    assert "Neighbors of B: A" in result.stdout
+
+    result = runner.invoke(app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "Z"])
+    assert result.exit_code == 1
+
+def test_cli_kg_query_k_hop_filters(tmp_path: Path) -> None:
+    nodes_csv = tmp_path / "nodes.csv"
+    edges_csv = tmp_path / "edges.csv"
+    pd.DataFrame([
+        {"id": "A", "label": "Node A", "type": "contract"},
+        {"id": "B", "label": "Node B", "type": "vendor"},
+        {"id": "C", "label": "Node C", "type": "asset"},
+    ]).to_csv(nodes_csv, index=False)
+    pd.DataFrame([
+        {"src": "A", "dst": "B", "rel": "awarded_to"},
+        {"src": "B", "dst": "C", "rel": "maintains"},
+    ]).to_csv(edges_csv, index=False)
+
+    result = runner.invoke(
+        app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "A", "--hops", "2"]
+    )
+    assert result.exit_code == 0
+    assert "B (1), C (2)" in result.stdout
+
+    result = runner.invoke(
+        app,
+        ["kg-query", str(nodes_csv), str(edges_csv), "--node", "C", "--hops", "2",
+         "--direction", "in", "--rel", "maintains"],
+    )
+    assert result.exit_code == 0
+    assert "Predecessors of C within 2 hop(s): B (1)" in result.stdout
 
+def _small_graph(tmp_path: Path) -> tuple[Path, Path]:
+    nodes_csv = tmp_path / "nodes.csv"
+    edges_csv = tmp_path / "edges.csv"
+    pd.DataFrame([
+        {"id": "A", "label": "Node A", "type": "type1"},
+        {"id": "B", "label": "Node B", "type": "type2"},
+        {"id": "C", "label": "Node C", "type": "type2"},
+    ]).to_csv(nodes_csv, index=False)
+    pd.DataFrame([
+        {"src": "A", "dst": "B", "rel": "connects"},
+        {"src": "B", "dst": "C", "rel": "connects"},
+    ]).to_csv(edges_csv, index=False)
+    return nodes_csv, edges_csv
+
+def test_cli_kg_serve_stdin(tmp_path: Path) -> None:
+    import json
+
+    nodes_csv, edges_csv = _small_graph(tmp_path)
+    queries = '{"id": 1, "node": "A"}\n{"id": 2, "op": "path", "src": "A", "dst": "C"}\n'
+    result = runner.invoke(app, ["kg-serve", str(nodes_csv), str(edges_csv)], input=queries)
+    assert result.exit_code == 0
+    replies = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert replies == [
+        {"id": 1, "ok": True, "result": ["B"]},
+        {"id": 2, "ok": True, "result": ["A", "B", "C"]},
+    ]
+
+def test_cli_kg_batch(tmp_path: Path) -> None:
+    import json
+
+    nodes_csv, edges_csv = _small_graph(tmp_path)
+    ids = tmp_path / "ids.txt"
+    ids.write_text("A\nB\n\nZ\n")
+    out = tmp_path / "answers.jsonl"
+    result = runner.invoke(
+        app,
+        ["kg-batch", str(nodes_csv), str(edges_csv), "--ids", str(ids), "--out", str(out),
+         "--hops", "2"],
+    )
+    assert result.exit_code == 0
+    assert "Answered 3 queries (1 failed)" in result.stdout
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert rows[0]["node"] == "A"
+    assert rows[0]["result"] == [{"node": "B", "hops": 1}, {"node": "C", "hops": 2}]
+    assert rows[2]["ok"] is False
+
+def test_cli_kg_build_stream_jsonl_gz(tmp_path: Path) -> None:
+    import gzip
+    import json
+
+    nodes_csv, edges_csv = _small_graph(tmp_path)
+    out = tmp_path / "graph.jsonl.gz"
+    result = runner.invoke(
+        app, ["kg-build", str(nodes_csv), str(edges_csv), "--out", str(out), "--stream"]
+    )
+    assert result.exit_code == 0
+    assert "Streamed 3 node rows, 2 edge rows" in result.stdout
+    assert not (tmp_path / "edges.csv.kgsnap").exists()
+    with gzip.open(out, "rt", encoding="utf-8") as fh:
+        rows = [json.loads(line) for line in fh]
+    assert [r["kind"] for r in rows] == ["node"] * 3 + ["edge"] * 2
+
+    result = runner.invoke(
+        app, ["kg-build", str(nodes_csv), str(edges_csv), "--out", str(out), "--stream", "--strict"]
+    )
+    assert result.exit_code != 0
+
+
+def test_cli_kg_update(tmp_path: Path) -> None:
+    nodes_csv, edges_csv = _small_graph(tmp_path)
+    out = tmp_path / "g.graphml"
+    result = runner.invoke(app, ["kg-build", str(nodes_csv), str(edges_csv), "--out", str(out)])
+    assert result.exit_code == 0
+    delta = tmp_path / "nodes_delta.csv"
+    delta.write_text("id,label,type,deleted\nB,,,true\nD,Node D,type1,\n")
+    edelta = tmp_path / "edges_delta.csv"
+    edelta.write_text("src,dst,rel\nA,D,connects\n")
+    snap = tmp_path / "edges.csv.kgsnap"
+    result = runner.invoke(
+        app, ["kg-update", str(snap), "--nodes", str(delta), "--edges", str(edelta)]
+    )
+    assert result.exit_code == 0
+    assert "Nodes: +1 added, 0 updated, -1 deleted" in result.stdout
+    assert "Edges: +1 added, -2 deleted" in result.stdout
+    result = runner.invoke(app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "A"])
+    assert "Neighbors of A: D" in result.stdout
+    result = runner.invoke(app, ["kg-update", str(tmp_path / "missing"), "--nodes", str(delta)])
+    assert result.exit_code == 1
+
+def test_cli_import_is_lazy() -> None:
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, open_gov_construction.cli; "
+        "heavy = ('pandas', 'numpy', 'networkx', 'PIL', 'matplotlib'); "
+        "print(sorted(m for m in heavy if m in sys.modules))"
+    )
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env = {**os.environ, "PYTHONPATH": src + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+def test_cli_kg_query_snapshot_hit_needs_only_numpy(tmp_path: Path) -> None:
+    import subprocess
+    import sys
+
+    nodes_csv = tmp_path / "nodes.csv"
+    edges_csv = tmp_path / "edges.csv"
+    pd.DataFrame(
+        [{"id": "A", "label": "a", "type": "t"}, {"id": "B", "label": "b", "type": "t"}]
+    ).to_csv(nodes_csv, index=False)
+    pd.DataFrame([{"src": "A", "dst": "B", "rel": "r"}]).to_csv(edges_csv, index=False)
+    result = runner.invoke(app, ["kg-query", str(nodes_csv), str(edges_csv), "--node", "A"])
+    assert result.exit_code == 0
+    code = (
+        "import sys\n"
+        "from open_gov_construction.cli import app\n"
+        f"try:\n    app(['kg-query', {str(nodes_csv)!r}, {str(edges_csv)!r},"
+        " '--node', 'A', '--hops', '2'])\n"
+        "except SystemExit:\n    pass\n"
+        "print(sorted(m for m in ('pandas', 'networkx', 'PIL', 'matplotlib') if m in sys.modules))"
+    )
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env = {**os.environ, "PYTHONPATH": src + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    assert "Successors of A" in out.stdout
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+def test_cli_metrics_and_profile(tmp_path: Path) -> None:
+    import json
+    import pstats
+
+    tasks = tmp_path / "tasks.csv"
+    pd.DataFrame([
+        {"task_id": "A", "name": "Start", "duration_days": 2, "predecessors": ""},
+        {"task_id": "B", "name": "Next", "duration_days": 3, "predecessors": "A"},
+    ]).to_csv(tasks, index=False)
+    metrics_json = tmp_path / "metrics.json"
+    prof = tmp_path / "cpm.prof"
+    result = runner.invoke(
+        app,
+        ["--metrics", str(metrics_json), "--profile", str(prof),
+         "schedule-cpm", str(tasks), "--out", str(tmp_path / "cpm.csv")],
+    )
+    assert result.exit_code == 0
+    data = json.loads(metrics_json.read_text())
+    assert data["command"] == "schedule-cpm"
+    stages = {"read_tasks_csv", "cpm", "cpm.forward", "cpm.backward"}
+    assert {f"schedule.{s}" for s in stages} <= set(data["stages"])
+    assert data["counters"]["tasks"] == 2
+    assert pstats.Stats(str(prof)).total_calls > 0
+
+def test_cli_project_run(tmp_path: Path) -> None:
+    import json
+
+    tasks = tmp_path / "tasks.csv"
+    pd.DataFrame([
+        {"task_id": "A", "name": "Start", "duration_days": 2, "predecessors": ""},
+        {"task_id": "B", "name": "Next", "duration_days": 3, "predecessors": "A"},
+    ]).to_csv(tasks, index=False)
+    nodes_csv, edges_csv = _small_graph(tmp_path)
+    manifest = tmp_path / "project.toml"
+    manifest.write_text(
+        '[project]\nname = "Demo"\nstate = "OH"\noutput_dir = "out"\n'
+        '[schedule]\ntasks = "tasks.csv"\niterations = 50\n'
+        '[kg]\nnodes = "nodes.csv"\nedges = "edges.csv"\n'
+    )
+    result = runner.invoke(app, ["project-run", str(manifest)])
+    assert result.exit_code == 0, result.stdout
+    assert "Project duration: 5.00 days" in result.stdout
+    assert "Knowledge graph: 3 nodes, 2 edges" in result.stdout
+    summary = json.loads((tmp_path / "out" / "project_summary.json").read_text())
+    assert summary["state_name"] == "Ohio"
+    assert (tmp_path / "out" / "schedule_cpm.csv").exists()
+    assert (tmp_path / "edges.csv.kgsnap").exists()
+
+    manifest.write_text('[project]\nname = "Demo"\n')
+    result = runner.invoke(app, ["project-run", str(manifest)])
+    assert result.exit_code == 1
+
+def test_cli_execution_options(tmp_path: Path, monkeypatch) -> None:
+    from open_gov_construction import utils
+
+    monkeypatch.setattr(utils, "_execution", None)
+    tasks = tmp_path / "tasks.csv"
+    pd.DataFrame([
+        {"task_id": "A", "name": "A", "duration_days": 5.0, "predecessors": "",
+         "optimistic_days": 4.0, "likely_days": 5.0, "pessimistic_days": 7.0},
+    ]).to_csv(tasks, index=False)
+    options = ["--seed", "5", "--chunk-size", "7", "--workers", "2"]
+    seeded = runner.invoke(app, [*options, "schedule-montecarlo", str(tasks)])
+    assert seeded.exit_code == 0
+    cfg = utils.get_execution_config()
+    assert (cfg.seed, cfg.chunk_size, cfg.workers) == (5, 7, 2)
+    explicit = runner.invoke(app, ["schedule-montecarlo", str(tasks), "--seed", "5"])
+    assert explicit.stdout == seeded.stdout
+    result = runner.invoke(app, ["--executor", "gpu", "list-states"])
+    assert result.exit_code != 0
+
+def test_cli_cache_dir(tmp_path: Path, monkeypatch) -> None:
+    import json
+
+    from open_gov_construction import utils
+
+    monkeypatch.setattr(utils, "_execution", None)
+    items = tmp_path / "items.csv"
+    pd.DataFrame([
+        {"line_id": "L1", "description": "Install rebar", "material_type": "iron_steel",
+         "origin_country": "CN", "cost_usd": 10.0, "federal_funding": True, "state": "OH"},
+    ]).to_csv(items, index=False)
+    cache = tmp_path / "cache"
+    outputs = []
+    for i in range(2):
+        out = tmp_path / f"out{i}.csv"
+        m = tmp_path / f"m{i}.json"
+        options = ["--cache-dir", str(cache), "--metrics", str(m)]
+        result = runner.invoke(app, [*options, "cost-compliance", str(items), "--out", str(out)])
+        assert result.exit_code == 0
+        outputs.append(out.read_bytes())
+    assert outputs[0] == outputs[1]
+    assert json.loads((tmp_path / "m1.json").read_text())["counters"]["cache_hits"] == 1
+
+def test_cli_schedule_montecarlo_outputs(tmp_path: Path) -> None:
+    tasks = tmp_path / "tasks.csv"
+    pd.DataFrame([
+        {"task_id": "A", "name": "A", "duration_days": 5.0, "predecessors": "",
+         "optimistic_days": 4.0, "likely_days": 5.0, "pessimistic_days": 8.0},
+        {"task_id": "B", "name": "B", "duration_days": 2.0, "predecessors": "A",
+         "optimistic_days": 1.0, "likely_days": 2.0, "pessimistic_days": 4.0},
+    ]).to_csv(tasks, index=False)
+    plot, table, samples = tmp_path / "risk.png", tmp_path / "cdf.csv", tmp_path / "samples.npy"
+    result = runner.invoke(
+        app,
+        ["schedule-montecarlo", str(tasks), "--iterations", "500", "--bins", "20",
+         "--plot", str(plot), "--cdf-out", str(table), "--samples", str(samples)],
+    )
+    assert result.exit_code == 0, result.stdout
+    assert "P50=" in result.stdout
+    with Image.open(plot) as im:
+        assert im.format == "PNG"
+    cdf = pd.read_csv(table)
+    # 20 regular bins plus the underflow and overflow bins
+    assert len(cdf) == 22 and int(cdf["count"].sum()) == 500
+    assert np.load(samples).shape == (500,)
+    assert runner.invoke(app, ["schedule-montecarlo", str(tasks), "--bins", "0"]).exit_code != 0
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from open_gov_construction import colcache
+from open_gov_construction.utils import ExecutionConfig
+
+def _parse_counting(calls: list):
+    def parse(path: Path) -> pd.DataFrame:
+        calls.append(path)
+        return pd.read_csv(path)
+    return parse
+
+def test_cached_frame_round_trip_and_invalidation(tmp_path: Path) -> None:
+    src = tmp_path / "items.csv"
+    pd.DataFrame(
+        {
+            "id": ["a", "b", "c", "a"],
+            "note": ["x", None, "ünïcode", "x"],
+            "qty": [1, 2, 3, 4],
+            "cost": [1.5, np.nan, 3.0, 4.25],
+            "ok": [True, False, True, True],
+        }
+    ).to_csv(src, index=False)
+    cfg = ExecutionConfig(cache_dir=str(tmp_path / "cache"))
+    calls: list = []
+    parse = _parse_counting(calls)
+
+    first = colcache.cached_frame(src, "items", parse, cfg)
+    second = colcache.cached_frame(src, "items", parse, cfg)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert not second["qty"].to_numpy().flags.writeable  # served from the mapped column file
+
+    # Touched but unchanged: the content hash keeps the entry valid
+    os.utime(src, ns=(0, 10**9))
+    colcache.cached_frame(src, "items", parse, cfg)
+    assert len(calls) == 1
+    src.write_text("id,note,qty,cost,ok\nz,y,9,1.0,False\n")
+    changed = colcache.cached_frame(src, "items", parse, cfg)
+    assert len(calls) == 2 and changed["id"].tolist() == ["z"]
+
+    # Without a cache_dir nothing is cached
+    colcache.cached_frame(src, "items", parse, ExecutionConfig())
+    assert len(calls) == 3
+
+def test_unsupported_frames_are_not_cached(tmp_path: Path) -> None:
+    src = tmp_path / "mixed.csv"
+    src.write_text("flag\nTrue\n\n")
+    cfg = ExecutionConfig(cache_dir=str(tmp_path / "cache"))
+    mixed = lambda path: pd.DataFrame({"flag": pd.Series([True, np.nan], dtype=object)})  # noqa: E731
+    colcache.cached_frame(src, "mixed", mixed, cfg)
+    assert list((tmp_path / "cache").iterdir()) == []
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = tmp_path / "cache"
+    cfg = ExecutionConfig(cache_dir=str(cache), cache_max_mb=1)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"t{i}.csv"
+        pd.DataFrame({"v": np.arange(60_000) + i}).to_csv(p, index=False)  # ~470 KB cached each
+        paths.append(p)
+    calls: list = []
+    parse = _parse_counting(calls)
+    colcache.cached_frame(paths[0], "t", parse, cfg)
+    colcache.cached_frame(paths[1], "t", parse, cfg)
+    os.utime(cache / colcache._entry_dir(cache, "t", paths[0]).name / colcache.META_NAME, (0, 0))
+    colcache.cached_frame(paths[2], "t", parse, cfg)
+    # The oldest entry was dropped to stay under 1 MB; the newest is kept
+    names = {p.name for p in cache.iterdir()}
+    assert colcache._entry_dir(cache, "t", paths[0]).name not in names
+    assert colcache._entry_dir(cache, "t", paths[2]).name in names
+    colcache.clear(cache)
+    assert list(cache.iterdir()) == []
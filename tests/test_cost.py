@@ -6,6 +6,7 @@ import pandas as pd
 import pytest
 
 from open_gov_construction.cost import screen_baba_dbra, BABAConfig
+from open_gov_construction.utils import ExecutionConfig
 
 def test_cost_compliance_flags(tmp_path: Path) -> None:
     df = pd.DataFrame(
@@ -123,3 +124,27 @@ def test_cost_compliance_construction_material_non_us(tmp_path: Path) -> None:
     l1 = out[out["line_id"] == "L1"].iloc[0]
     assert bool(l1["flag_baba"]) is True  # Non-US construction material with federal funding
 
+
+def test_cost_compliance_batches_and_reasons(tmp_path: Path) -> None:
+    df = pd.DataFrame([
+        {"line_id": "L1", "description": "Install beams", "material_type": " Iron_Steel ",
+         "origin_country": "cn", "cost_usd": 10.0, "federal_funding": True, "state": "CA",
+         "domestic_content_pct": None},
+        {"line_id": "L2", "description": "Pump", "material_type": "manufactured",
+         "origin_country": "US", "cost_usd": 20.0, "federal_funding": True, "state": "CA",
+         "domestic_content_pct": 60.0},
+        {"line_id": "L3", "description": "Pump", "material_type": "manufactured",
+         "origin_country": "US", "cost_usd": 30.0, "federal_funding": True, "state": "CA",
+         "domestic_content_pct": None},
+    ])
+    infile = tmp_path / "cost.csv"
+    df.to_csv(infile, index=False)
+    whole = screen_baba_dbra(infile, tmp_path / "a.csv", config=ExecutionConfig(chunk_size=100))
+    batched = screen_baba_dbra(infile, tmp_path / "b.csv", config=ExecutionConfig(chunk_size=1))
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+    assert whole["flag_reason"].tolist() == batched["flag_reason"].tolist() == [
+        "Iron/steel must be U.S. origin (BABA); Missing DBRA classification (wage determination)",
+        "",
+        "Manufactured product domestic content < 55.0% (BABA)",
+    ]
+    assert whole["flag_baba"].tolist() == [True, False, True]
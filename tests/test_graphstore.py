@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from open_gov_construction.graphstore import (
+    CompactGraph,
+    default_snapshot_dir,
+    load_or_build,
+    load_snapshot,
+    save_snapshot,
+    update_snapshot,
+)
+from open_gov_construction.kg import (
+    build_graph,
+    neighbors_of,
+    read_edges_csv,
+    read_nodes_csv,
+    save_graphml,
+)
+
+def _write(tmp_path: Path) -> tuple[Path, Path]:
+    nodes = pd.DataFrame(
+        [
+            {"id": "C1", "label": "Main Contract", "type": "document"},
+            {"id": "V1", "label": "Acme Steel", "type": "vendor"},
+            {"id": "A1", "label": "Bridge 12", "type": "asset"},
+            {"id": "C1", "label": "Main Contract (rev)", "type": "document"},
+        ]
+    )
+    edges = pd.DataFrame(
+        [
+            {"src": "C1", "dst": "V1", "rel": "awarded_to"},
+            {"src": "C1", "dst": "A1", "rel": "covers"},
+            {"src": "C1", "dst": "V1", "rel": "amended_for"},
+            {"src": "V1", "dst": "X9", "rel": "located_at"},
+        ]
+    )
+    nfile = tmp_path / "nodes.csv"
+    efile = tmp_path / "edges.csv"
+    nodes.to_csv(nfile, index=False)
+    edges.to_csv(efile, index=False)
+    return nfile, efile
+
+def test_compact_graph_matches_networkx(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path)
+    G = build_graph(nfile, efile)
+    g = CompactGraph.from_frames(read_nodes_csv(nfile), read_edges_csv(efile))
+    assert g.num_nodes == G.number_of_nodes()
+    assert g.num_edges == G.number_of_edges()
+    assert [g.node_id(i) for i in range(g.num_nodes)] == list(G.nodes)
+    for nid in G.nodes:
+        assert g.successors(nid) == neighbors_of(G, nid)
+    c1 = g.index_of("C1")
+    assert g.label(c1) == "Main Contract (rev)"
+    assert g.node_type_name(c1) == "document"
+    assert g.node_type_name(g.index_of("X9")) == ""
+    assert "X9" in g and "nope" not in g
+    with pytest.raises(KeyError):
+        g.index_of("nope")
+
+def test_snapshot_roundtrip_memory_mapped(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path)
+    g = CompactGraph.from_frames(read_nodes_csv(nfile), read_edges_csv(efile))
+    folder = default_snapshot_dir(efile)
+    save_snapshot(g, folder, [nfile, efile])
+    loaded = load_snapshot(folder, [nfile, efile])
+    assert loaded is not None
+    assert loaded.out_dst.__class__.__name__ == "memmap"
+    assert loaded.successors("C1") == ["V1", "A1"]
+    assert loaded.label(loaded.index_of("V1")) == "Acme Steel"
+
+def test_snapshot_invalidated_when_source_changes(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path)
+    folder = tmp_path / "snap"
+    assert load_or_build(nfile, efile, folder).successors("A1") == []
+    assert load_snapshot(folder, [nfile, efile]) is not None
+
+    # Touched but unchanged content: still fresh (content hash matches)
+    st = efile.stat()
+    os.utime(efile, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+    assert load_snapshot(folder, [nfile, efile]) is not None
+
+    with open(efile, "a", encoding="utf-8") as fh:
+        fh.write("A1,C1,governed_by\n")
+    assert load_snapshot(folder, [nfile, efile]) is None
+    assert load_or_build(nfile, efile, folder).successors("A1") == ["C1"]
+    assert load_snapshot(folder, [nfile, efile]) is not None
+
+def test_load_snapshot_missing(tmp_path: Path) -> None:
+    assert load_snapshot(tmp_path / "absent") is None
+
+def _chain(tmp_path: Path) -> CompactGraph:
+    nodes = pd.DataFrame(
+        [
+            {"id": "P", "label": "Program", "type": "program"},
+            {"id": "C1", "label": "Contract 1", "type": "contract"},
+            {"id": "C2", "label": "Contract 2", "type": "contract"},
+            {"id": "V1", "label": "Vendor 1", "type": "vendor"},
+            {"id": "A1", "label": "Asset 1", "type": "asset"},
+        ]
+    )
+    edges = pd.DataFrame(
+        [
+            {"src": "P", "dst": "C1", "rel": "funds"},
+            {"src": "P", "dst": "C2", "rel": "funds"},
+            {"src": "C1", "dst": "V1", "rel": "awarded_to"},
+            {"src": "C2", "dst": "V1", "rel": "awarded_to"},
+            {"src": "C1", "dst": "A1", "rel": "covers"},
+            {"src": "V1", "dst": "A1", "rel": "maintains"},
+        ]
+    )
+    return CompactGraph.from_frames(nodes, edges)
+
+def test_snapshot_rewrite_never_leaves_it_missing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import threading
+
+    import numpy as np
+
+    from open_gov_construction import graphstore
+
+    nfile, efile = _write(tmp_path)
+    graph = CompactGraph.from_frames(read_nodes_csv(nfile), read_edges_csv(efile))
+    folder = tmp_path / "snap"
+    save_snapshot(graph, folder, [nfile, efile])
+
+    misses = []
+    done = threading.Event()
+
+    def reader() -> None:
+        while not done.is_set():
+            g = load_snapshot(folder)
+            if g is None or g.successors("C1") != ["V1", "A1"]:
+                misses.append(g)
+
+    t = threading.Thread(target=reader)
+    t.start()
+    for _ in range(30):
+        save_snapshot(graph, folder, [nfile, efile])
+    done.set()
+    t.join()
+    assert misses == []
+    # Only the current version is kept
+    assert len([p for p in folder.iterdir() if p.is_dir()]) == 1
+
+    # A writer that dies mid-way leaves the previous snapshot in place
+    def crash(*args: object, **kwargs: object) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(graphstore.np, "save", crash)
+    with pytest.raises(OSError):
+        save_snapshot(graph, folder, [nfile, efile])
+    monkeypatch.setattr(graphstore.np, "save", np.save)
+    assert not any(p.name.startswith(".tmp-") for p in folder.iterdir())
+    g = load_snapshot(folder, [nfile, efile])
+    assert g is not None and g.successors("C1") == ["V1", "A1"]
+
+def test_k_hop_successors_and_predecessors(tmp_path: Path) -> None:
+    g = _chain(tmp_path)
+    assert g.k_hop("P", k=1) == [("C1", 1), ("C2", 1)]
+    assert g.k_hop("P", k=3) == [("C1", 1), ("C2", 1), ("V1", 2), ("A1", 2)]
+    assert g.k_hop_predecessors("A1", k=1) == ["C1", "V1"]
+    assert g.k_hop_predecessors("A1", k=5) == ["C1", "V1", "P", "C2"]
+    assert g.predecessors("V1") == ["C1", "C2"]
+    assert g.k_hop("A1", k=2) == []
+
+def test_k_hop_filters(tmp_path: Path) -> None:
+    g = _chain(tmp_path)
+    assert g.k_hop_successors("P", k=3, rels=["funds", "awarded_to"]) == ["C1", "C2", "V1"]
+    assert g.k_hop_successors("P", k=3, rels=["covers"]) == []
+    assert g.k_hop_successors("P", k=3, node_types=["contract", "asset"]) == ["C1", "C2", "A1"]
+    assert g.k_hop_predecessors("A1", k=3, node_types=["vendor"]) == ["V1"]
+    assert g.k_hop_successors("P", k=2, rels=["no_such_rel"]) == []
+
+def test_networkx_roundtrip(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path)
+    G = build_graph(nfile, efile)
+    back = CompactGraph.from_networkx(G).to_networkx()
+    assert list(back.nodes(data=True)) == list(G.nodes(data=True))
+    assert list(back.edges(keys=True, data=True)) == list(G.edges(keys=True, data=True))
+    g = CompactGraph.from_frames(read_nodes_csv(nfile), read_edges_csv(efile))
+    assert list(g.to_networkx().edges(keys=True, data=True)) == list(G.edges(keys=True, data=True))
+    save_graphml(g.to_networkx(), tmp_path / "g.graphml")
+    assert (tmp_path / "g.graphml").exists()
+
+
+def _delta(rows: list, columns: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=columns + ["deleted"]).astype({"deleted": bool})
+
+def test_apply_delta_matches_rebuild(tmp_path: Path) -> None:
+    g = _chain(tmp_path)
+    nodes = _delta(
+        [
+            ("C2", "Contract 2 (rev)", "contract", False),
+            ("V2", "Vendor 2", "vendor", False),
+            ("A1", "", "", True),
+        ],
+        ["id", "label", "type"],
+    )
+    edges = _delta(
+        [
+            ("C2", "V2", "awarded_to", False),
+            ("P", "C1", "funds", False),  # already present
+            ("C1", "V1", "awarded_to", True),
+            ("V2", "X1", "located_at", False),  # new bare endpoint
+            ("V1", "A1", "inspects", False),  # endpoint tombstoned above
+        ],
+        ["src", "dst", "rel"],
+    )
+    updated, stats = g.apply_delta(nodes, edges)
+    assert stats.nodes_added == 2 and stats.nodes_updated == 1 and stats.nodes_deleted == 1
+    assert stats.edges_added == 2 and stats.edges_deleted == 3
+
+    expected = CompactGraph.from_frames(
+        pd.DataFrame(
+            [
+                ("P", "Program", "program"),
+                ("C1", "Contract 1", "contract"),
+                ("C2", "Contract 2 (rev)", "contract"),
+                ("V1", "Vendor 1", "vendor"),
+                ("V2", "Vendor 2", "vendor"),
+            ],
+            columns=["id", "label", "type"],
+        ),
+        pd.DataFrame(
+            [
+                ("P", "C1", "funds"),
+                ("P", "C2", "funds"),
+                ("C2", "V1", "awarded_to"),
+                ("C2", "V2", "awarded_to"),
+                ("V2", "X1", "located_at"),
+            ],
+            columns=["src", "dst", "rel"],
+        ),
+    )
+    ids = [updated.node_id(i) for i in range(updated.num_nodes)]
+    assert ids == ["P", "C1", "C2", "V1", "V2", "X1"]
+    got, want = updated.to_networkx(), expected.to_networkx()
+    assert list(got.edges(keys=True, data=True)) == list(want.edges(keys=True, data=True))
+    assert dict(got.nodes(data=True)) == dict(want.nodes(data=True))
+    assert "A1" not in updated
+    assert updated.predecessors("V1") == ["C2"]
+    assert updated.k_hop("P", k=3) == [("C1", 1), ("C2", 1), ("V1", 2), ("V2", 2), ("X1", 3)]
+    # The original graph is untouched
+    assert g.successors("C1") == ["V1", "A1"]
+
+def test_update_snapshot(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path)
+    folder = default_snapshot_dir(efile)
+    load_or_build(nfile, efile)
+    delta = tmp_path / "edges_delta.csv"
+    delta.write_text("src,dst,rel,deleted\nC1,V1,awarded_to,1\nA1,V1,supplied_by,\n")
+    stats = update_snapshot(folder, edge_delta_csv=delta)
+    assert (stats.edges_added, stats.edges_deleted) == (1, 1)
+    # Sources are unchanged, so the updated snapshot is served as-is
+    g = load_or_build(nfile, efile)
+    assert g.successors("C1") == ["A1", "V1"]
+    assert g.successors("A1") == ["V1"]
+    manifest = (folder / "manifest.json").read_text()
+    assert "edges_delta.csv" in manifest
+    with pytest.raises(FileNotFoundError):
+        update_snapshot(tmp_path / "absent", edge_delta_csv=delta)
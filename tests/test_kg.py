@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+import gzip
+import json
 from pathlib import Path
 
+import networkx as nx
 import pandas as pd
 import pytest
 
-from open_gov_construction.kg import build_graph, neighbors_of, save_graphml
+from open_gov_construction.kg import (
+    build_graph,
+    export_graphml_stream,
+    export_jsonl_stream,
+    neighbors_of,
+    read_edge_delta_csv,
+    read_node_delta_csv,
+    save_graphml,
+)
 
 def test_kg_neighbors(tmp_path: Path) -> None:
     nodes = pd.DataFrame(
@@ -67,3 +78,180 @@ def test_kg_save_graphml(tmp_path: Path) -> None:
     save_graphml(G, outfile)
     assert outfile.exists()
 
+def _write(tmp_path: Path, nodes: list, edges: list) -> tuple[Path, Path]:
+    nfile = tmp_path / "nodes.csv"
+    efile = tmp_path / "edges.csv"
+    pd.DataFrame(nodes, columns=["id", "label", "type"]).to_csv(nfile, index=False)
+    pd.DataFrame(edges, columns=["src", "dst", "rel"]).to_csv(efile, index=False)
+    return nfile, efile
+
+def test_kg_build_graph_matches_row_by_row(tmp_path: Path) -> None:
+    nodes = [(1, "Contract", "document"), ("B", "RFI", "record"), ("C", "Vendor", "org")]
+    edges = [
+        (1, "B", "references"),
+        (1, "B", "supersedes"),
+        ("B", "C", "issued_by"),
+        (1, "C", "awarded"),
+    ]
+    nfile, efile = _write(tmp_path, nodes, edges)
+    G = build_graph(nfile, efile)
+    expected = nx.MultiDiGraph()
+    for nid, label, typ in nodes:
+        expected.add_node(str(nid), label=label, type=typ)
+    for src, dst, rel in edges:
+        expected.add_edge(str(src), str(dst), rel=rel)
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges(keys=True, data=True)) == list(expected.edges(keys=True, data=True))
+
+def test_kg_fast_edge_load_matches_add_edges_from(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from open_gov_construction import kg
+
+    nodes = [("A", "a", "t"), ("B", "b", "t"), ("C", "c", "t")]
+    edges = [
+        ("A", "B", "r1"),
+        ("B", "A", "r2"),
+        ("A", "B", "r3"),
+        ("C", "C", "loop"),
+        ("C", "C", "loop"),
+        ("A", "Z", "r4"),
+        ("A", "B", "r5"),
+    ]
+    nfile, efile = _write(tmp_path, nodes, edges)
+    expected = nx.MultiDiGraph()
+    expected.add_nodes_from((n, {"label": label, "type": typ}) for n, label, typ in nodes)
+    expected.add_edges_from((u, v, {"rel": rel}) for u, v, rel in edges)
+
+    assert kg._fast_edges_supported(nx.MultiDiGraph()), (
+        "fast path not taken on the installed networkx"
+    )
+    fast = build_graph(nfile, efile)
+    monkeypatch.setattr(kg, "_fast_edges_supported", lambda G: False)
+    fallback = build_graph(nfile, efile)
+    for G in (fast, fallback):
+        assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+        assert list(G.edges(keys=True, data=True)) == list(expected.edges(keys=True, data=True))
+        assert list(G.in_edges(keys=True, data=True)) == list(
+            expected.in_edges(keys=True, data=True)
+        )
+        assert all(G.succ[u][v][k] is G.pred[v][u][k] for u, v, k in G.edges(keys=True))
+    fast.add_edge("A", "B", rel="later")
+    expected.add_edge("A", "B", rel="later")
+    assert list(fast.edges(keys=True, data=True)) == list(expected.edges(keys=True, data=True))
+
+def test_kg_fast_edge_fill_matches_networkx_on_random_edges() -> None:
+    import random
+
+    from open_gov_construction import kg
+
+    rng = random.Random(4)
+    names = [f"N{i}" for i in range(40)]
+    edges = [(rng.choice(names), rng.choice(names), f"r{rng.randrange(3)}") for _ in range(600)]
+    frame = pd.DataFrame(edges, columns=["src", "dst", "rel"])
+    keys = frame.groupby(["src", "dst"], sort=False).cumcount().tolist()
+    fast = nx.MultiDiGraph()
+    fast.add_nodes_from(names)
+    assert kg._fast_edges_supported(fast), f"fast path not taken on networkx {nx.__version__}"
+    kg._add_keyed_edges(
+        fast, frame["src"].tolist(), frame["dst"].tolist(), keys, frame["rel"].tolist()
+    )
+    expected = nx.MultiDiGraph()
+    expected.add_nodes_from(names)
+    expected.add_edges_from((u, v, {"rel": rel}) for u, v, rel in edges)
+    assert nx.utils.graphs_equal(fast, expected)
+    assert list(fast.in_edges(keys=True, data=True)) == list(
+        expected.in_edges(keys=True, data=True)
+    )
+    # Mutations through the public API see the same structure
+    for u, v, k in list(expected.edges(keys=True))[::7]:
+        fast.remove_edge(u, v, key=k)
+        expected.remove_edge(u, v, key=k)
+    assert nx.utils.graphs_equal(fast, expected)
+    assert list(fast.in_edges(keys=True, data=True)) == list(
+        expected.in_edges(keys=True, data=True)
+    )
+
+def test_kg_gc_pause_only_for_single_threaded_callers(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import gc
+    import threading
+
+    from open_gov_construction import kg
+
+    seen = []
+    load = kg._load_frames
+    monkeypatch.setattr(kg, "_load_frames", lambda n, e: seen.append(gc.isenabled()) or load(n, e))
+    nfile, efile = _write(tmp_path, [("A", "a", "t")], [("A", "A", "r")])
+    build_graph(nfile, efile)
+    assert seen == [False] and gc.isenabled()
+    # With another thread running, collection stays on for the whole process
+    worker = threading.Thread(target=build_graph, args=(nfile, efile))
+    worker.start()
+    worker.join()
+    assert seen == [False, True] and gc.isenabled()
+
+def test_kg_build_graph_lenient_duplicates_and_dangling(tmp_path: Path) -> None:
+    nfile, efile = _write(
+        tmp_path,
+        [("A", "old", "t"), ("B", "b", "t"), ("A", "new", "t")],
+        [("A", "Z", "r")],
+    )
+    G = build_graph(nfile, efile)
+    assert list(G.nodes) == ["A", "B", "Z"]
+    assert G.nodes["A"]["label"] == "new"
+    assert G.nodes["Z"] == {}
+
+def test_kg_build_graph_strict_duplicate_ids(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path, [("A", "a", "t"), ("A", "a2", "t")], [])
+    with pytest.raises(ValueError, match="Duplicate node ids: A"):
+        build_graph(nfile, efile, strict=True)
+
+def test_kg_build_graph_strict_dangling_edges(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path, [("A", "a", "t")], [("A", "B", "r"), ("X", "A", "r")])
+    with pytest.raises(ValueError, match="unknown nodes: X, B"):
+        build_graph(nfile, efile, strict=True)
+
+def test_export_graphml_stream_roundtrip(tmp_path: Path) -> None:
+    nfile, efile = _write(
+        tmp_path,
+        [("A", '<Main & "Prime">', "contract"), ("B", "Vendor", "vendor")],
+        [("A", "B", "awarded_to"), ("A", "B", "amended_for"), ("B", "Z", "located_at")],
+    )
+    out = tmp_path / "graph.graphml.gz"
+    assert export_graphml_stream(nfile, efile, out, chunksize=1) == (2, 3)
+    with gzip.open(out, "rb") as fh:
+        assert fh.read(5) == b"<?xml"
+    G = nx.read_graphml(out, force_multigraph=True)
+    expected = build_graph(nfile, efile)
+    assert list(G.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(G.edges(keys=True, data=True)) == list(expected.edges(keys=True, data=True))
+
+def test_export_jsonl_stream(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path, [("A", "a", "t")], [("A", "B", "r"), ("B", "A", "r")])
+    out = tmp_path / "graph.jsonl"
+    assert export_jsonl_stream(nfile, efile, out, chunksize=1) == (1, 2)
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert rows[0] == {"kind": "node", "id": "A", "label": "a", "type": "t"}
+    assert rows[2] == {"kind": "edge", "src": "B", "dst": "A", "rel": "r"}
+
+def test_export_stream_missing_column(tmp_path: Path) -> None:
+    nfile, efile = _write(tmp_path, [("A", "a", "t")], [])
+    pd.DataFrame([{"src": "A", "dst": "B"}]).to_csv(efile, index=False)
+    with pytest.raises(ValueError, match="Missing edge column: rel"):
+        export_jsonl_stream(nfile, efile, tmp_path / "out.jsonl")
+
+
+def test_read_delta_csv_tombstones(tmp_path: Path) -> None:
+    nfile = tmp_path / "nodes_delta.csv"
+    nfile.write_text("id,label,type,deleted\nA,Alpha,doc,\nB,,,yes\nC,Gamma,org,0\n")
+    nodes = read_node_delta_csv(nfile)
+    assert nodes["id"].tolist() == ["A", "B", "C"]
+    assert nodes["deleted"].tolist() == [False, True, False]
+    efile = tmp_path / "edges_delta.csv"
+    efile.write_text("src,dst,rel\nA,C,refs\n")
+    assert read_edge_delta_csv(efile)["deleted"].tolist() == [False]
+    efile.write_text("src,dst\nA,C\n")
+    with pytest.raises(ValueError, match="Missing edge column: rel"):
+        read_edge_delta_csv(efile)
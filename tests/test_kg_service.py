@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from open_gov_construction.graphstore import CompactGraph
+from open_gov_construction.kg_service import KGQueryEngine, batch_queries, serve_lines, start_server
+
+def _engine(cache_size: int = 100) -> KGQueryEngine:
+    nodes = pd.DataFrame(
+        [
+            {"id": "P", "label": "Program", "type": "program"},
+            {"id": "C1", "label": "Contract 1", "type": "contract"},
+            {"id": "V1", "label": "Vendor 1", "type": "vendor"},
+            {"id": "A1", "label": "Asset 1", "type": "asset"},
+        ]
+    )
+    edges = pd.DataFrame(
+        [
+            {"src": "P", "dst": "C1", "rel": "funds"},
+            {"src": "C1", "dst": "V1", "rel": "awarded_to"},
+            {"src": "C1", "dst": "A1", "rel": "covers"},
+            {"src": "V1", "dst": "A1", "rel": "maintains"},
+        ]
+    )
+    return KGQueryEngine(CompactGraph.from_frames(nodes, edges), cache_size=cache_size)
+
+def test_engine_ops() -> None:
+    e = _engine()
+    expected = {"id": 7, "ok": True, "result": ["V1", "A1"]}
+    assert e.answer({"op": "neighbors", "node": "C1", "id": 7}) == expected
+    assert e.answer({"op": "neighbors", "node": "A1", "direction": "in"})["result"] == ["C1", "V1"]
+    assert e.answer({"op": "neighbors", "node": "C1", "rels": ["covers"]})["result"] == ["A1"]
+    khop = e.answer({"op": "khop", "node": "P", "k": 2})["result"]
+    assert khop == [{"node": "C1", "hops": 1}, {"node": "V1", "hops": 2}, {"node": "A1", "hops": 2}]
+    assert e.answer({"op": "path", "src": "P", "dst": "A1"})["result"] == ["P", "C1", "A1"]
+    rels = ["funds", "awarded_to", "maintains"]
+    path = e.answer({"op": "path", "src": "P", "dst": "A1", "rels": rels})["result"]
+    assert path == ["P", "C1", "V1", "A1"]
+    assert e.answer({"op": "path", "src": "A1", "dst": "P"})["result"] is None
+
+def test_engine_errors() -> None:
+    e = _engine()
+    missing = {"ok": False, "error": "Node not in graph: nope"}
+    assert e.answer({"op": "neighbors", "node": "nope"}) == missing
+    assert e.answer({"op": "neighbors"})["error"] == "Missing field: node"
+    assert "Unknown op" in e.answer({"op": "drop", "node": "P"})["error"]
+    assert json.loads(e.answer_line("not json"))["ok"] is False
+    assert json.loads(e.answer_line("[1, 2]"))["ok"] is False
+
+def test_engine_lru_cache() -> None:
+    e = _engine(cache_size=2)
+    for _ in range(3):
+        e.answer({"op": "neighbors", "node": "C1", "id": 1})
+    assert (e.cache.hits, e.cache.misses) == (2, 1)
+    e.answer({"op": "path", "src": "A1", "dst": "P"})
+    e.answer({"op": "path", "src": "A1", "dst": "P"})  # cached None result is still a hit
+    assert e.cache.hits == 3
+    e.answer({"op": "neighbors", "node": "P"})
+    assert len(e.cache) == 2
+
+def test_serve_lines() -> None:
+    out = io.StringIO()
+    n = serve_lines(_engine(), io.StringIO('{"node": "P"}\n\n{"node": "V1"}\n'), out)
+    assert n == 2
+    replies = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["result"] for r in replies] == [["C1"], ["A1"]]
+
+def test_batch_queries() -> None:
+    answers = list(batch_queries(_engine(), ["P", "missing", "C1"], {"op": "khop", "k": 1}))
+    assert [nid for nid, _ in answers] == ["P", "missing", "C1"]
+    assert [r["ok"] for _, r in answers] == [True, False, True]
+
+def test_socket_server_tcp() -> None:
+    async def scenario() -> list:
+        server = await start_server(_engine(), port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"id": 1, "node": "P"}\n{"id": 2, "op": "path", "src": "P", "dst": "A1"}\n')
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[0] == {"id": 1, "ok": True, "result": ["C1"]}
+    assert replies[1]["result"] == ["P", "C1", "A1"]
+
+def test_socket_server_unix(tmp_path: Path) -> None:
+    sock = tmp_path / "kg.sock"
+
+    async def scenario() -> dict:
+        server = await start_server(_engine(), socket_path=sock)
+        reader, writer = await asyncio.open_unix_connection(str(sock))
+        writer.write(b'{"node": "C1"}\n')
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return reply
+
+    assert asyncio.run(scenario())["result"] == ["V1", "A1"]
+
+def test_socket_server_bad_utf8_keeps_connection() -> None:
+    async def scenario() -> list:
+        server = await start_server(_engine(), port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"node": "\xff\xfe"}\n{"node": "P"}\n')
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return replies
+
+    bad, good = asyncio.run(scenario())
+    assert bad["ok"] is False and "UTF-8" in bad["error"]
+    assert good == {"ok": True, "result": ["C1"]}
+
+def test_socket_server_slow_query_does_not_stall_others(monkeypatch: pytest.MonkeyPatch) -> None:
+    import time
+
+    run = KGQueryEngine._run
+
+    def slow_run(self: KGQueryEngine, req: dict) -> object:
+        if req.get("op") == "path":
+            time.sleep(0.5)
+        return run(self, req)
+
+    monkeypatch.setattr(KGQueryEngine, "_run", slow_run)
+
+    async def ask(port: int, line: bytes) -> dict:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(line)
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        writer.close()
+        return reply
+
+    async def scenario() -> float:
+        server = await start_server(_engine(), port=0)
+        port = server.sockets[0].getsockname()[1]
+        t0 = time.perf_counter()
+        slow = asyncio.ensure_future(ask(port, b'{"op": "path", "src": "P", "dst": "A1"}\n'))
+        await asyncio.sleep(0.05)
+        assert (await ask(port, b'{"node": "P"}\n'))["result"] == ["C1"]
+        elapsed = time.perf_counter() - t0
+        assert (await slow)["result"] == ["P", "C1", "A1"]
+        server.close()
+        await server.wait_closed()
+        return elapsed
+
+    assert asyncio.run(scenario()) < 0.4
+
+def test_unix_server_replaces_stale_socket(tmp_path: Path) -> None:
+    import socket
+
+    sock = tmp_path / "kg.sock"
+    # A socket file whose server is gone, as left by a crash
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(sock))
+    stale.close()
+
+    async def scenario() -> dict:
+        server = await start_server(_engine(), socket_path=sock)
+        try:
+            with pytest.raises(OSError, match="in use"):
+                await start_server(_engine(), socket_path=sock)
+            reader, writer = await asyncio.open_unix_connection(str(sock))
+            writer.write(b'{"node": "C1"}\n')
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+        return reply
+
+    assert asyncio.run(scenario())["result"] == ["V1", "A1"]
+    not_a_socket = tmp_path / "notes.txt"
+    not_a_socket.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        asyncio.run(start_server(_engine(), socket_path=not_a_socket))
+    assert not_a_socket.read_text() == "keep me"
@@ -2,10 +2,28 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import pandas as pd
+import pytest
 from PIL import Image
 import numpy as np
 
-from open_gov_construction.media import scan_images, find_duplicates, hamming
+from open_gov_construction.media import (
+    ImageInfo,
+    read_image_metadata,
+    cluster_duplicates,
+    cluster_hashes,
+    duplicate_pairs,
+    find_duplicates,
+    hamming,
+    iter_image_metadata,
+    iter_image_paths,
+    iter_images,
+    read_inventory_rows,
+    scan_images,
+    write_clusters_csv,
+    write_inventory_csv,
+    write_metadata_csv,
+)
 
 def test_media_scan_and_duplicates(tmp_path: Path) -> None:
     # Create two identical small images and one different
@@ -49,3 +67,254 @@ def test_media_scan_image_properties(tmp_path: Path) -> None:
     assert 0.0 <= info.brightness <= 1.0
     assert isinstance(info.phash, int)
 
+def _nested_tree(root: Path) -> None:
+    (root / "site" / "day1").mkdir(parents=True)
+    (root / "site" / "thumbs").mkdir(parents=True)
+    img = Image.fromarray((np.ones((16, 16, 3), dtype=np.uint8) * 90))
+    img.save(root / "top.png")
+    img.save(root / "site" / "day1" / "b.jpg")
+    img.save(root / "site" / "day1" / "a.png")
+    img.save(root / "site" / "thumbs" / "t.png")
+    (root / "site" / "notes.txt").write_text("not an image")
+
+def test_iter_image_paths_recursive_sorted(tmp_path: Path) -> None:
+    _nested_tree(tmp_path)
+    rel = [p.relative_to(tmp_path).as_posix() for p in iter_image_paths(tmp_path)]
+    assert rel == ["top.png", "site/day1/a.png", "site/day1/b.jpg", "site/thumbs/t.png"]
+    flat = [p.name for p in iter_image_paths(tmp_path, recursive=False)]
+    assert flat == ["top.png"]
+
+def test_iter_image_paths_filters(tmp_path: Path) -> None:
+    _nested_tree(tmp_path)
+    rel = [
+        p.relative_to(tmp_path).as_posix()
+        for p in iter_image_paths(tmp_path, exclude=["site/thumbs"])
+    ]
+    assert "site/thumbs/t.png" not in rel
+    rel = [
+        p.relative_to(tmp_path).as_posix() for p in iter_image_paths(tmp_path, include=["site/*"])
+    ]
+    assert rel == ["site/day1/a.png", "site/day1/b.jpg", "site/thumbs/t.png"]
+    rel = [p.name for p in iter_image_paths(tmp_path, extensions=["jpg"])]
+    assert rel == ["b.jpg"]
+
+def test_write_inventory_csv_streams(tmp_path: Path) -> None:
+    _nested_tree(tmp_path / "imgs")
+    out = tmp_path / "inv.csv"
+    seen = []
+    n = write_inventory_csv(iter_images(tmp_path / "imgs"), out, on_row=seen.append)
+    assert n == 4 and len(seen) == 4
+    df = pd.read_csv(out)
+    assert list(df.columns) == ["path", "width", "height", "brightness", "phash"]
+    assert len(df) == 4
+
+def test_cluster_duplicates_matches_pairwise_components() -> None:
+    rng = np.random.default_rng(7)
+    bases = [int(rng.integers(0, 2**63)) for _ in range(5)]
+    infos = []
+    for b, base in enumerate(bases):
+        for k in range(6):
+            h = base ^ (1 << int(rng.integers(0, 64))) if k else base
+            infos.append(
+                ImageInfo(path=f"b{b}_{k}.png", width=10 + k, height=10, brightness=0.5, phash=h)
+            )
+    infos.append(
+        ImageInfo(
+            path="lonely.png", width=1, height=1, brightness=0.0, phash=~bases[0] & (2**64 - 1)
+        )
+    )
+    clusters = cluster_duplicates(infos, max_distance=3)
+    assert len(clusters) == 5
+    assert [c.cluster_id for c in clusters] == [1, 2, 3, 4, 5]
+    for c in clusters:
+        # Highest resolution wins, and is listed first at distance 0
+        assert c.representative.path.endswith("_5.png")
+        assert c.members[0] == (c.representative, 0)
+        assert len(c.members) == 6
+    # Same partition as connected components of the pairwise duplicate list
+    clustered = {frozenset(i.path for i, _ in c.members) for c in clusters}
+    for a, b, _ in find_duplicates(infos, max_distance=3):
+        assert any(a.path in g and b.path in g for g in clustered)
+
+def test_cluster_duplicates_scales_with_images() -> None:
+    import time
+
+    rng = np.random.default_rng(3)
+    base = int(rng.integers(0, 2**63))
+    identical = [
+        ImageInfo(path=f"same_{k}.png", width=8, height=8, brightness=0.5, phash=base)
+        for k in range(5000)
+    ]
+    near = [
+        ImageInfo(
+            path=f"near_{k}.png",
+            width=8,
+            height=8,
+            brightness=0.5,
+            phash=base ^ (1 << int(rng.integers(0, 64))),
+        )
+        for k in range(5000)
+    ]
+    t0 = time.perf_counter()
+    clusters = cluster_duplicates(identical + near, max_distance=5)
+    # The old pairwise bucket scan took ~13 s on 4k near-identical hashes
+    assert time.perf_counter() - t0 < 2.0
+    assert len(clusters) == 1 and len(clusters[0].members) == 10_000
+
+def test_band_search_matches_brute_force_at_hash_width() -> None:
+    rng = np.random.default_rng(5)
+    hashes = [int(h) for h in rng.integers(0, 2**63, size=40)]
+    hashes += [~hashes[0] & (2**64 - 1), hashes[1] ^ (2**63 - 1)]
+    infos = [
+        ImageInfo(path=str(k), width=1, height=1, brightness=0.0, phash=h)
+        for k, h in enumerate(hashes)
+    ]
+    for max_distance in (30, 63, 64, 80):
+        expected = [
+            (int(a.path), int(b.path), d)
+            for a, b, d in find_duplicates(infos, max_distance=max_distance)
+        ]
+        assert duplicate_pairs(hashes, max_distance=max_distance, limit=len(expected)) == (
+            len(expected),
+            expected,
+        )
+        # Components of the brute-force pair graph
+        parent = list(range(len(hashes)))
+
+        def root(x: int) -> int:
+            while parent[x] != x:
+                x = parent[x]
+            return x
+
+        for i, j, _ in expected:
+            parent[root(i)] = root(j)
+        groups: dict = {}
+        for k in range(len(hashes)):
+            groups.setdefault(root(k), []).append(k)
+        brute = sorted(g for g in groups.values() if len(g) >= 2)
+        assert sorted(cluster_hashes(hashes, max_distance=max_distance)) == brute
+    with pytest.raises(ValueError):
+        cluster_hashes(hashes, max_distance=-1)
+
+def test_duplicate_pairs_matches_find_duplicates() -> None:
+    rng = np.random.default_rng(11)
+    bases = [int(rng.integers(0, 2**63)) for _ in range(3)]
+    infos = []
+    for k in range(60):
+        h = bases[k % 3]
+        for _ in range(int(rng.integers(0, 4))):
+            h ^= 1 << int(rng.integers(0, 64))
+        infos.append(ImageInfo(path=str(k), width=1, height=1, brightness=0.0, phash=h))
+    expected = [(int(a.path), int(b.path), d) for a, b, d in find_duplicates(infos, max_distance=3)]
+    total, first = duplicate_pairs([i.phash for i in infos], max_distance=3, limit=25)
+    assert total == len(expected)
+    assert first == expected[:25]
+    # k identical hashes count k(k-1)/2 pairs without enumerating them
+    assert duplicate_pairs([7] * 50_000, limit=0) == (50_000 * 49_999 // 2, [])
+
+def test_duplicate_pairs_memory_does_not_grow_with_pairs() -> None:
+    import tracemalloc
+
+    rng = np.random.default_rng(2)
+    base = int(rng.integers(0, 2**63))
+    # Hundreds of distinct hashes, all within 4 bits of each other: tens of thousands of pairs
+    hashes = [base ^ (1 << int(a)) ^ (1 << int(b)) for a, b in rng.integers(0, 64, size=(300, 2))]
+    tracemalloc.start()
+    try:
+        total, first = duplicate_pairs(hashes, max_distance=5, limit=20)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert total == 300 * 299 // 2 and len(first) == 20
+    assert peak < 500_000
+
+def test_read_inventory_rows_round_trips(tmp_path: Path) -> None:
+    _nested_tree(tmp_path / "imgs")
+    out = tmp_path / "inv.csv"
+    infos = []
+    write_inventory_csv(iter_images(tmp_path / "imgs"), out, on_row=infos.append)
+    assert read_inventory_rows(out, [3, 1]) == {1: infos[1], 3: infos[3]}
+    assert read_inventory_rows(out, []) == {}
+
+def test_write_clusters_csv(tmp_path: Path) -> None:
+    infos = [
+        ImageInfo(path="a.png", width=4, height=4, brightness=0.1, phash=0b1111),
+        ImageInfo(path="b.png", width=8, height=8, brightness=0.1, phash=0b1110),
+        ImageInfo(path="c.png", width=2, height=2, brightness=0.1, phash=0b1100),
+    ]
+    out = tmp_path / "clusters.csv"
+    n = write_clusters_csv(cluster_duplicates(infos, max_distance=1), out)
+    assert n == 3
+    df = pd.read_csv(out)
+    assert list(df.columns) == ["cluster_id", "path", "distance", "is_representative"]
+    assert df["path"].tolist() == ["b.png", "a.png", "c.png"]
+    assert df["distance"].tolist() == [0, 1, 1]
+    assert df["is_representative"].tolist() == [True, False, False]
+
+def _jpeg_with_exif(path: Path) -> None:
+    exif = Image.Exif()
+    exif[271] = "Canon"
+    exif[272] = "EOS R5"
+    exif[306] = "2024:05:01 10:00:00"
+    exif.get_ifd(0x8769)[36867] = "2024:04:30 09:15:02"
+    exif.get_ifd(0x8825).update({1: "N", 2: (40.0, 26.0, 46.0), 3: "W", 4: (79.0, 58.0, 56.0)})
+    Image.fromarray(np.zeros((20, 30, 3), dtype=np.uint8)).save(path, exif=exif.tobytes())
+
+def test_read_image_metadata_exif(tmp_path: Path) -> None:
+    p = tmp_path / "site.jpg"
+    _jpeg_with_exif(p)
+    meta = read_image_metadata(p)
+    assert (meta.width, meta.height, meta.format) == (30, 20, "JPEG")
+    assert meta.captured_at == "2024-04-30T09:15:02"
+    assert meta.camera_make == "Canon" and meta.camera_model == "EOS R5"
+    assert meta.gps_lat is not None and abs(meta.gps_lat - 40.446111) < 1e-5
+    assert meta.gps_lon is not None and abs(meta.gps_lon + 79.982222) < 1e-5
+    assert meta.file_size == p.stat().st_size
+
+def test_read_image_metadata_without_exif(tmp_path: Path) -> None:
+    p = tmp_path / "plain.png"
+    Image.fromarray(np.zeros((8, 8, 3), dtype=np.uint8)).save(p)
+    meta = read_image_metadata(p)
+    assert meta.captured_at == ""
+    assert meta.gps_lat is None and meta.gps_lon is None
+    assert meta.camera_model == ""
+
+def test_read_image_metadata_never_decodes_pixels(tmp_path: Path, monkeypatch) -> None:
+    from PIL import ImageFile
+
+    exif = Image.Exif()
+    exif[272] = "EOS R5"
+    exif.get_ifd(0x8769)[36867] = "2024:04:30 09:15:02"
+    Image.fromarray(np.zeros((40, 50, 3), dtype=np.uint8)).save(
+        tmp_path / "exif.png", exif=exif.tobytes()
+    )
+    Image.fromarray(np.zeros((8, 8, 3), dtype=np.uint8)).save(tmp_path / "plain.png")
+    _jpeg_with_exif(tmp_path / "site.jpg")
+
+    def fail(self: Image.Image) -> None:
+        raise AssertionError("pixel data decoded")
+
+    monkeypatch.setattr(Image.Image, "load", fail)
+    monkeypatch.setattr(ImageFile.ImageFile, "load", fail)
+    metas = {Path(m.path).name: m for m in iter_image_metadata(tmp_path, workers=1)}
+    assert (metas["exif.png"].width, metas["exif.png"].height) == (50, 40)
+    assert metas["exif.png"].camera_model == "EOS R5"
+    assert metas["exif.png"].captured_at == "2024-04-30T09:15:02"
+    assert metas["plain.png"].captured_at == ""
+    assert metas["site.jpg"].camera_make == "Canon"
+
+def test_metadata_inventory_joins_phash_inventory(tmp_path: Path) -> None:
+    _nested_tree(tmp_path / "imgs")
+    _jpeg_with_exif(tmp_path / "imgs" / "site" / "exif.jpg")
+    meta_csv = tmp_path / "meta.csv"
+    inv_csv = tmp_path / "inv.csv"
+    serial = [m.path for m in iter_image_metadata(tmp_path / "imgs", workers=1)]
+    n = write_metadata_csv(iter_image_metadata(tmp_path / "imgs", workers=4), meta_csv)
+    write_inventory_csv(iter_images(tmp_path / "imgs"), inv_csv)
+    meta = pd.read_csv(meta_csv)
+    assert n == 5
+    assert meta["path"].tolist() == serial
+    joined = meta.merge(pd.read_csv(inv_csv), on="path", suffixes=("", "_inv"))
+    assert len(joined) == 5
+    assert (joined["width"] == joined["width_inv"]).all()
+
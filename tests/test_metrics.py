@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from open_gov_construction import metrics
+
+@pytest.fixture(autouse=True)
+def _disable_after() -> Iterator[None]:
+    yield
+    metrics.disable()
+    metrics.reset()
+
+def test_disabled_records_nothing() -> None:
+    metrics.disable()
+    metrics.reset()
+    with metrics.span("stage"):
+        metrics.count("rows", 10)
+    assert metrics.report()["stages"] == {}
+    assert metrics.report()["counters"] == {}
+
+def test_nested_spans_and_counters() -> None:
+    metrics.enable()
+    with metrics.span("outer"):
+        with metrics.span("inner"):
+            time.sleep(0.01)
+        metrics.count("rows", 3)
+    metrics.count("rows", 2)
+    rep = metrics.report()
+    outer, inner = rep["stages"]["outer"], rep["stages"]["inner"]
+    assert outer["calls"] == inner["calls"] == 1
+    assert outer["seconds"] >= inner["seconds"] >= 0.01
+    assert outer["self_seconds"] < inner["seconds"]
+    assert rep["counters"] == {"rows": 5}
+
+def test_timed_decorator_and_threads() -> None:
+    @metrics.timed("work")
+    def work(x: int) -> int:
+        metrics.count("items")
+        return x * 2
+
+    assert work(2) == 4  # disabled: plain call
+    metrics.enable()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(work, range(20))) == [x * 2 for x in range(20)]
+    rep = metrics.report()
+    assert rep["stages"]["work"]["calls"] == 20
+    assert rep["counters"]["items"] == 20
+
+def test_write_json(tmp_path: Path) -> None:
+    metrics.enable()
+    with metrics.span("s"):
+        pass
+    out = tmp_path / "m.json"
+    metrics.write_json(out, {"command": "x"})
+    data = json.loads(out.read_text())
+    assert data["command"] == "x"
+    assert data["stages"]["s"]["calls"] == 1
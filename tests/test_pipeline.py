@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+from open_gov_construction import metrics
+from open_gov_construction.pipeline import build_summary, load_manifest, run_project
+from open_gov_construction.states import ReportingPrefs, StateProfile
+
+def _project(tmp_path: Path, state: str = "IN") -> Path:
+    pd.DataFrame([
+        {"task_id": "A", "name": "Mobilize", "duration_days": 5.0, "predecessors": "",
+         "optimistic_days": 4.0, "likely_days": 5.0, "pessimistic_days": 8.0},
+        {"task_id": "B", "name": "Deck", "duration_days": 3.0, "predecessors": "A"},
+        {"task_id": "C", "name": "Rail", "duration_days": 1.0, "predecessors": "A"},
+    ]).to_csv(tmp_path / "tasks.csv", index=False)
+    pd.DataFrame([
+        {"line_id": "L1", "description": "Steel girders", "material_type": "iron_steel",
+         "origin_country": "CN", "cost_usd": 1000.0, "federal_funding": True, "state": state},
+        {"line_id": "L2", "description": "Signs", "material_type": "manufactured",
+         "origin_country": "US", "cost_usd": 50.0, "federal_funding": True, "state": state,
+         "domestic_content_pct": 90.0},
+    ]).to_csv(tmp_path / "costs.csv", index=False)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    for name in ("a.png", "b.png"):
+        Image.fromarray(np.full((16, 16, 3), 90, dtype=np.uint8)).save(photos / name)
+    nodes = pd.DataFrame([{"id": "C1", "label": "Contract", "type": "document"}])
+    nodes.to_csv(tmp_path / "nodes.csv", index=False)
+    edges = pd.DataFrame([{"src": "C1", "dst": "V1", "rel": "awarded_to"}])
+    edges.to_csv(tmp_path / "edges.csv", index=False)
+    manifest = tmp_path / "bridge.toml"
+    manifest.write_text(
+        f"""
+[project]
+name = "Bridge 12"
+state = "{state.lower()}"
+
+[schedule]
+tasks = "tasks.csv"
+iterations = 200
+
+[cost]
+items = "costs.csv"
+
+[media]
+folder = "photos"
+
+[kg]
+nodes = "nodes.csv"
+edges = "edges.csv"
+snapshot = false
+"""
+    )
+    return manifest
+
+def test_load_manifest(tmp_path: Path) -> None:
+    m = load_manifest(_project(tmp_path))
+    assert m.state == "IN"
+    assert m.output_dir == tmp_path / "bridge_out"
+    assert m.schedule is not None and m.schedule.tasks == tmp_path / "tasks.csv"
+    assert m.schedule.iterations == 200
+    assert m.kg is not None and m.kg.snapshot is False
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('[project]\nname = "x"\n', "Missing \\[project\\] key: state"),
+        ('[project]\nname = "x"\nstate = "TX"\n', "Unsupported state"),
+        ('[project]\nname = "x"\nstate = "OH"\n[cost]\nitem = "c.csv"\n', "Unknown key"),
+        (
+            '[project]\nname = "x"\nstate = "OH"\n[kg]\nnodes = "n.csv"\n',
+            "Missing \\[kg\\] key: edges",
+        ),
+        ('[project]\nname = "x"\nstate = "OH"\n[budget]\n', "Unknown manifest section"),
+    ],
+)
+def test_load_manifest_errors(tmp_path: Path, text: str, message: str) -> None:
+    path = tmp_path / "m.toml"
+    path.write_text(text)
+    with pytest.raises(ValueError, match=message):
+        load_manifest(path)
+
+def test_run_project_parses_tasks_once(tmp_path: Path) -> None:
+    manifest = load_manifest(_project(tmp_path))
+    metrics.enable()
+    try:
+        run = run_project(manifest, workers=3)
+        calls = metrics.report()["stages"]["schedule.read_tasks_csv"]["calls"]
+    finally:
+        metrics.disable()
+    assert run.ok, run.errors
+    assert calls == 1
+    assert set(run.results) == {"cpm", "montecarlo", "cost", "media", "kg"}
+    assert run.results["cpm"]["duration_days"] == 8.0
+    assert run.results["cpm"]["critical_path"] == ["A", "B"]
+    assert run.results["cost"]["flagged_lines"] == ["L1"]
+    assert run.results["media"]["duplicate_clusters"] == 1
+    graphml = str(manifest.output_dir / "graph.graphml")
+    assert run.results["kg"] == {"nodes": 2, "edges": 1, "outputs": [graphml]}
+    for name in ("schedule_cpm.csv", "cost_compliance.csv", "media_inventory.csv",
+                 "media_clusters.csv", "graph.graphml"):
+        assert (manifest.output_dir / name).exists()
+
+def test_run_project_process_pool_and_failures(tmp_path: Path) -> None:
+    manifest = load_manifest(_project(tmp_path))
+    (tmp_path / "costs.csv").write_text("line_id\nL1\n")
+    run = run_project(manifest, workers=2, executor="process")
+    assert set(run.errors) == {"cost"}
+    assert "Missing required column" in run.errors["cost"]
+    assert run.results["montecarlo"]["p50"] > 0
+
+def test_summary_follows_reporting_preferences(tmp_path: Path) -> None:
+    run = run_project(load_manifest(_project(tmp_path)), workers=2)
+    profile = StateProfile(
+        code="IN",
+        name="Indiana",
+        agencies=["INDOT"],
+        reporting=ReportingPrefs(
+            emphasize_cost_compliance=False,
+            emphasize_schedule_risk=False,
+            emphasize_document_control=True,
+        ),
+    )
+    summary = build_summary(run, profile)
+    titles = [s["title"] for s in summary["sections"]]
+    assert titles == ["Document Control", "Schedule Risk", "Cost Compliance"]
+    schedule = summary["sections"][1]
+    assert not schedule["emphasized"]
+    assert not any(line.startswith("Critical path") for line in schedule["lines"])
+    full = build_summary(run)
+    assert any(line == "Critical path: A, B" for line in full["sections"][0]["lines"])
+    assert json.dumps(full)
@@ -2,10 +2,19 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from open_gov_construction.schedule import cpm, read_tasks_csv, monte_carlo_duration, Task
+from open_gov_construction.schedule import (
+    cpm,
+    read_tasks_csv,
+    monte_carlo_duration,
+    simulate_schedule,
+    write_risk_chart,
+    Task,
+)
+from open_gov_construction.utils import ExecutionConfig
 
 def test_cpm_chain(tmp_path: Path) -> None:
     # A -> B -> C with durations 5, 3, 2 => project 10 days; all critical
@@ -74,3 +83,79 @@ def test_monte_carlo_no_uncertainty(tmp_path: Path) -> None:
     assert abs(p80 - 5.0) < 0.01
     assert abs(p90 - 5.0) < 0.01
 
+
+def test_monte_carlo_batches_match_sequential_sampling() -> None:
+    tasks = [
+        Task("A", "A", 5.0, (), 4.0, 5.0, 7.0),
+        Task("B", "B", 3.0, ("A",)),
+        Task("C", "C", 2.0, ("A",), 1.0, 2.0, 6.0),
+        Task("D", "D", 1.0, ("B", "C"), 0.5, 1.0, 3.0),
+    ]
+    # One iteration at a time, uncertain tasks in topological order
+    rng = np.random.default_rng(9)
+    expected = []
+    for _ in range(200):
+        a = rng.triangular(4.0, 5.0, 7.0)
+        c = a + rng.triangular(1.0, 2.0, 6.0)
+        expected.append(max(a + 3.0, c) + rng.triangular(0.5, 1.0, 3.0))
+    want = tuple(float(np.percentile(expected, q)) for q in (50, 80, 90))
+    for chunk_size in (1, 7, 100_000):
+        config = ExecutionConfig(chunk_size=chunk_size)
+        assert monte_carlo_duration(tasks, iterations=200, seed=9, config=config) == want
+
+def test_simulate_schedule_sample_store_and_bins(tmp_path: Path) -> None:
+    tasks = [
+        Task("A", "A", 5.0, (), 4.0, 5.0, 9.0),
+        Task("B", "B", 3.0, ("A",), 2.0, 3.0, 6.0),
+        Task("C", "C", 2.0, ("A",)),
+    ]
+    in_memory = simulate_schedule(
+        tasks, iterations=5001, seed=4, bins=25, config=ExecutionConfig(chunk_size=500)
+    )
+    on_disk = simulate_schedule(
+        tasks, iterations=5001, seed=4, bins=25, samples_path=tmp_path / "s.npy",
+        config=ExecutionConfig(chunk_size=333),
+    )
+    samples = np.load(tmp_path / "s.npy")
+    assert samples.shape == (5001,)
+    expected = tuple(float(np.percentile(samples, q)) for q in (50, 80, 90))
+    assert (in_memory.p50, in_memory.p80, in_memory.p90) == expected
+    assert (on_disk.p50, on_disk.p80, on_disk.p90) == expected
+    assert on_disk.mean == pytest.approx(samples.mean())
+    # 25 bins over the first 1000 samples' range, plus under/overflow bins out to the
+    # all-optimistic (6 d) and all-pessimistic (15 d) durations
+    assert (on_disk.bin_edges[0], on_disk.bin_edges[-1]) == (6.0, 15.0)
+    pilot = samples[:1000]
+    assert on_disk.bin_edges[1] == pilot.min() and on_disk.bin_edges[-2] > pilot.max()
+    assert np.array_equal(on_disk.bin_edges, in_memory.bin_edges)
+    assert np.array_equal(on_disk.counts, np.histogram(samples, bins=on_disk.bin_edges)[0])
+    table = on_disk.cdf_table()
+    assert len(table) == 27 and table["cumulative_pct"].iloc[-1] == pytest.approx(100.0)
+    assert (monte_carlo_duration(tasks, iterations=5001, seed=4)) == expected
+
+def test_sample_store_percentiles_refine_large_bins(tmp_path: Path) -> None:
+    # A fixed 10-day path decides about half of the iterations, so many samples tie at 10.0
+    tasks = [
+        Task("A", "A", 10.0, ()),
+        Task("B", "B", 9.0, (), 5.0, 9.0, 16.0),
+        Task("C", "C", 1.0, ("A", "B")),
+    ]
+    # 40-row chunks: the bins holding the percentiles are too large to collect in one pass
+    res = simulate_schedule(
+        tasks, iterations=20_000, seed=2, bins=10, samples_path=tmp_path / "s.npy",
+        config=ExecutionConfig(chunk_size=40),
+    )
+    samples = np.load(tmp_path / "s.npy")
+    assert (samples == 11.0).sum() > 5000
+    expected = tuple(float(np.percentile(samples, q)) for q in (50, 80, 90))
+    assert (res.p50, res.p80, res.p90) == expected
+
+def test_write_risk_chart_leaves_matplotlib_backend_alone(tmp_path: Path) -> None:
+    import matplotlib
+
+    tasks = [Task("A", "A", 5.0, (), 4.0, 5.0, 9.0)]
+    res = simulate_schedule(tasks, iterations=500, seed=1, bins=10)
+    backend = matplotlib.rcParams._get_backend_or_none()  # type: ignore[attr-defined]
+    write_risk_chart(res, tmp_path / "risk.png")
+    assert (tmp_path / "risk.png").read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+    assert matplotlib.rcParams._get_backend_or_none() == backend  # type: ignore[attr-defined]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from open_gov_construction.service import AnalyticsService
+
+def _tasks(tmp_path: Path) -> Path:
+    path = tmp_path / "tasks.csv"
+    pd.DataFrame([
+        {"task_id": "A", "name": "Start", "duration_days": 2.0, "predecessors": "",
+         "optimistic_days": 1.0, "likely_days": 2.0, "pessimistic_days": 4.0},
+        {"task_id": "B", "name": "Next", "duration_days": 3.0, "predecessors": "A"},
+    ]).to_csv(path, index=False)
+    return path
+
+async def _request(port: int, method: str, target: str, body: Any = None) -> Tuple[int, Any]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n"
+        "Connection: close\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+def _with_service(scenario: Any, workers: int = 0) -> Any:
+    service = AnalyticsService(workers=workers, cache_size=8)
+
+    async def main() -> Any:
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await scenario(service, port)
+
+    try:
+        return asyncio.run(main())
+    finally:
+        service.close()
+
+def test_schedule_endpoints_cache_parsed_inputs(tmp_path: Path) -> None:
+    tasks = str(_tasks(tmp_path))
+
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        status, cpm = await _request(port, "POST", "/schedule/cpm", {"tasks": tasks})
+        assert status == 200
+        assert cpm["duration_days"] == 5.0 and cpm["critical_path"] == ["A", "B"]
+        assert [r["task_id"] for r in cpm["tasks"]] == ["A", "B"]
+        status, mc = await _request(
+            port, "POST", f"/schedule/montecarlo?tasks={tasks}&iterations=100"
+        )
+        assert status == 200 and mc["iterations"] == 100 and mc["p50"] > 0
+        # Same input file: parsed once; repeated request served from the result cache
+        assert (service.inputs.misses, service.inputs.hits) == (1, 1)
+        await _request(port, "POST", "/schedule/cpm", {"tasks": tasks})
+        assert service.results.hits == 1
+        # Editing the file invalidates both caches
+        pd.read_csv(tasks).assign(duration_days=[2.0, 10.0]).to_csv(tasks, index=False)
+        os.utime(tasks, ns=(0, 10**9))
+        status, cpm = await _request(port, "POST", "/schedule/cpm", {"tasks": tasks})
+        assert cpm["duration_days"] == 12.0
+        status, stats = await _request(port, "GET", "/stats")
+        assert stats["caches"]["inputs"]["misses"] == 2
+
+    _with_service(scenario)
+
+def test_concurrent_identical_requests_share_work(tmp_path: Path) -> None:
+    tasks = str(_tasks(tmp_path))
+
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        replies = await asyncio.gather(
+            *(_request(port, "POST", "/schedule/cpm", {"tasks": tasks}) for _ in range(5))
+        )
+        assert all(status == 200 for status, _ in replies)
+        # One request parses and computes; the rest wait on its in-flight result
+        assert len(service.inputs) == len(service.results) == 1
+        assert service.shared >= 4
+
+    _with_service(scenario)
+
+def test_cost_media_and_kg(tmp_path: Path) -> None:
+    costs = tmp_path / "costs.csv"
+    pd.DataFrame([
+        {"line_id": "L1", "description": "Install beams", "material_type": "iron_steel",
+         "origin_country": "CN", "cost_usd": 10.0, "federal_funding": True, "state": "CA"},
+    ]).to_csv(costs, index=False)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    for name in ("a.png", "b.png"):
+        Image.fromarray(np.full((16, 16, 3), 70, dtype=np.uint8)).save(photos / name)
+    nodes = pd.DataFrame([{"id": "A", "label": "A", "type": "t"}])
+    nodes.to_csv(tmp_path / "nodes.csv", index=False)
+    edges = pd.DataFrame([
+        {"src": "A", "dst": "B", "rel": "r"},
+        {"src": "B", "dst": "C", "rel": "s"},
+    ])
+    edges.to_csv(tmp_path / "edges.csv", index=False)
+    graph = {"nodes": str(tmp_path / "nodes.csv"), "edges": str(tmp_path / "edges.csv")}
+
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        status, cost = await _request(port, "POST", "/cost/screen", {"items": str(costs)})
+        assert status == 200
+        assert cost["baba_flags"] == 1 and cost["dbra_flags"] == 1
+        status, job = await _request(port, "POST", "/media/scan", {"folder": str(photos)})
+        assert status == 202
+        for _ in range(200):
+            status, state = await _request(port, "GET", f"/media/scan/{job['job']}")
+            if state["status"] != "running":
+                break
+            await asyncio.sleep(0.01)
+        assert state["status"] == "done"
+        assert state["result"]["images"] == 2 and len(state["result"]["duplicate_clusters"]) == 1
+        status, found = await _request(
+            port, "POST", "/kg/query", {**graph, "op": "khop", "node": "A", "k": 2}
+        )
+        assert status == 200 and found == [{"node": "B", "hops": 1}, {"node": "C", "hops": 2}]
+        query = f"nodes={graph['nodes']}&edges={graph['edges']}&node=A&rels=s,r&k=2&op=khop"
+        status, found = await _request(port, "POST", f"/kg/query?{query}")
+        assert [f["node"] for f in found] == ["B", "C"]
+        status, err = await _request(port, "POST", "/kg/query", {**graph, "node": "Z"})
+        assert status == 400 and "Z" in err["error"]
+
+    _with_service(scenario)
+
+def test_errors(tmp_path: Path) -> None:
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        assert (await _request(port, "GET", "/health")) == (200, {"ok": True})
+        assert (await _request(port, "GET", "/nope"))[0] == 404
+        assert (await _request(port, "GET", "/schedule/cpm"))[0] == 405
+        assert (await _request(port, "POST", "/schedule/cpm", {}))[0] == 400
+        missing = {"tasks": str(tmp_path / "missing.csv")}
+        assert (await _request(port, "POST", "/schedule/cpm", missing))[0] == 404
+        bad = tmp_path / "bad.csv"
+        bad.write_text("task_id,name\nA,a\n")
+        status, err = await _request(port, "POST", "/schedule/cpm", {"tasks": str(bad)})
+        assert status == 422 and "Missing required column" in err["error"]
+        assert (await _request(port, "GET", "/media/scan/999"))[0] == 404
+
+    _with_service(scenario)
+
+def test_bad_content_length_returns_400() -> None:
+    async def raw(port: int, length: str) -> Tuple[int, Any]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            f"POST /schedule/cpm HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+        )
+        await writer.drain()
+        head, _, payload = (await reader.read()).partition(b"\r\n\r\n")
+        writer.close()
+        return int(head.split()[1]), json.loads(payload)
+
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        for length in ("-2", "abc", "+2", "1_0"):
+            assert (await raw(port, length)) == (400, {"error": "Malformed request"})
+
+    _with_service(scenario)
+
+def test_unexpected_handler_error_returns_500(tmp_path: Path, caplog: Any) -> None:
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        async def broken(params: Any) -> Any:
+            raise TypeError("unsupported operand")
+
+        service._routes[("POST", "/schedule/cpm")] = broken
+        status, err = await _request(port, "POST", "/schedule/cpm", {"tasks": "x.csv"})
+        assert status == 500 and err == {"error": "TypeError: unsupported operand"}
+        # The connection handler survives and keeps serving
+        assert (await _request(port, "GET", "/health")) == (200, {"ok": True})
+
+    _with_service(scenario)
+    assert "POST /schedule/cpm failed" in caplog.text
+
+def test_kg_query_does_not_block_other_clients(tmp_path: Path, monkeypatch: Any) -> None:
+    import time
+
+    from open_gov_construction.kg_service import KGQueryEngine
+
+    nodes = pd.DataFrame([{"id": "A", "label": "A", "type": "t"}])
+    nodes.to_csv(tmp_path / "nodes.csv", index=False)
+    pd.DataFrame([{"src": "A", "dst": "B", "rel": "r"}]).to_csv(tmp_path / "edges.csv", index=False)
+    graph = {"nodes": str(tmp_path / "nodes.csv"), "edges": str(tmp_path / "edges.csv")}
+    answer = KGQueryEngine.answer
+
+    def slow_answer(self: KGQueryEngine, req: Any) -> Any:
+        time.sleep(0.5)
+        return answer(self, req)
+
+    async def scenario(service: AnalyticsService, port: int) -> None:
+        await _request(port, "POST", "/kg/query", {**graph, "node": "A"})  # load the graph
+        monkeypatch.setattr(KGQueryEngine, "answer", slow_answer)
+        t0 = time.perf_counter()
+        slow = asyncio.ensure_future(
+            _request(port, "POST", "/kg/query", {**graph, "node": "A", "op": "khop"})
+        )
+        await asyncio.sleep(0.05)
+        # Client and server share this loop: a blocked loop would hold /health for the full 0.5 s
+        assert (await _request(port, "GET", "/health"))[0] == 200
+        assert time.perf_counter() - t0 < 0.3
+        assert await slow == (200, [{"node": "B", "hops": 1}])
+
+    _with_service(scenario)
+
+def test_process_pool(tmp_path: Path) -> None:
+    tasks = str(_tasks(tmp_path))
+
+    async def scenario(service: AnalyticsService, port: int) -> Any:
+        return await _request(
+            port, "POST", "/schedule/montecarlo", {"tasks": tasks, "iterations": 50, "seed": 1}
+        )
+
+    status, mc = _with_service(scenario, workers=1)
+    assert status == 200 and mc["seed"] == 1
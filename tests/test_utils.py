@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import os
+from pathlib import Path
+
 import numpy as np
+import pytest
 
-from open_gov_construction.utils import RandomConfig
+from open_gov_construction import utils
+from open_gov_construction.utils import (
+    ExecutionConfig,
+    RandomConfig,
+    file_fingerprint,
+    fingerprint_matches,
+)
 
 def test_random_config_default_seed() -> None:
     config = RandomConfig()
@@ -29,4 +39,40 @@ def test_random_config_deterministic() -> None:
     samples2 = [rng2.random() for _ in range(5)]
     assert samples == samples2
 
+def test_file_fingerprint_matches(tmp_path: Path) -> None:
+    p = tmp_path / "data.csv"
+    p.write_text("a,b\n1,2\n")
+    fp = file_fingerprint(p)
+    assert fp["size"] == p.stat().st_size and len(fp["sha256"]) == 64
+    assert fingerprint_matches(fp, p)
+    p.write_text("a,b\n1,3\n")
+    assert not fingerprint_matches(fp, p)
+    assert not fingerprint_matches(fp, tmp_path / "missing.csv")
+    # Without a recorded hash a changed mtime is treated as stale
+    p.write_text("a,b\n1,2\n")
+    cheap = file_fingerprint(p, content_hash=False)
+    os.utime(p, ns=(cheap["mtime_ns"], cheap["mtime_ns"] + 5_000_000_000))
+    assert not fingerprint_matches(cheap, p)
+    assert fingerprint_matches(fp, p)
+
+
+def test_execution_config_env_and_overrides(monkeypatch: pytest.MonkeyPatch) -> None:
+    cfg = ExecutionConfig.from_env(
+        {"OGC_WORKERS": "3", "OGC_EXECUTOR": "process", "OGC_CHUNK_SIZE": "500", "OGC_SEED": ""}
+    )
+    assert (cfg.workers, cfg.executor, cfg.chunk_size, cfg.seed) == (3, "process", 500, 42)
+    assert cfg.io_workers == 7
+    # The memory budget caps rows per batch below chunk_size for wide rows
+    assert cfg.rows_per_chunk(8) == 500
+    assert ExecutionConfig(chunk_size=10**9, memory_budget_mb=1).rows_per_chunk(1024) == 1024
+    with pytest.raises(ValueError, match="OGC_WORKERS"):
+        ExecutionConfig.from_env({"OGC_WORKERS": "many"})
+    with pytest.raises(ValueError, match="executor"):
+        ExecutionConfig(executor="gpu")  # type: ignore[arg-type]
 
+    monkeypatch.setattr(utils, "_execution", None)
+    monkeypatch.setenv("OGC_SEED", "7")
+    assert utils.get_execution_config().seed == 7
+    installed = utils.set_execution_config(workers=2, seed=None)
+    assert (installed.workers, installed.seed) == (2, 7)
+    assert utils.get_execution_config() is installed